@@ -0,0 +1,77 @@
+"""
+Coleta de partidas abandonadas.
+
+O cancelamento pelo navegador (sendBeacon de cancel_game no beforeunload)
+nem sempre chega ao servidor, e partidas IN_PROGRESS órfãs se acumulam.
+cancelar_abandonadas encerra, com um único UPDATE, as partidas em andamento
+sem atividade há mais que o tempo limite, e depois recalcula em lotes as
+estatísticas dos jogadores afetados.
+
+É seguro rodar junto com os servidores web: o UPDATE só alcança partidas
+ainda IN_PROGRESS, e as ações da partida (responder, finalizar, cancelar)
+também são condicionadas ao status, de modo que uma partida é encerrada
+uma única vez, pelo coletor ou pelo jogador.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .estatisticas import recalcular_estatisticas
+from .models import Game
+
+
+def tempo_limite_padrao():
+    """Ociosidade a partir da qual uma partida é considerada abandonada"""
+    return datetime.timedelta(minutes=settings.PARTIDA_ABANDONADA_MINUTOS)
+
+
+def cancelar_abandonadas(ociosidade=None, tamanho_lote=500, agora=None, partidas=None):
+    """
+    Cancela as partidas em andamento ociosas há mais que `ociosidade` e
+    recalcula as estatísticas dos seus jogadores em lotes de `tamanho_lote`.
+    `partidas` restringe a coleta a um queryset de Game (ex.: a seleção
+    feita no admin).
+
+    A duração registrada vai até a última atividade (e não até a coleta).
+    Retorna um dicionário com as partidas canceladas, os jogadores
+    recalculados e a vazão de cada etapa.
+    """
+    if ociosidade is None:
+        ociosidade = tempo_limite_padrao()
+    corte = (agora or timezone.now()) - ociosidade
+    if partidas is None:
+        partidas = Game.objects.all()
+    ociosas = partidas.filter(status='IN_PROGRESS', ultima_atividade__lt=corte)
+
+    inicio = time.perf_counter()
+    # Jogadores lidos antes do UPDATE: o conjunto de partidas ociosas só
+    # diminui (a atividade só avança), então nenhum jogador afetado fica de
+    # fora; um jogador que encerrou a partida no intervalo é apenas recalculado
+    user_ids = list(
+        Game.partidas.through.objects
+        .filter(game__in=ociosas)
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
+    canceladas = ociosas.update(status='CANCELLED', fim_tempo=F('ultima_atividade'))
+    tempo_cancelamento = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    jogadores = 0
+    if canceladas and user_ids:
+        # Recalcula em fatias para manter as listas de ids das consultas curtas
+        for i in range(0, len(user_ids), tamanho_lote):
+            jogadores += recalcular_estatisticas(user_ids[i:i + tamanho_lote], tamanho_lote=tamanho_lote)
+    tempo_estatisticas = time.perf_counter() - inicio
+
+    return {
+        'canceladas': canceladas,
+        'jogadores': jogadores,
+        'tempo_cancelamento_ms': round(tempo_cancelamento * 1000, 3),
+        'tempo_estatisticas_ms': round(tempo_estatisticas * 1000, 3),
+        'partidas_por_segundo': round(canceladas / tempo_cancelamento, 1) if tempo_cancelamento else 0.0,
+        'jogadores_por_segundo': round(jogadores / tempo_estatisticas, 1) if tempo_estatisticas else 0.0,
+    }
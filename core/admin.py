@@ -1,33 +1,132 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from .models import Jogador, Game, PontuacaoJogo, Pergunta, Resposta
+from . import abandonadas, exportacao
+from .estatisticas import recalcular_estatisticas
+
+
+class ContagemEstimadaPaginator(Paginator):
+    """
+    Paginador das listagens de tabelas grandes: sem filtros, no PostgreSQL,
+    usa a estimativa de linhas do planejador (pg_class.reltuples) em vez de
+    um COUNT(*) que percorre a tabela inteira. Com filtros, ou em tabelas
+    pequenas, a contagem é exata.
+    """
+    # Abaixo desta estimativa a contagem exata é barata
+    LIMITE_ESTIMATIVA = 100000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            conexao = connections[self.object_list.db]
+            if conexao.vendor == 'postgresql':
+                with conexao.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                        [self.object_list.model._meta.db_table],
+                    )
+                    linha = cursor.fetchone()
+                if linha and linha[0] > self.LIMITE_ESTIMATIVA:
+                    return linha[0]
+        return super().count
+
+
+class AdminTabelaGrande(admin.ModelAdmin):
+    """Listagem sem a contagem total extra e com contagem estimada"""
+    paginator = ContagemEstimadaPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+def _recalcular(modeladmin, request, user_ids):
+    """Recalcula as estatísticas dos usuários (lista ou subconsulta de ids)"""
+    jogadores = recalcular_estatisticas(user_ids)
+    modeladmin.message_user(request, f'Estatísticas recalculadas para {jogadores} jogadores.', messages.SUCCESS)
+
 
 @admin.register(Jogador)
-class JogadorAdmin(admin.ModelAdmin):
+class JogadorAdmin(AdminTabelaGrande):
     list_display = ('user_jogador', 'jogos_jogados', 'vitorias', 'pontuacao_media')
-    list_filter = ('jogos_jogados', 'vitorias')
-    search_fields = ('user_jogador__username',)
+    list_select_related = ('user_jogador',)
+    search_fields = ('^user_jogador__username',)
     ordering = ('-jogos_jogados',)
+    raw_id_fields = ('user_jogador',)
+    actions = ['recalcular_estatisticas', 'exportar_csv']
+
+    @admin.action(description='Recalcular estatísticas dos jogadores selecionados')
+    def recalcular_estatisticas(self, request, queryset):
+        _recalcular(self, request, queryset.values('user_jogador_id'))
+
+    @admin.action(description='Exportar seleção (CSV)')
+    def exportar_csv(self, request, queryset):
+        return exportacao.resposta(request, 'jogadores', base=queryset)
 
 class PontuacaoJogoInline(admin.TabularInline):
     model = PontuacaoJogo
     extra = 0
     readonly_fields = ('jogador', 'pontuacao')
+    # O jogador é exibido pelo nome sem carregar a lista de usuários
+    raw_id_fields = ('jogador',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('jogador')
 
 @admin.register(Game)
-class GameAdmin(admin.ModelAdmin):
+class GameAdmin(AdminTabelaGrande):
     list_display = ('id', 'status', 'inicio_tempo', 'fim_tempo', 'ganhador')
-    list_filter = ('status', 'inicio_tempo')
-    search_fields = ('ganhador__username',)
+    list_select_related = ('ganhador',)
+    list_filter = ('status',)
+    date_hierarchy = 'inicio_tempo'
+    search_fields = ('=id', '^ganhador__username')
     readonly_fields = ('inicio_tempo',)
-    filter_horizontal = ('partidas',)
+    autocomplete_fields = ('ganhador', 'partidas')
     inlines = [PontuacaoJogoInline]
+    actions = ['cancelar_paradas', 'recalcular_estatisticas', 'exportar_csv']
+
+    @admin.action(description='Cancelar partidas paradas selecionadas')
+    def cancelar_paradas(self, request, queryset):
+        # Um único UPDATE (só partidas em andamento e ociosas) e o recálculo
+        # das estatísticas dos jogadores afetados
+        relatorio = abandonadas.cancelar_abandonadas(partidas=queryset)
+        self.message_user(
+            request,
+            f"{relatorio['canceladas']} partidas canceladas; "
+            f"{relatorio['jogadores']} jogadores recalculados.",
+            messages.SUCCESS,
+        )
+
+    @admin.action(description='Recalcular estatísticas dos jogadores das partidas selecionadas')
+    def recalcular_estatisticas(self, request, queryset):
+        _recalcular(self, request, Game.partidas.through.objects.filter(game__in=queryset).values('user_id'))
+
+    @admin.action(description='Exportar seleção (CSV)')
+    def exportar_csv(self, request, queryset):
+        return exportacao.resposta(request, 'partidas', base=queryset)
 
 @admin.register(PontuacaoJogo)
-class PontuacaoJogoAdmin(admin.ModelAdmin):
+class PontuacaoJogoAdmin(AdminTabelaGrande):
     list_display = ('jogo', 'jogador', 'pontuacao')
-    list_filter = ('jogo', 'jogador')
-    search_fields = ('jogador__username',)
+    list_select_related = ('jogo', 'jogador')
+    # Filtros de baixa cardinalidade: listar uma opção por partida e por
+    # usuário carregaria as duas tabelas inteiras
+    list_filter = ('jogo__status',)
+    date_hierarchy = 'jogo__inicio_tempo'
+    search_fields = ('^jogador__username',)
+    raw_id_fields = ('jogo',)
+    autocomplete_fields = ('jogador',)
+    actions = ['recalcular_estatisticas', 'exportar_csv']
+
+    @admin.action(description='Recalcular estatísticas dos jogadores selecionados')
+    def recalcular_estatisticas(self, request, queryset):
+        _recalcular(self, request, queryset.values('jogador_id'))
+
+    @admin.action(description='Exportar seleção (CSV)')
+    def exportar_csv(self, request, queryset):
+        return exportacao.resposta(request, 'pontuacoes', base=queryset)
 
 class RespostaInline(admin.TabularInline):
     model = Resposta
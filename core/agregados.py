@@ -0,0 +1,378 @@
+"""
+Agregados diários das estatísticas, por jogador e globais.
+
+O painel de estatísticas do jogador (tendências, acerto por categoria e
+percentil) é montado apenas a partir das tabelas EstatisticaDiariaJogador e
+EstatisticaDiariaGlobal, com duas consultas indexadas por período, sem ler
+partidas nem respostas. As tabelas são preenchidas de forma incremental pelo
+comando agregar_estatisticas, que guarda em MarcaAgregacao até onde cada
+fonte já foi processada:
+
+- partidas: marca sobre Game.id. Partidas terminam fora da ordem dos ids,
+  então a marca só avança até a primeira partida ainda em andamento; as
+  encerradas acima dela ficam registradas em `processados` até a marca
+  passar por elas. Uma partida parada há mais de ESPERA_ABANDONADAS vezes o
+  tempo limite do coletor de partidas abandonadas deixa de segurar a marca
+  (e, se encerrada depois, não entra nos agregados), para que uma partida
+  esquecida não faça `processados` crescer sem limite;
+- respostas: marca sobre RespostaEvento.id (tabela somente inclusão).
+
+O percentil do jogador vem do histograma das pontuações das partidas
+completadas, somado sobre os dias do período.
+"""
+import datetime
+import time
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .abandonadas import tempo_limite_padrao
+from .models import (
+    EstatisticaDiariaGlobal, EstatisticaDiariaJogador, Game, MarcaAgregacao, PontuacaoJogo, Pergunta,
+    RespostaEvento,
+)
+
+MARCA_PARTIDAS = 'partidas'
+MARCA_RESPOSTAS = 'respostas'
+
+# Registros de origem processados por transação
+TAMANHO_LOTE = 500
+
+# Múltiplo do tempo limite de abandono (PARTIDA_ABANDONADA_MINUTOS) após o
+# qual uma partida em andamento deixa de segurar a marca das partidas
+ESPERA_ABANDONADAS = 2
+
+# Largura das faixas do histograma de pontuações
+LARGURA_FAIXA = 50
+
+# Dias exibidos no painel do jogador
+DIAS_PAINEL = 30
+
+# Campos somados ao mesclar um agregado novo em um existente
+CAMPOS_SOMA = (
+    'partidas', 'partidas_completadas', 'vitorias', 'soma_pontuacao', 'soma_duracao', 'respostas', 'acertos',
+)
+
+NOMES_CATEGORIAS = dict(Pergunta.CATEGORY_CHOICES)
+
+
+def _dia(momento):
+    if timezone.is_aware(momento):
+        momento = timezone.localtime(momento)
+    return momento.date()
+
+
+def faixa(pontuacao):
+    """Início da faixa do histograma (chave JSON) de uma pontuação"""
+    return str(pontuacao // LARGURA_FAIXA * LARGURA_FAIXA)
+
+
+def _somar_pares(destino, origem):
+    for chave, (respostas, acertos) in origem.items():
+        atual = destino.get(chave, [0, 0])
+        destino[chave] = [atual[0] + respostas, atual[1] + acertos]
+
+
+def _mesclar(registro, novo):
+    for campo in CAMPOS_SOMA:
+        if hasattr(registro, campo):
+            setattr(registro, campo, getattr(registro, campo) + getattr(novo, campo))
+    if hasattr(registro, 'maior_pontuacao') and novo.partidas_completadas:
+        registro.maior_pontuacao = max(registro.maior_pontuacao, novo.maior_pontuacao)
+    _somar_pares(registro.por_categoria, novo.por_categoria)
+    if hasattr(registro, 'histograma'):
+        for chave, quantidade in novo.histograma.items():
+            registro.histograma[chave] = registro.histograma.get(chave, 0) + quantidade
+
+
+def _gravar(por_jogador, por_dia):
+    """
+    Mescla os agregados do lote nas linhas existentes (travadas) e cria as
+    que faltam: uma leitura, um bulk_update e um bulk_create por tabela
+    """
+    if por_jogador:
+        existentes = {
+            (registro.jogador_id, registro.dia): registro
+            for registro in EstatisticaDiariaJogador.objects.select_for_update().filter(
+                jogador_id__in={jogador_id for jogador_id, _ in por_jogador},
+                dia__in={dia for _, dia in por_jogador},
+            )
+        }
+        _gravar_tabela(EstatisticaDiariaJogador, existentes, por_jogador)
+    if por_dia:
+        existentes = {
+            registro.dia: registro
+            for registro in EstatisticaDiariaGlobal.objects.select_for_update().filter(dia__in=list(por_dia))
+        }
+        _gravar_tabela(EstatisticaDiariaGlobal, existentes, por_dia)
+
+
+def _gravar_tabela(modelo, existentes, novos):
+    atualizados = []
+    criados = []
+    for chave, novo in novos.items():
+        registro = existentes.get(chave)
+        if registro is None:
+            criados.append(novo)
+        else:
+            _mesclar(registro, novo)
+            atualizados.append(registro)
+    campos = [
+        campo.name for campo in modelo._meta.concrete_fields
+        if not campo.primary_key and campo.name not in ('jogador', 'dia')
+    ]
+    if atualizados:
+        modelo.objects.bulk_update(atualizados, campos)
+    if criados:
+        modelo.objects.bulk_create(criados)
+
+
+def _marca(nome):
+    """Marca da fonte, travada: execuções simultâneas do comando se revezam"""
+    MarcaAgregacao.objects.get_or_create(nome=nome)
+    return MarcaAgregacao.objects.select_for_update().get(nome=nome)
+
+
+# ----------------------------------------------------------------------
+# Partidas
+# ----------------------------------------------------------------------
+
+def agregar_partidas_lote(tamanho_lote=TAMANHO_LOTE):
+    """
+    Agrega até `tamanho_lote` partidas encerradas ainda não processadas e
+    avança a marca. Retorna a quantidade de partidas agregadas.
+    """
+    with transaction.atomic():
+        marca = _marca(MARCA_PARTIDAS)
+        processados = set(marca.processados)
+        jogos = list(
+            Game.objects
+            .filter(id__gt=marca.ultimo_id)
+            .exclude(status='IN_PROGRESS')
+            .exclude(id__in=processados)
+            .order_by('id')
+            .values('id', 'status', 'inicio_tempo', 'fim_tempo', 'ganhador_id')[:tamanho_lote]
+        )
+
+        por_jogo = {jogo['id']: jogo for jogo in jogos}
+        por_jogador = {}
+        por_dia = {}
+        pontuacoes = PontuacaoJogo.objects.filter(jogo_id__in=list(por_jogo)).values_list(
+            'jogo_id', 'jogador_id', 'pontuacao'
+        )
+        for jogo_id, jogador_id, pontuacao in pontuacoes:
+            jogo = por_jogo[jogo_id]
+            dia = _dia(jogo['fim_tempo'] or jogo['inicio_tempo'])
+            duracao = 0.0
+            if jogo['inicio_tempo'] and jogo['fim_tempo']:
+                duracao = max((jogo['fim_tempo'] - jogo['inicio_tempo']).total_seconds(), 0.0)
+            completada = jogo['status'] == 'COMPLETED'
+
+            diario = por_jogador.get((jogador_id, dia))
+            if diario is None:
+                diario = por_jogador[(jogador_id, dia)] = EstatisticaDiariaJogador(jogador_id=jogador_id, dia=dia)
+            global_ = por_dia.get(dia)
+            if global_ is None:
+                global_ = por_dia[dia] = EstatisticaDiariaGlobal(dia=dia)
+
+            for registro in (diario, global_):
+                registro.partidas += 1
+                registro.soma_duracao += duracao
+                if completada:
+                    registro.partidas_completadas += 1
+                    registro.soma_pontuacao += pontuacao
+            if completada:
+                diario.maior_pontuacao = max(diario.maior_pontuacao, pontuacao)
+                global_.histograma[faixa(pontuacao)] = global_.histograma.get(faixa(pontuacao), 0) + 1
+            if jogo['ganhador_id'] == jogador_id:
+                diario.vitorias += 1
+
+        _gravar(por_jogador, por_dia)
+
+        # A marca avança até a primeira partida ainda não agregada, exceto as
+        # em andamento paradas há muito tempo
+        processados.update(por_jogo)
+        corte = timezone.now() - ESPERA_ABANDONADAS * tempo_limite_padrao()
+        fronteira = (
+            Game.objects
+            .filter(id__gt=marca.ultimo_id)
+            .exclude(id__in=processados)
+            .exclude(Q(status='IN_PROGRESS') & Q(ultima_atividade__lt=corte))
+            .order_by('id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if fronteira is None:
+            marca.ultimo_id = max(processados, default=marca.ultimo_id)
+        else:
+            marca.ultimo_id = max(marca.ultimo_id, fronteira - 1)
+        marca.processados = sorted(jogo_id for jogo_id in processados if jogo_id > marca.ultimo_id)
+        marca.save()
+    return len(jogos)
+
+
+# ----------------------------------------------------------------------
+# Respostas
+# ----------------------------------------------------------------------
+
+def agregar_respostas_lote(tamanho_lote=TAMANHO_LOTE):
+    """
+    Agrega até `tamanho_lote` eventos de resposta posteriores à marca.
+    Retorna a quantidade de respostas agregadas.
+    """
+    with transaction.atomic():
+        marca = _marca(MARCA_RESPOSTAS)
+        eventos = list(
+            RespostaEvento.objects
+            .filter(id__gt=marca.ultimo_id)
+            .order_by('id')
+            .values_list('id', 'jogador_id', 'pergunta_id', 'correta', 'respondida_em')[:tamanho_lote]
+        )
+        if not eventos:
+            return 0
+
+        categorias = dict(
+            Pergunta.objects
+            .filter(id__in={evento[2] for evento in eventos})
+            .values_list('id', 'category')
+        )
+        por_jogador = {}
+        por_dia = {}
+        for _, jogador_id, pergunta_id, correta, respondida_em in eventos:
+            dia = _dia(respondida_em)
+            categoria = categorias.get(pergunta_id, 'REMOVIDA')
+            diario = por_jogador.get((jogador_id, dia))
+            if diario is None:
+                diario = por_jogador[(jogador_id, dia)] = EstatisticaDiariaJogador(jogador_id=jogador_id, dia=dia)
+            global_ = por_dia.get(dia)
+            if global_ is None:
+                global_ = por_dia[dia] = EstatisticaDiariaGlobal(dia=dia)
+            for registro in (diario, global_):
+                registro.respostas += 1
+                registro.acertos += correta
+                _somar_pares(registro.por_categoria, {categoria: (1, int(correta))})
+
+        _gravar(por_jogador, por_dia)
+        marca.ultimo_id = eventos[-1][0]
+        marca.save(update_fields=['ultimo_id', 'atualizado_em'])
+    return len(eventos)
+
+
+def agregar(tamanho_lote=TAMANHO_LOTE, max_lotes=None):
+    """
+    Processa partidas e respostas novas até esgotá-las (ou até `max_lotes`
+    lotes de cada). Retorna partidas, respostas, lotes e o tempo gasto.
+    """
+    inicio = time.perf_counter()
+    totais = {'partidas': 0, 'respostas': 0, 'lotes': 0}
+    for chave, funcao in (('partidas', agregar_partidas_lote), ('respostas', agregar_respostas_lote)):
+        lotes = 0
+        while max_lotes is None or lotes < max_lotes:
+            quantidade = funcao(tamanho_lote)
+            if not quantidade:
+                break
+            totais[chave] += quantidade
+            lotes += 1
+        totais['lotes'] += lotes
+    totais['tempo_ms'] = round((time.perf_counter() - inicio) * 1000, 3)
+    return totais
+
+
+def reiniciar():
+    """Apaga os agregados e as marcas: a próxima execução reprocessa tudo"""
+    with transaction.atomic():
+        EstatisticaDiariaJogador.objects.all().delete()
+        EstatisticaDiariaGlobal.objects.all().delete()
+        MarcaAgregacao.objects.filter(nome__in=[MARCA_PARTIDAS, MARCA_RESPOSTAS]).delete()
+
+
+# ----------------------------------------------------------------------
+# Painel
+# ----------------------------------------------------------------------
+
+def percentil(histograma, valor):
+    """
+    Percentual das partidas do histograma com pontuação abaixo de `valor`,
+    interpolando dentro da faixa que o contém (None sem partidas)
+    """
+    total = sum(histograma.values())
+    if not total:
+        return None
+    abaixo = 0.0
+    for inicio, quantidade in histograma.items():
+        inicio = int(inicio)
+        if inicio + LARGURA_FAIXA <= valor:
+            abaixo += quantidade
+        elif inicio <= valor:
+            abaixo += quantidade * (valor - inicio) / LARGURA_FAIXA
+    return round(abaixo / total * 100, 1)
+
+
+def _taxa(acertos, respostas):
+    return round(acertos / respostas * 100, 1) if respostas else None
+
+
+def painel_jogador(user, dias=DIAS_PAINEL, hoje=None):
+    """
+    Tendência diária, acerto por categoria (comparado ao geral) e percentil
+    da pontuação média do jogador nos últimos `dias` dias (duas consultas)
+    """
+    hoje = hoje or _dia(timezone.now())
+    inicio = hoje - datetime.timedelta(days=dias - 1)
+    linhas = list(
+        EstatisticaDiariaJogador.objects
+        .filter(jogador=user, dia__gte=inicio)
+        .order_by('dia')
+    )
+    globais = list(
+        EstatisticaDiariaGlobal.objects
+        .filter(dia__gte=inicio)
+        .values('por_categoria', 'histograma')
+    )
+
+    tendencia = []
+    for linha in linhas:
+        tendencia.append({
+            'dia': linha.dia,
+            'partidas': linha.partidas,
+            'vitorias': linha.vitorias,
+            'media': round(linha.soma_pontuacao / linha.partidas_completadas, 1)
+            if linha.partidas_completadas else None,
+            'acerto': _taxa(linha.acertos, linha.respostas),
+        })
+    maior_media = max((dia['media'] for dia in tendencia if dia['media']), default=0)
+    for dia in tendencia:
+        # Largura da barra da média, relativa ao melhor dia do período
+        dia['barra'] = round(dia['media'] / maior_media * 100) if maior_media and dia['media'] else 0
+
+    categorias_jogador = {}
+    categorias_geral = {}
+    histograma = {}
+    for linha in linhas:
+        _somar_pares(categorias_jogador, linha.por_categoria)
+    for linha in globais:
+        _somar_pares(categorias_geral, linha['por_categoria'])
+        for chave, quantidade in linha['histograma'].items():
+            histograma[chave] = histograma.get(chave, 0) + quantidade
+
+    categorias = []
+    for categoria, (respostas, acertos) in sorted(categorias_jogador.items()):
+        respostas_geral, acertos_geral = categorias_geral.get(categoria, (0, 0))
+        categorias.append({
+            'categoria': NOMES_CATEGORIAS.get(categoria, categoria),
+            'respostas': respostas,
+            'acerto': _taxa(acertos, respostas),
+            'acerto_geral': _taxa(acertos_geral, respostas_geral),
+        })
+
+    completadas = sum(linha.partidas_completadas for linha in linhas)
+    media = sum(linha.soma_pontuacao for linha in linhas) / completadas if completadas else None
+    return {
+        'dias': dias,
+        'tendencia': tendencia,
+        'categorias': categorias,
+        'partidas': sum(linha.partidas for linha in linhas),
+        'media': round(media, 1) if media is not None else None,
+        'percentil': percentil(histograma, media) if media is not None else None,
+    }
@@ -0,0 +1,181 @@
+"""
+Análise das perguntas a partir dos eventos de resposta (RespostaEvento).
+
+Os eventos são lidos em blocos por chave (id) diretamente para arrays
+NumPy, sem instanciar modelos, e todas as estatísticas são calculadas de
+forma vetorizada com pandas:
+
+- dificuldade: índice de acerto (p), uso de dica e tempo mediano por pergunta;
+- discriminação: D = p(27% melhores) - p(27% piores), com os jogadores
+  ordenados pela taxa de acerto geral;
+- distratores: frequência de escolha de cada alternativa, incluindo as
+  nunca escolhidas;
+- categorias: taxa de acerto por categoria de pergunta.
+"""
+import numpy as np
+import pandas as pd
+
+from .models import Pergunta, Resposta, RespostaEvento
+
+# Eventos lidos por consulta
+TAMANHO_LOTE = 50000
+
+# Fração dos respondentes em cada grupo extremo do índice de discriminação
+FRACAO_GRUPO = 0.27
+
+# Distrator escolhido por menos que esta fração das respostas é considerado fraco
+FREQUENCIA_MINIMA_DISTRATOR = 0.05
+
+# Respostas mínimas para que os índices de uma pergunta sejam calculados
+MINIMO_RESPOSTAS = 10
+
+CAMPOS_EVENTO = ('id', 'jogador_id', 'pergunta_id', 'resposta_id', 'correta', 'usou_dica', 'tempo_ms')
+
+
+def carregar_respostas(tamanho_lote=TAMANHO_LOTE):
+    """
+    DataFrame com todos os eventos de resposta, lido em blocos. Tipos
+    compactos: ids em int32, indicadores em bool e tempo em float32 (NaN
+    quando desconhecido).
+    """
+    blocos = []
+    ultimo_id = 0
+    while True:
+        linhas = list(
+            RespostaEvento.objects
+            .filter(id__gt=ultimo_id)
+            .order_by('id')
+            .values_list(*CAMPOS_EVENTO)[:tamanho_lote]
+        )
+        if not linhas:
+            break
+        ultimo_id = linhas[-1][0]
+        # tempo_ms nulo vira -1 para caber no array inteiro
+        bloco = np.array(
+            [linha[:6] + (-1 if linha[6] is None else linha[6],) for linha in linhas],
+            dtype=np.int64,
+        )
+        blocos.append(bloco)
+        if len(linhas) < tamanho_lote:
+            break
+
+    dados = np.concatenate(blocos) if blocos else np.empty((0, len(CAMPOS_EVENTO)), dtype=np.int64)
+    tempo = dados[:, 6].astype(np.float32)
+    tempo[dados[:, 6] < 0] = np.nan
+    return pd.DataFrame({
+        'jogador_id': dados[:, 1].astype(np.int32),
+        'pergunta_id': dados[:, 2].astype(np.int32),
+        'resposta_id': dados[:, 3].astype(np.int32),
+        'correta': dados[:, 4].astype(bool),
+        'usou_dica': dados[:, 5].astype(bool),
+        'tempo_ms': tempo,
+    })
+
+
+def _catalogo_perguntas():
+    perguntas = pd.DataFrame.from_records(
+        Pergunta.objects.values('id', 'codigo', 'category', 'posicao_tabuleiro'),
+        columns=['id', 'codigo', 'category', 'posicao_tabuleiro'],
+    )
+    return perguntas.rename(columns={'id': 'pergunta_id'})
+
+
+def dificuldade(respostas, minimo=MINIMO_RESPOSTAS):
+    """Por pergunta: respostas, índice de acerto, uso de dica, tempo mediano e discriminação"""
+    tabela = (
+        respostas.groupby('pergunta_id')
+        .agg(
+            respostas=('correta', 'size'),
+            indice_acerto=('correta', 'mean'),
+            taxa_dica=('usou_dica', 'mean'),
+            tempo_mediano_ms=('tempo_ms', 'median'),
+        )
+    )
+    tabela['discriminacao'] = discriminacao(respostas, minimo)
+    tabela.loc[tabela['respostas'] < minimo, ['indice_acerto', 'discriminacao']] = np.nan
+    return tabela.reset_index()
+
+
+def discriminacao(respostas, minimo=MINIMO_RESPOSTAS):
+    """
+    Índice de discriminação por pergunta (Series indexada por pergunta_id).
+    Cada jogador conta uma vez por pergunta (sua taxa de acerto nela); os
+    respondentes de cada pergunta são ordenados pela taxa de acerto geral
+    do jogador e comparados os grupos extremos de FRACAO_GRUPO.
+    """
+    if respostas.empty:
+        return pd.Series(dtype=float)
+
+    nota = respostas.groupby('jogador_id')['correta'].mean().rename('nota')
+    por_jogador = (
+        respostas.groupby(['pergunta_id', 'jogador_id'])['correta'].mean()
+        .rename('acerto')
+        .reset_index()
+        .join(nota, on='jogador_id')
+    )
+    por_jogador['ordem'] = por_jogador.groupby('pergunta_id')['nota'].rank(method='first', pct=True)
+
+    superior = por_jogador[por_jogador['ordem'] > 1 - FRACAO_GRUPO].groupby('pergunta_id')['acerto'].mean()
+    inferior = por_jogador[por_jogador['ordem'] <= FRACAO_GRUPO].groupby('pergunta_id')['acerto'].mean()
+    indice = superior.sub(inferior)
+
+    respondentes = por_jogador.groupby('pergunta_id').size()
+    return indice.where(respondentes.reindex(indice.index) >= minimo)
+
+
+def distratores(respostas):
+    """
+    Frequência de escolha de cada alternativa de cada pergunta respondida,
+    com as alternativas nunca escolhidas (frequência 0). `fraco` marca os
+    distratores escolhidos por menos de FREQUENCIA_MINIMA_DISTRATOR.
+    """
+    alternativas = pd.DataFrame.from_records(
+        Resposta.objects
+        .filter(pergunta_id__in=respostas['pergunta_id'].unique().tolist())
+        .values('id', 'pergunta_id', 'e_correto'),
+        columns=['id', 'pergunta_id', 'e_correto'],
+    ).rename(columns={'id': 'resposta_id'})
+
+    escolhas = respostas.groupby(['pergunta_id', 'resposta_id']).size().rename('escolhas').reset_index()
+    tabela = alternativas.merge(escolhas, on=['pergunta_id', 'resposta_id'], how='outer')
+    tabela['escolhas'] = tabela['escolhas'].fillna(0).astype(np.int64)
+    tabela['e_correto'] = tabela['e_correto'].fillna(False).astype(bool)
+
+    total = tabela.groupby('pergunta_id')['escolhas'].transform('sum')
+    tabela['frequencia'] = (tabela['escolhas'] / total.where(total > 0)).fillna(0.0)
+    tabela['fraco'] = ~tabela['e_correto'] & (tabela['frequencia'] < FREQUENCIA_MINIMA_DISTRATOR)
+    return tabela.sort_values(['pergunta_id', 'resposta_id']).reset_index(drop=True)
+
+
+def por_categoria(respostas, perguntas):
+    """Respostas, perguntas distintas e taxa de acerto por categoria"""
+    tabela = respostas.merge(perguntas[['pergunta_id', 'category']], on='pergunta_id', how='left')
+    tabela['category'] = tabela['category'].fillna('REMOVIDA')
+    return (
+        tabela.groupby('category')
+        .agg(
+            respostas=('correta', 'size'),
+            perguntas=('pergunta_id', 'nunique'),
+            taxa_acerto=('correta', 'mean'),
+            taxa_dica=('usou_dica', 'mean'),
+        )
+        .reset_index()
+    )
+
+
+def analisar(respostas=None, minimo=MINIMO_RESPOSTAS, tamanho_lote=TAMANHO_LOTE):
+    """
+    Executa todas as análises. Retorna {'perguntas', 'distratores',
+    'categorias'}: DataFrames prontos para exportação.
+    """
+    if respostas is None:
+        respostas = carregar_respostas(tamanho_lote)
+    catalogo = _catalogo_perguntas()
+    perguntas = dificuldade(respostas, minimo).merge(catalogo, on='pergunta_id', how='left')
+    colunas = ['pergunta_id', 'codigo', 'category', 'posicao_tabuleiro']
+    perguntas = perguntas[colunas + [c for c in perguntas.columns if c not in colunas]]
+    return {
+        'perguntas': perguntas,
+        'distratores': distratores(respostas),
+        'categorias': por_categoria(respostas, catalogo),
+    }
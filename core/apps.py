@@ -5,5 +5,6 @@ class CoreConfig(AppConfig):
     name = 'core'
 
     def ready(self):
-        """Importa os signals quando o app é inicializado"""
+        """Importa os signals e as verificações quando o app é inicializado"""
+        import core.checks  # noqa
         import core.signals  # noqa
@@ -0,0 +1,180 @@
+"""
+Cache em memória do banco de perguntas do tabuleiro.
+
+O banco completo (perguntas com suas respostas, agrupadas por casa do
+tabuleiro) é carregado uma única vez por processo e reaproveitado entre as
+requisições. Uma versão indica quando o banco mudou: os signals de
+Pergunta/Resposta e o script de importação geram uma nova versão, e cada
+processo reconstrói sua cópia na próxima leitura. A versão é gravada no
+banco de dados (core.versoes) e copiada no alias de cache 'perguntas' por
+settings.BANCO_PERGUNTAS_VALIDADE_VERSAO segundos: com um cache
+compartilhado (Redis ou arquivo) a invalidação é imediata; com o locmem,
+que é local a cada processo, os demais processos a percebem quando a cópia
+expira.
+"""
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from . import versoes
+from .models import Pergunta, Resposta
+
+CHAVE_VERSAO = 'core:banco_perguntas:versao'
+
+# Alias do cache onde fica a versão do banco (settings.CACHES)
+ALIAS_CACHE = 'perguntas'
+
+# Casas do tabuleiro (a casa 0 é a saída)
+CASAS_TABULEIRO = range(1, 22)
+
+_lock = threading.Lock()
+_banco = None
+
+
+class BancoPerguntas:
+    """
+    Foto imutável do banco de perguntas.
+
+    - perguntas: {pergunta_id: dados da pergunta}
+    - respostas: {resposta_id: dados da resposta}
+    - por_casa: {posicao_tabuleiro: tupla de perguntas}
+
+    O sorteio das perguntas fica em core.selecao_perguntas.
+    """
+    __slots__ = ('versao', 'perguntas', 'respostas', 'por_casa')
+
+    def __init__(self, versao, perguntas, respostas, por_casa):
+        self.versao = versao
+        self.perguntas = perguntas
+        self.respostas = respostas
+        self.por_casa = por_casa
+
+
+def _cache():
+    return caches[ALIAS_CACHE]
+
+
+def validade_versao():
+    """Segundos durante os quais a cópia de uma versão no cache é usada"""
+    return getattr(settings, 'BANCO_PERGUNTAS_VALIDADE_VERSAO', 5)
+
+
+def _versao_atual():
+    """Retorna a versão vigente do banco, relida do banco de dados quando a cópia no cache expira"""
+    versao = _cache().get(CHAVE_VERSAO)
+    if versao is None:
+        versao = versoes.ler(CHAVE_VERSAO)
+        _cache().set(CHAVE_VERSAO, versao, timeout=validade_versao())
+    return versao
+
+
+def _construir(versao):
+    """Carrega todas as perguntas e respostas do banco de dados (2 consultas)"""
+    perguntas = {}
+    por_casa = {}
+    for pergunta in Pergunta.objects.all():
+        dados = {
+            'id': pergunta.id,
+            'codigo': pergunta.codigo,
+            'text': pergunta.text,
+            'category': pergunta.get_category_display(),
+            'posicao_tabuleiro': pergunta.posicao_tabuleiro,
+            'dica': pergunta.dica,
+            'explicacao': pergunta.explicacao,
+            'imagem_url': pergunta.imagem.url if pergunta.imagem else None,
+            'respostas_registradas': pergunta.respostas_registradas,
+            'acertos_registrados': pergunta.acertos_registrados,
+            'respostas': [],
+            'resposta_correta': None,
+        }
+        perguntas[pergunta.id] = dados
+        por_casa.setdefault(pergunta.posicao_tabuleiro, []).append(dados)
+
+    respostas = {}
+    campos = ('id', 'pergunta_id', 'text', 'e_correto')
+    for resposta in Resposta.objects.order_by('id').values(*campos):
+        pergunta = perguntas.get(resposta['pergunta_id'])
+        if pergunta is None:
+            continue
+        respostas[resposta['id']] = resposta
+        pergunta['respostas'].append(resposta)
+        if resposta['e_correto'] and pergunta['resposta_correta'] is None:
+            pergunta['resposta_correta'] = resposta
+
+    por_casa = {casa: tuple(lista) for casa, lista in por_casa.items()}
+    return BancoPerguntas(versao, perguntas, respostas, por_casa)
+
+
+def obter_banco():
+    """
+    Retorna o banco de perguntas em memória, reconstruindo-o apenas
+    quando a versão no cache for diferente da carregada neste processo.
+    """
+    global _banco
+    versao = _versao_atual()
+    banco = _banco
+    if banco is not None and banco.versao == versao:
+        return banco
+
+    with _lock:
+        if _banco is None or _banco.versao != versao:
+            _banco = _construir(versao)
+        return _banco
+
+
+async def aobter_banco():
+    """
+    Versão assíncrona de obter_banco: com o banco em memória atualizado,
+    apenas a versão é lida (cache.aget); a reconstrução, rara, roda em thread.
+    """
+    versao = await _cache().aget(CHAVE_VERSAO)
+    banco = _banco
+    if versao is not None and banco is not None and banco.versao == versao:
+        return banco
+    return await sync_to_async(obter_banco)()
+
+
+def invalidar():
+    """Gera uma nova versão do banco, forçando a recarga em todos os processos"""
+    _cache().set(CHAVE_VERSAO, versoes.gravar(CHAVE_VERSAO), timeout=validade_versao())
+
+
+def dados_publicos(pergunta):
+    """
+    Dados da pergunta enviados ao navegador, sem revelar a resposta correta.
+    O texto da dica só é entregue pela ação usar_dica, que registra o uso.
+    """
+    return {
+        'pergunta': {
+            'id': pergunta['id'],
+            'text': pergunta['text'],
+            'category': pergunta['category'],
+            'tem_dica': bool(pergunta['dica']),
+            'imagem_url': pergunta['imagem_url'],
+        },
+        'respostas': [
+            {'id': resposta['id'], 'text': resposta['text']}
+            for resposta in pergunta['respostas']
+        ],
+    }
+
+
+def baralho_publico(baralho):
+    """{casa: dados públicos da pergunta} para as casas do baralho ainda válidas"""
+    perguntas = obter_banco().perguntas
+    resultado = {}
+    for casa, pergunta_id in zip(CASAS_TABULEIRO, baralho):
+        pergunta = perguntas.get(pergunta_id)
+        if pergunta is not None:
+            resultado[casa] = dados_publicos(pergunta)
+    return resultado
+
+
+def obter_pergunta(pergunta_id):
+    return obter_banco().perguntas.get(pergunta_id)
+
+
+def obter_resposta(resposta_id):
+    return obter_banco().respostas.get(resposta_id)
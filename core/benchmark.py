@@ -0,0 +1,398 @@
+"""
+Benchmark e regressão de consultas das views do core.
+
+Popula um conjunto de dados realista (usuários, partidas finalizadas e o
+banco de perguntas completo), exercita cada ação do TabuleiroTemplateView,
+o RankingView em todas as ordenações e o EstatisticasJogadorView, e mede
+por endpoint: quantidade de consultas SQL, tempo de parede e pico de
+memória. Usado pelo comando `benchmark_views` (resultados em JSON,
+comparáveis entre commits: tempo ou memória acima da execução anterior é
+acusado como regressão) e pelos testes de orçamento em
+core/tests.py.
+"""
+import datetime
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Game, Jogador, PontuacaoJogo, Pergunta, Resposta
+from .estatisticas import recalcular_estatisticas
+from . import engine, ranking
+
+# O banco de teste não passa pelo collectstatic: sem o manifesto do WhiteNoise
+# os templates usam os nomes de arquivo originais
+STORAGES_BENCHMARK = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Caches locais ao processo: a limpeza feita antes da medição nunca atinge
+# um cache compartilhado (ex.: o Redis de produção)
+CACHES_BENCHMARK = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'benchmark-{alias}'}
+    for alias in ('default', 'perguntas', 'ranking')
+}
+
+# Casas do tabuleiro que possuem perguntas (zonas)
+CASAS_PERGUNTA = (3, 8, 12, 16, 20)
+RESPOSTAS_POR_PERGUNTA = 4
+
+# Comandos de controle de transação, fora da contagem de consultas: dentro de
+# TestCase cada atomic() vira SAVEPOINT/RELEASE e, no comando benchmark_views
+# (autocommit), BEGIN/COMMIT; contá-los faria o mesmo código ter números
+# diferentes nos dois ambientes
+CONTROLE_TRANSACAO = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+
+# Máximo de consultas SQL permitido por endpoint (sem o controle de
+# transação). Inclui a leitura do usuário (a sessão vem do cache,
+# SESSION_ENGINE cached_db)
+ORCAMENTOS = {
+    'tabuleiro_novo_jogo': 6,
+    'tabuleiro_continuar': 2,
+    # Leitura do acerto corrente e das perguntas já usadas na partida (seleção
+    # adaptativa) e um UPDATE condicional que grava a pergunta em aberto
+    'get_pergunta': 3,
+    # Inclui o UPDATE condicional que consome a pergunta em aberto
+    'responder_pergunta': 5,
+    # Resposta no modo baralho: a pergunta já veio com a página
+    'responder_baralho': 5,
+    'check_status': 3,
+    # View assíncrona: mesmas consultas, sem ocupar uma thread na espera
+    'acoes_get_pergunta': 3,
+    'acoes_check_status': 3,
+    # Turno completo em uma requisição: responder_pergunta + check_status
+    # (mesmas consultas das duas ações, mas uma única ida e volta)
+    'turno_lote': 7,
+    # Lançamento do dado: trava da partida, movimento e, em casa de bônus ou
+    # penalidade, os pontos
+    'rolar_dado': 6,
+    # Lançamento que chega à casa final e encerra a partida
+    'rolar_dado_chegada': 8,
+    # Apenas lê a pontuação calculada pelo servidor
+    'update_score': 3,
+    # Encerrar a partida só grava o evento na caixa de saída; as estatísticas
+    # do jogador são atualizadas pelo worker (processar_eventos_fim_de_jogo)
+    'update_score_finalizar': 6,
+    'cancel_game': 5,
+    # Inclui os agregados diários do jogador e globais do painel
+    'estatisticas': 6,
+    # Página além da foto do ranking (paginação por chave)
+    'ranking_pagina_profunda': 3,
+    # Usuário e, no pior caso, a reconstrução da foto do ranking
+    **{
+        f'ranking_{order_by}_{direcao}': 2
+        for order_by in ranking.CAMPOS_ORDENACAO
+        for direcao in ranking.DIRECOES
+    },
+}
+
+# Pico de memória alocado por requisição (tracemalloc). Ao contrário do
+# tempo, não depende da máquina; o tempo só é comparado com uma execução
+# anterior (regressoes)
+MEMORIA_MAXIMA_KB = 1024
+
+# Folga aceita em relação à execução anterior antes de acusar regressão
+TOLERANCIA_TEMPO = 0.5
+TOLERANCIA_MEMORIA = 0.25
+# Diferenças de tempo menores que isto são ruído de medição
+TEMPO_MINIMO_MS = 2.0
+
+
+def popular_dados(usuarios=2000, jogos=20000, perguntas_por_casa=20, semente=42, lote=1000):
+    """
+    Cria o conjunto de dados do benchmark com bulk_create e recalcula as
+    estatísticas dos jogadores. Retorna a lista de usuários criados.
+    """
+    rng = random.Random(semente)
+    agora = timezone.now()
+
+    users = User.objects.bulk_create(
+        [User(username=f'bench{i:06d}') for i in range(usuarios)], batch_size=lote
+    )
+    Jogador.objects.bulk_create(
+        [Jogador(user_jogador=user) for user in users], batch_size=lote, ignore_conflicts=True
+    )
+
+    # Banco de perguntas completo: `perguntas_por_casa` perguntas em cada zona
+    perguntas = []
+    numero = 0
+    for casa in CASAS_PERGUNTA:
+        for _ in range(perguntas_por_casa):
+            numero += 1
+            perguntas.append(Pergunta(
+                codigo=f'P{numero:03d}',
+                text=f'Pergunta {numero} da casa {casa}',
+                category=rng.choice(Pergunta.CATEGORY_CHOICES)[0],
+                posicao_tabuleiro=casa,
+                dica=f'Dica da pergunta {numero}',
+                explicacao=f'Explicação da pergunta {numero}',
+            ))
+    perguntas = Pergunta.objects.bulk_create(perguntas, batch_size=lote)
+    respostas = []
+    for indice, pergunta in enumerate(perguntas, start=1):
+        correta = rng.randrange(RESPOSTAS_POR_PERGUNTA)
+        for k in range(RESPOSTAS_POR_PERGUNTA):
+            respostas.append(Resposta(
+                codigo=f'R{indice:03d}{k + 1:02d}',
+                pergunta=pergunta,
+                text=f'Resposta {k + 1}',
+                e_correto=(k == correta),
+            ))
+    Resposta.objects.bulk_create(respostas, batch_size=lote)
+
+    # Histórico de partidas finalizadas
+    partidas = []
+    donos = []
+    pontuacoes = []
+    for _ in range(jogos):
+        user = rng.choice(users)
+        inicio = agora - datetime.timedelta(days=rng.uniform(0, 365))
+        pontuacao = rng.randint(-100, 500)
+        status = 'COMPLETED' if rng.random() < 0.8 else 'CANCELLED'
+        partidas.append(Game(
+            status=status,
+            inicio_tempo=inicio,
+            fim_tempo=inicio + datetime.timedelta(seconds=rng.randint(60, 1800)),
+            ganhador=user if status == 'COMPLETED' and pontuacao > 0 else None,
+        ))
+        donos.append(user)
+        pontuacoes.append(pontuacao)
+    partidas = Game.objects.bulk_create(partidas, batch_size=lote)
+
+    Game.partidas.through.objects.bulk_create(
+        [Game.partidas.through(game_id=jogo.id, user_id=user.id) for jogo, user in zip(partidas, donos)],
+        batch_size=lote,
+    )
+    PontuacaoJogo.objects.bulk_create(
+        [
+            PontuacaoJogo(jogo=jogo, jogador=user, pontuacao=pontuacao)
+            for jogo, user, pontuacao in zip(partidas, donos, pontuacoes)
+        ],
+        batch_size=lote,
+    )
+
+    recalcular_estatisticas()
+    return users
+
+
+def medir(funcao):
+    """Executa `funcao` medindo consultas, tempo de parede e pico de memória"""
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            resposta = funcao()
+            duracao = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    if resposta.status_code >= 400:
+        raise AssertionError(f'Resposta inesperada ({resposta.status_code}): {resposta.content[:200]!r}')
+    return contar_consultas(consultas.captured_queries), duracao, pico
+
+
+def contar_consultas(consultas):
+    """Consultas capturadas, sem os comandos de controle de transação"""
+    return sum(
+        1 for consulta in consultas
+        if not consulta['sql'].lstrip().upper().startswith(CONTROLE_TRANSACAO)
+    )
+
+
+class Cenario:
+    """
+    Prepara um jogador com partida em andamento e expõe uma função por
+    endpoint. A preparação (login, criação da partida, sorteio da pergunta)
+    fica fora da medição.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.client = Client()
+        self.client.force_login(user)
+
+    def _nova_partida(self):
+        Game.objects.filter(partidas=self.user, status='IN_PROGRESS').update(status='CANCELLED')
+        self.client.get(reverse('tabuleiro'))
+        return Game.objects.filter(partidas=self.user, status='IN_PROGRESS').values_list('id', flat=True).get()
+
+    def _acao(self, jogo_id, **dados):
+        dados['jogo_id'] = jogo_id
+        return lambda: self.client.post(reverse('tabuleiro_continue', args=[jogo_id]), dados)
+
+    def _acao_async(self, jogo_id, **dados):
+        """Ação enviada à view assíncrona (TabuleiroAcoesView)"""
+        dados['jogo_id'] = jogo_id
+        return lambda: self.client.post(reverse('tabuleiro_acoes'), dados)
+
+    def _posicionar(self, jogo_id, casa):
+        """Coloca o jogador em uma casa ainda não respondida (preparação, fora da medição)"""
+        Game.objects.filter(pk=jogo_id).update(casa_atual=casa, pergunta_atual=None, casas_respondidas=0)
+
+    def _lote(self, jogo_id, *acoes):
+        corpo = json.dumps({'action': 'batch', 'jogo_id': jogo_id, 'acoes': list(acoes)})
+        url = reverse('tabuleiro_continue', args=[jogo_id])
+        return lambda: self.client.post(url, corpo, content_type='application/json')
+
+    def endpoints(self):
+        """Gera pares (nome, função a medir), preparando o estado de cada um"""
+        Game.objects.filter(partidas=self.user, status='IN_PROGRESS').update(status='CANCELLED')
+        yield 'tabuleiro_novo_jogo', lambda: self.client.get(reverse('tabuleiro'))
+
+        jogo_id = Game.objects.filter(partidas=self.user, status='IN_PROGRESS').values_list('id', flat=True).get()
+        yield 'tabuleiro_continuar', lambda: self.client.get(reverse('tabuleiro_continue', args=[jogo_id]))
+        yield 'rolar_dado', self._acao(jogo_id, action='rolar_dado')
+
+        self._posicionar(jogo_id, CASAS_PERGUNTA[0])
+        yield 'get_pergunta', self._acao(jogo_id, action='get_pergunta', casa_id=CASAS_PERGUNTA[0])
+
+        self._posicionar(jogo_id, CASAS_PERGUNTA[1])
+        resposta = self._acao(jogo_id, action='get_pergunta', casa_id=CASAS_PERGUNTA[1])().json()
+        yield 'responder_pergunta', self._acao(
+            jogo_id, action='responder_pergunta', resposta_id=resposta['respostas'][0]['id']
+        )
+        baralho = Game.objects.values_list('baralho', flat=True).get(id=jogo_id)
+        casa = next(casa for casa, pergunta_id in enumerate(baralho, start=1) if pergunta_id)
+        resposta_id = Resposta.objects.filter(pergunta_id=baralho[casa - 1]).values_list('id', flat=True)[0]
+        self._posicionar(jogo_id, casa)
+        yield 'responder_baralho', self._acao(
+            jogo_id, action='responder_pergunta', resposta_id=resposta_id, casa_id=casa
+        )
+        yield 'check_status', self._acao(jogo_id, action='check_status')
+
+        # Mesmas ações pela view assíncrona
+        self._posicionar(jogo_id, CASAS_PERGUNTA[0])
+        yield 'acoes_get_pergunta', self._acao_async(jogo_id, action='get_pergunta', casa_id=CASAS_PERGUNTA[0])
+        yield 'acoes_check_status', self._acao_async(jogo_id, action='check_status')
+
+        self._posicionar(jogo_id, CASAS_PERGUNTA[2])
+        resposta = self._acao(jogo_id, action='get_pergunta', casa_id=CASAS_PERGUNTA[2])().json()
+        yield 'turno_lote', self._lote(
+            jogo_id,
+            {'action': 'responder_pergunta', 'resposta_id': resposta['respostas'][0]['id']},
+            {'action': 'check_status'},
+        )
+        yield 'update_score', self._acao(jogo_id, action='update_score')
+
+        # Lançamento que leva à casa final e encerra a partida
+        self._posicionar(jogo_id, engine.CASA_FINAL - 1)
+        yield 'rolar_dado_chegada', self._acao(jogo_id, action='rolar_dado')
+
+        jogo_id = self._nova_partida()
+        self._posicionar(jogo_id, engine.CASA_FINAL)
+        yield 'update_score_finalizar', self._acao(jogo_id, action='update_score', finalizar='true')
+
+        jogo_id = self._nova_partida()
+        yield 'cancel_game', self._acao(jogo_id, action='cancel_game')
+
+        yield 'estatisticas', lambda: self.client.get(reverse('estatisticas_jogador'))
+
+        # Cursor de uma posição além da foto materializada do ranking
+        ranqueados = ranking.jogadores_ranqueados().order_by(*ranking.ordenacao('maior_pontuacao'))
+        posicao = min(ranking.TAMANHO_SNAPSHOT + 50, max(ranqueados.count() - 1, 0))
+        linha = ranqueados.values('maior_pontuacao', 'id')[posicao]
+        cursor = ranking.codificar_cursor(linha, 'maior_pontuacao', posicao + 1)
+        yield 'ranking_pagina_profunda', lambda: self.client.get(f"{reverse('ranking')}?apos={cursor}")
+
+        for order_by in ranking.CAMPOS_ORDENACAO:
+            for direcao in ranking.DIRECOES:
+                url = f"{reverse('ranking')}?order_by={order_by}&dir={direcao}"
+                yield f'ranking_{order_by}_{direcao}', (lambda url=url: self.client.get(url))
+
+
+# A releitura periódica da versão do banco de perguntas (uma consulta por
+# processo a cada poucos segundos) cairia em um endpoint qualquer da rodada;
+# nas medições a cópia em cache não expira
+@override_settings(STORAGES=STORAGES_BENCHMARK, CACHES=CACHES_BENCHMARK, BANCO_PERGUNTAS_VALIDADE_VERSAO=None)
+def executar(users, repeticoes=5, semente=42):
+    """
+    Mede todos os endpoints `repeticoes` vezes, cada vez com um jogador
+    diferente. A primeira rodada aquece os caches e não entra no resultado.
+    Retorna {endpoint: métricas}.
+    """
+    rng = random.Random(semente)
+    for alias in CACHES_BENCHMARK:
+        caches[alias].clear()
+    medicoes = {}
+    for rodada in range(repeticoes + 1):
+        cenario = Cenario(rng.choice(users))
+        for nome, funcao in cenario.endpoints():
+            resultado = medir(funcao)
+            if rodada:
+                medicoes.setdefault(nome, []).append(resultado)
+
+    resultados = {}
+    for nome, valores in medicoes.items():
+        consultas, tempos, memorias = zip(*valores)
+        resultados[nome] = {
+            'consultas': max(consultas),
+            'orcamento_consultas': ORCAMENTOS.get(nome),
+            'tempo_ms': round(statistics.median(tempos) * 1000, 3),
+            'tempo_max_ms': round(max(tempos) * 1000, 3),
+            'memoria_pico_kb': round(max(memorias) / 1024, 1),
+        }
+    return resultados
+
+
+def medir_engine(partidas=10000, semente=42):
+    """Partidas completas simuladas apenas com o core.engine (sem banco)"""
+    rng = random.Random(semente)
+    jogadas = 0
+    inicio = time.perf_counter()
+    for _ in range(partidas):
+        estado = engine.EstadoJogo(rng.getrandbits(63))
+        while not estado.finalizado:
+            estado = engine.rolar(estado).estado
+            jogadas += 1
+    duracao = time.perf_counter() - inicio
+    return {
+        'partidas': partidas,
+        'jogadas': jogadas,
+        'tempo_ms': round(duracao * 1000, 3),
+        'us_por_jogada': round(duracao / jogadas * 1e6, 3),
+    }
+
+
+def estouros(resultados):
+    """Lista de mensagens para cada endpoint acima do orçamento de consultas ou de memória"""
+    mensagens = []
+    for nome, metricas in sorted(resultados.items()):
+        orcamento = metricas['orcamento_consultas']
+        if orcamento is not None and metricas['consultas'] > orcamento:
+            mensagens.append(f"{nome}: {metricas['consultas']} consultas (orçamento: {orcamento})")
+        if metricas['memoria_pico_kb'] > MEMORIA_MAXIMA_KB:
+            mensagens.append(f"{nome}: {metricas['memoria_pico_kb']} KB (orçamento: {MEMORIA_MAXIMA_KB} KB)")
+    return mensagens
+
+
+def regressoes(resultados, anteriores, tolerancia_tempo=TOLERANCIA_TEMPO, tolerancia_memoria=TOLERANCIA_MEMORIA):
+    """
+    Lista de mensagens para cada endpoint que piorou em relação a uma
+    execução anterior: tempo mediano acima da tolerância (e de
+    TEMPO_MINIMO_MS) ou pico de memória acima da tolerância. As consultas
+    são controladas pelos ORCAMENTOS (a contagem de alguns endpoints varia
+    com a semente da partida, ex.: rolar_dado em casa de bônus).
+    """
+    mensagens = []
+    for nome, metricas in sorted(resultados.items()):
+        anterior = anteriores.get(nome)
+        if not anterior:
+            continue
+        tempo, tempo_anterior = metricas['tempo_ms'], anterior['tempo_ms']
+        if tempo > tempo_anterior * (1 + tolerancia_tempo) and tempo - tempo_anterior > TEMPO_MINIMO_MS:
+            mensagens.append(f"{nome}: {tempo_anterior:.2f} -> {tempo:.2f} ms")
+        memoria, memoria_anterior = metricas['memoria_pico_kb'], anterior['memoria_pico_kb']
+        if memoria > memoria_anterior * (1 + tolerancia_memoria):
+            mensagens.append(f"{nome}: {memoria_anterior:.1f} -> {memoria:.1f} KB")
+    return mensagens
@@ -0,0 +1,18 @@
+from django.core.checks import Tags, Warning, register
+
+from . import estaticos
+
+
+@register(Tags.staticfiles)
+def scripts_do_tabuleiro(app_configs, **kwargs):
+    """Avisa quando o build de front-end do tabuleiro ainda não foi gerado"""
+    if estaticos.builds_gerados():
+        return []
+    return [
+        Warning(
+            'Os scripts do tabuleiro (static/js/dist e static/js/vendor) não foram gerados; '
+            'o tabuleiro será exibido sem eles.',
+            hint='Execute `npm install && npm run build` antes do collectstatic.',
+            id='core.W001',
+        )
+    ]
@@ -0,0 +1,110 @@
+"""
+Motor do tabuleiro: regras, dado e movimentação, em Python puro.
+
+O servidor é a autoridade sobre a partida: a posição, os lançamentos do
+dado e a pontuação das casas especiais são calculados aqui, e o cliente
+apenas anima o resultado. O estado de uma partida é uma tupla compacta
+(semente, casa, jogadas) guardada nas colunas do Game; cada lançamento é
+O(1) e não depende do histórico.
+
+O dado é um gerador baseado em contador (splitmix64): o n-ésimo lançamento
+de uma partida é função apenas da semente e de n, o que torna as partidas
+reproduzíveis e permite calcular qualquer lançamento sem guardar o estado
+interno de um gerador.
+"""
+import secrets
+from typing import NamedTuple, Optional
+
+# Casa de saída e casa de chegada (fim da partida)
+CASA_INICIAL = 0
+CASA_FINAL = 21
+FACES_DADO = 6
+
+# Casas especiais: pontos ganhos/perdidos ao parar nelas
+CASAS_BONUS = {6: 50, 13: 50}
+CASAS_PENALIDADE = {9: -30, 17: -30}
+# Zonas de pergunta (a pontuação vem da resposta)
+CASAS_PERGUNTA = frozenset({3, 8, 12, 16, 20})
+
+EVENTO_BONUS = 'bonus'
+EVENTO_PENALIDADE = 'penalidade'
+EVENTO_PERGUNTA = 'pergunta'
+EVENTO_CHEGADA = 'chegada'
+
+_MASCARA_64 = (1 << 64) - 1
+_GAMA = 0x9E3779B97F4A7C15
+
+
+class PartidaFinalizada(ValueError):
+    """Lançamento pedido para uma partida que já chegou à casa final"""
+
+
+class EstadoJogo(NamedTuple):
+    semente: int
+    casa: int = CASA_INICIAL
+    jogadas: int = 0
+
+    @property
+    def finalizado(self):
+        return self.casa >= CASA_FINAL
+
+
+class Jogada(NamedTuple):
+    dado: int
+    origem: int
+    destino: int
+    evento: Optional[str]
+    pontos: int
+    estado: EstadoJogo
+
+    @property
+    def finalizada(self):
+        return self.evento == EVENTO_CHEGADA
+
+
+def nova_semente():
+    """Semente aleatória de 63 bits (cabe em um BigIntegerField)"""
+    return secrets.randbits(63)
+
+
+def _splitmix64(valor):
+    z = valor & _MASCARA_64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASCARA_64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASCARA_64
+    return z ^ (z >> 31)
+
+
+def valor_dado(semente, jogada):
+    """Face (1 a 6) do lançamento número `jogada` (a partir de 0) da partida"""
+    return _splitmix64(semente + (jogada + 1) * _GAMA) % FACES_DADO + 1
+
+
+def evento_da_casa(casa):
+    """Retorna (evento, pontos) da casa onde o jogador parou"""
+    if casa >= CASA_FINAL:
+        return EVENTO_CHEGADA, 0
+    if casa in CASAS_BONUS:
+        return EVENTO_BONUS, CASAS_BONUS[casa]
+    if casa in CASAS_PENALIDADE:
+        return EVENTO_PENALIDADE, CASAS_PENALIDADE[casa]
+    if casa in CASAS_PERGUNTA:
+        return EVENTO_PERGUNTA, 0
+    return None, 0
+
+
+def rolar(estado):
+    """Lança o dado e move o jogador; retorna a Jogada com o novo estado"""
+    if estado.finalizado:
+        raise PartidaFinalizada('A partida já chegou à casa final.')
+
+    dado = valor_dado(estado.semente, estado.jogadas)
+    destino = min(estado.casa + dado, CASA_FINAL)
+    evento, pontos = evento_da_casa(destino)
+    return Jogada(
+        dado=dado,
+        origem=estado.casa,
+        destino=destino,
+        evento=evento,
+        pontos=pontos,
+        estado=estado._replace(casa=destino, jogadas=estado.jogadas + 1),
+    )
@@ -0,0 +1,52 @@
+"""
+Scripts do tabuleiro gerados pelo build de front-end (frontend/build.mjs).
+
+static/js/dist e static/js/vendor não fazem parte do repositório: são
+gerados por `npm run build` (produção) ou `npm run dev` (desenvolvimento).
+O modo configurado em settings.TABULEIRO_JS_DEV é usado quando os seus
+arquivos existem; senão o tabuleiro recorre ao outro build, e, sem nenhum,
+a página é exibida sem os scripts em vez de falhar ao procurá-los no
+manifesto do collectstatic.
+"""
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+# Modo de desenvolvimento (True) ou produção (False) -> arquivos necessários
+ARQUIVOS_TABULEIRO = {
+    True: ('js/vendor/react.development.js', 'js/vendor/react-dom.development.js', 'js/dist/Tabuleiro.js'),
+    False: (
+        'js/vendor/react.production.min.js', 'js/vendor/react-dom.production.min.js', 'js/dist/Tabuleiro.min.js',
+    ),
+}
+
+
+def _publicado(caminho):
+    try:
+        staticfiles_storage.url(caminho)
+    except ValueError:
+        # Ausente do manifesto gerado pelo collectstatic
+        return False
+    return staticfiles_storage.exists(caminho) or finders.find(caminho) is not None
+
+
+def _gerado(caminho):
+    return finders.find(caminho) is not None
+
+
+def modo_tabuleiro_js(disponivel=_publicado):
+    """
+    True (desenvolvimento) ou False (produção), conforme os arquivos
+    disponíveis, dando preferência a settings.TABULEIRO_JS_DEV; None se
+    nenhum dos builds existir.
+    """
+    preferido = settings.TABULEIRO_JS_DEV
+    for dev in (preferido, not preferido):
+        if all(disponivel(caminho) for caminho in ARQUIVOS_TABULEIRO[dev]):
+            return dev
+    return None
+
+
+def builds_gerados():
+    """Se há algum build nos diretórios de origem (antes do collectstatic)"""
+    return modo_tabuleiro_js(_gerado) is not None
@@ -0,0 +1,327 @@
+"""
+Atualização das estatísticas acumuladas do Jogador.
+
+O fim de uma partida não atualiza o Jogador dentro da requisição: ele é
+registrado como um EventoFimDeJogo (caixa de saída) na mesma transação que
+fecha o Game. O comando processar_eventos_fim_de_jogo consome os eventos
+em lotes, agrupando os de um mesmo jogador em um único UPDATE baseado em
+expressões F() sobre os agregados acumulados (quantidade/soma de
+pontuações positivas e de durações). A função recalcular_estatisticas
+reconstrói esses agregados a partir do histórico, com agregações feitas
+no próprio banco de dados.
+"""
+import time
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import (
+    Avg, Count, DurationField, Exists, ExpressionWrapper, F, FloatField, IntegerField, Max, OuterRef,
+    Q, Subquery, Sum, Value,
+)
+from django.db.models.functions import Cast, Coalesce, Floor, Greatest
+from django.utils import timezone
+
+from .models import EventoFimDeJogo, Game, Jogador, PontuacaoJogo
+from . import ranking
+
+STATUS_FINALIZADOS = ['COMPLETED', 'CANCELLED']
+
+# Campos do Jogador reconstruídos por recalcular_estatisticas
+CAMPOS_RECALCULADOS = [
+    'jogos_jogados', 'vitorias', 'pontuacao_media', 'maior_pontuacao', 'tempo_medio_jogo',
+    'pontuacoes_positivas', 'soma_pontuacoes_positivas', 'jogos_com_tempo', 'soma_tempo_jogo',
+]
+
+
+def duracao_em_segundos(jogo):
+    """Duração da partida em segundos (0 se os tempos não forem válidos)"""
+    if not jogo.inicio_tempo or not jogo.fim_tempo:
+        return 0
+    return max((jogo.fim_tempo - jogo.inicio_tempo).total_seconds(), 0)
+
+
+def registrar_fim_de_jogo(jogo, user, pontuacao, duracao, vitoria):
+    """
+    Registra na caixa de saída uma partida finalizada (completada ou
+    cancelada). Deve ser chamada na mesma transação que encerra o Game;
+    as estatísticas são atualizadas depois, por processar_eventos.
+    """
+    EventoFimDeJogo.objects.create(
+        jogo=jogo, jogador=user, pontuacao=pontuacao, duracao=duracao, vitoria=vitoria
+    )
+
+
+def contagens_previstas(user):
+    """
+    Partidas e vitórias do jogador contando os eventos ainda não
+    processados, para exibir ao fim da partida (uma consulta)
+    """
+    pendentes = (
+        EventoFimDeJogo.objects
+        .filter(jogador_id=OuterRef('user_jogador_id'))
+        .values('jogador_id')
+    )
+    linha = (
+        Jogador.objects
+        .filter(user_jogador=user)
+        .annotate(
+            jogos_pendentes=Coalesce(Subquery(pendentes.annotate(n=Count('id')).values('n')), 0),
+            vitorias_pendentes=Coalesce(
+                Subquery(pendentes.annotate(n=Count('id', filter=Q(vitoria=True))).values('n')), 0
+            ),
+        )
+        .values('jogos_jogados', 'vitorias', 'jogos_pendentes', 'vitorias_pendentes')
+        .first()
+    )
+    if linha is None:
+        return 0, 0
+    return (
+        linha['jogos_jogados'] + linha['jogos_pendentes'],
+        linha['vitorias'] + linha['vitorias_pendentes'],
+    )
+
+
+# ----------------------------------------------------------------------
+# Consumo da caixa de saída
+# ----------------------------------------------------------------------
+
+def _acumular(eventos):
+    """Agrupa os eventos por jogador em deltas dos agregados acumulados"""
+    deltas = defaultdict(lambda: {
+        'jogos': 0, 'vitorias': 0, 'positivas': 0, 'soma_positivas': 0, 'maior': 0,
+        'com_tempo': 0, 'soma_tempo': 0.0,
+    })
+    for evento in eventos:
+        delta = deltas[evento.jogador_id]
+        delta['jogos'] += 1
+        if evento.vitoria:
+            delta['vitorias'] += 1
+        # Apenas pontuações positivas entram nas estatísticas de pontuação
+        if evento.pontuacao > 0:
+            delta['positivas'] += 1
+            delta['soma_positivas'] += evento.pontuacao
+            delta['maior'] = max(delta['maior'], evento.pontuacao)
+        if evento.duracao > 0:
+            delta['com_tempo'] += 1
+            delta['soma_tempo'] += evento.duracao
+    return deltas
+
+
+def _aplicar_delta(user_id, delta):
+    """Incorpora o delta às estatísticas do jogador com um único UPDATE"""
+    campos = {'jogos_jogados': F('jogos_jogados') + delta['jogos']}
+
+    if delta['vitorias']:
+        campos['vitorias'] = F('vitorias') + delta['vitorias']
+
+    if delta['positivas']:
+        campos.update({
+            'pontuacoes_positivas': F('pontuacoes_positivas') + delta['positivas'],
+            'soma_pontuacoes_positivas': F('soma_pontuacoes_positivas') + delta['soma_positivas'],
+            'pontuacao_media': (
+                Cast(F('soma_pontuacoes_positivas') + delta['soma_positivas'], FloatField())
+                / (F('pontuacoes_positivas') + delta['positivas'])
+            ),
+            'maior_pontuacao': Greatest(F('maior_pontuacao'), Value(delta['maior'])),
+        })
+
+    if delta['com_tempo']:
+        campos.update({
+            'jogos_com_tempo': F('jogos_com_tempo') + delta['com_tempo'],
+            'soma_tempo_jogo': F('soma_tempo_jogo') + delta['soma_tempo'],
+            'tempo_medio_jogo': Cast(
+                Floor((F('soma_tempo_jogo') + delta['soma_tempo']) / (F('jogos_com_tempo') + delta['com_tempo'])),
+                IntegerField()
+            ),
+        })
+
+    if not Jogador.objects.filter(user_jogador_id=user_id).update(**campos):
+        # Perfil ainda inexistente (usuário anterior ao signal): cria e reaplica
+        Jogador.objects.get_or_create(user_jogador_id=user_id)
+        Jogador.objects.filter(user_jogador_id=user_id).update(**campos)
+
+
+def processar_lote_eventos(tamanho_lote=500):
+    """
+    Consome um lote de eventos da caixa de saída em uma transação: um
+    UPDATE por jogador (não por evento) e um DELETE dos eventos aplicados.
+    Vários workers podem rodar em paralelo: os eventos bloqueados por um
+    são pulados pelos outros (SKIP LOCKED, quando o banco suporta).
+
+    Retorna (eventos aplicados, jogadores atualizados, atrasos em segundos
+    entre o registro de cada evento e a sua aplicação).
+    """
+    with transaction.atomic():
+        eventos = list(
+            EventoFimDeJogo.objects
+            .select_for_update(skip_locked=True)
+            .order_by('id')[:tamanho_lote]
+        )
+        if not eventos:
+            return 0, 0, []
+
+        deltas = _acumular(eventos)
+        # Ordem fixa de atualização evita deadlocks entre workers
+        for user_id in sorted(deltas):
+            _aplicar_delta(user_id, deltas[user_id])
+        EventoFimDeJogo.objects.filter(id__in=[evento.id for evento in eventos]).delete()
+
+        agora = timezone.now()
+        atrasos = [(agora - evento.criado_em).total_seconds() for evento in eventos]
+        user_ids = list(deltas)
+        # Reposiciona os jogadores nas fotos do ranking depois do commit
+        transaction.on_commit(lambda: ranking.atualizar_jogadores(user_ids))
+
+    return len(eventos), len(deltas), atrasos
+
+
+def processar_eventos(tamanho_lote=500, max_lotes=None):
+    """
+    Consome a caixa de saída até esvaziá-la (ou até `max_lotes` lotes).
+    Retorna um dicionário com os eventos e jogadores processados, a vazão
+    e o atraso (máximo e médio) entre o fim da partida e a atualização
+    das estatísticas.
+    """
+    inicio = time.perf_counter()
+    eventos = jogadores = lotes = 0
+    atrasos = []
+    while max_lotes is None or lotes < max_lotes:
+        aplicados, atualizados, atrasos_lote = processar_lote_eventos(tamanho_lote)
+        if not aplicados:
+            break
+        eventos += aplicados
+        jogadores += atualizados
+        atrasos.extend(atrasos_lote)
+        lotes += 1
+    duracao = time.perf_counter() - inicio
+
+    return {
+        'eventos': eventos,
+        'jogadores': jogadores,
+        'lotes': lotes,
+        'tempo_ms': round(duracao * 1000, 3),
+        'eventos_por_segundo': round(eventos / duracao, 1) if duracao else 0.0,
+        'atraso_max_s': round(max(atrasos), 3) if atrasos else 0.0,
+        'atraso_medio_s': round(sum(atrasos) / len(atrasos), 3) if atrasos else 0.0,
+    }
+
+
+# ----------------------------------------------------------------------
+# Reconstrução a partir do histórico
+# ----------------------------------------------------------------------
+
+def _sem_evento_pendente(jogo, jogador):
+    """
+    Exclui das agregações as partidas cujo evento de fim ainda está na
+    caixa de saída: elas serão somadas quando o evento for processado
+    """
+    return ~Exists(EventoFimDeJogo.objects.filter(jogo_id=OuterRef(jogo), jogador_id=OuterRef(jogador)))
+
+
+def _agregados_pontuacao(user_ids):
+    """Quantidade, soma, média e máximo das pontuações positivas por usuário"""
+    linhas = (
+        PontuacaoJogo.objects
+        .filter(
+            _sem_evento_pendente('jogo_id', 'jogador_id'),
+            jogador_id__in=user_ids,
+            jogo__status__in=STATUS_FINALIZADOS,
+            pontuacao__gt=0,
+        )
+        .values('jogador_id')
+        .annotate(
+            quantidade=Count('id'),
+            soma=Sum('pontuacao'),
+            media=Avg('pontuacao'),
+            maior=Max('pontuacao'),
+        )
+    )
+    return {linha['jogador_id']: linha for linha in linhas}
+
+
+def _agregados_partidas(user_ids):
+    """Partidas jogadas, vitórias e durações por usuário"""
+    duracao = ExpressionWrapper(
+        F('game__fim_tempo') - F('game__inicio_tempo'),
+        output_field=DurationField()
+    )
+    com_tempo = Q(game__fim_tempo__gt=F('game__inicio_tempo'))
+    linhas = (
+        Game.partidas.through.objects
+        .filter(
+            _sem_evento_pendente('game_id', 'user_id'),
+            user_id__in=user_ids,
+            game__status__in=STATUS_FINALIZADOS,
+        )
+        .values('user_id')
+        .annotate(
+            jogos=Count('game_id'),
+            vitorias=Count('game_id', filter=Q(game__status='COMPLETED', game__ganhador_id=F('user_id'))),
+            jogos_com_tempo=Count('game_id', filter=com_tempo),
+            soma_tempo=Sum(duracao, filter=com_tempo),
+        )
+    )
+    return {linha['user_id']: linha for linha in linhas}
+
+
+def recalcular_estatisticas(user_ids=None, tamanho_lote=500):
+    """
+    Reconstrói as estatísticas acumuladas a partir do histórico de partidas.
+    Processa os jogadores em lotes: duas consultas agregadas e um
+    bulk_update por lote. Retorna a quantidade de jogadores recalculados.
+
+    Partidas com evento de fim ainda pendente ficam de fora (serão somadas
+    pelo processamento da caixa de saída). Cada lote bloqueia as linhas dos
+    seus jogadores até o bulk_update, para que um lote de eventos processado
+    em paralelo seja aplicado depois dele em vez de ser sobrescrito.
+    """
+    jogadores = Jogador.objects.order_by('id')
+    if user_ids is not None:
+        jogadores = jogadores.filter(user_jogador_id__in=user_ids)
+
+    total = 0
+    ultimo_id = 0
+    while True:
+        with transaction.atomic():
+            lote = list(
+                jogadores
+                .select_for_update()
+                .filter(id__gt=ultimo_id)
+                .only('id', 'user_jogador_id', 'tempo_medio_jogo')[:tamanho_lote]
+            )
+            if not lote:
+                break
+            ultimo_id = lote[-1].id
+            _recalcular_lote(lote)
+        total += len(lote)
+
+    if total:
+        ranking.invalidar()
+    return total
+
+
+def _recalcular_lote(lote):
+    """Recalcula e grava os agregados de um lote de jogadores"""
+    ids = [jogador.user_jogador_id for jogador in lote]
+    pontuacoes = _agregados_pontuacao(ids)
+    partidas = _agregados_partidas(ids)
+
+    for jogador in lote:
+        pontos = pontuacoes.get(jogador.user_jogador_id, {})
+        jogos = partidas.get(jogador.user_jogador_id, {})
+
+        jogador.jogos_jogados = jogos.get('jogos', 0)
+        jogador.vitorias = jogos.get('vitorias', 0)
+        jogador.pontuacoes_positivas = pontos.get('quantidade', 0)
+        jogador.soma_pontuacoes_positivas = pontos.get('soma') or 0
+        jogador.pontuacao_media = pontos.get('media') or 0
+        jogador.maior_pontuacao = pontos.get('maior') or 0
+
+        jogador.jogos_com_tempo = jogos.get('jogos_com_tempo', 0)
+        soma_tempo = jogos.get('soma_tempo')
+        jogador.soma_tempo_jogo = soma_tempo.total_seconds() if soma_tempo else 0.0
+        # Sem partidas com tempo válido, mantém o tempo médio já registrado
+        if jogador.jogos_com_tempo:
+            jogador.tempo_medio_jogo = int(jogador.soma_tempo_jogo / jogador.jogos_com_tempo)
+
+    Jogador.objects.bulk_update(lote, CAMPOS_RECALCULADOS)
@@ -0,0 +1,112 @@
+"""
+Registro das respostas do tabuleiro para análise das perguntas.
+
+Cada resposta vira uma linha de RespostaEvento, mas não é inserida dentro
+da requisição: ela é acumulada em Game.respostas_pendentes pelo mesmo
+UPDATE condicional que consome a pergunta (nenhuma consulta a mais por
+resposta). Depois que a partida é encerrada (completada, cancelada ou
+abandonada) o worker de fim de jogo descarrega os acúmulos em lotes, com
+um único bulk_create por lote de partidas, e soma as respostas aos
+contadores usados pela seleção adaptativa (core.selecao_perguntas).
+
+Cada resposta acumulada é uma lista compacta:
+[jogador_id, pergunta_id, resposta_id, correta, usou_dica, tempo_ms, respondida_em]
+com respondida_em em milissegundos desde a época.
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Game, RespostaEvento
+from . import selecao_perguntas
+
+# Respostas inseridas por comando INSERT
+TAMANHO_INSERCAO = 1000
+
+
+def acumular(jogo, jogador_id, pergunta_id, resposta, usou_dica, agora):
+    """
+    Lista de respostas pendentes do jogo com a nova resposta ao final.
+    O tempo de resposta é medido desde a última ação registrada na partida.
+    """
+    tempo_ms = None
+    if jogo.ultima_atividade:
+        tempo_ms = max(int((agora - jogo.ultima_atividade).total_seconds() * 1000), 0)
+    linha = [
+        jogador_id, pergunta_id, resposta['id'], bool(resposta['e_correto']),
+        bool(usou_dica), tempo_ms, int(agora.timestamp() * 1000),
+    ]
+    return (jogo.respostas_pendentes or []) + [linha]
+
+
+def _data(milissegundos):
+    data = datetime.fromtimestamp(milissegundos / 1000, tz=dt_timezone.utc)
+    return data if settings.USE_TZ else timezone.make_naive(data)
+
+
+def _evento(jogo_id, linha):
+    jogador_id, pergunta_id, resposta_id, correta, usou_dica, tempo_ms, respondida_em = linha
+    return RespostaEvento(
+        jogo_id=jogo_id,
+        jogador_id=jogador_id,
+        pergunta_id=pergunta_id,
+        resposta_id=resposta_id,
+        correta=correta,
+        usou_dica=usou_dica,
+        tempo_ms=tempo_ms,
+        respondida_em=_data(respondida_em),
+    )
+
+
+def descarregar_lote(tamanho_lote=500):
+    """
+    Grava as respostas acumuladas de até `tamanho_lote` partidas encerradas
+    e limpa os acúmulos, na mesma transação. Partidas travadas por outro
+    worker são puladas. Retorna (partidas, respostas).
+    """
+    with transaction.atomic():
+        jogos = list(
+            Game.objects
+            .select_for_update(skip_locked=True)
+            .filter(respostas_pendentes__isnull=False)
+            .exclude(status='IN_PROGRESS')
+            .order_by('id')
+            .values_list('id', 'respostas_pendentes')[:tamanho_lote]
+        )
+        if not jogos:
+            return 0, 0
+
+        eventos = [_evento(jogo_id, linha) for jogo_id, linhas in jogos for linha in linhas or ()]
+        RespostaEvento.objects.bulk_create(eventos, batch_size=TAMANHO_INSERCAO)
+        # Contadores de dificuldade e perguntas vistas da seleção adaptativa
+        selecao_perguntas.aplicar_respostas(eventos)
+        Game.objects.filter(id__in=[jogo_id for jogo_id, _ in jogos]).update(respostas_pendentes=None)
+    return len(jogos), len(eventos)
+
+
+def descarregar(tamanho_lote=500, max_lotes=None):
+    """
+    Descarrega todas as partidas encerradas com respostas pendentes (ou até
+    `max_lotes` lotes). Retorna partidas, respostas, lotes e a vazão.
+    """
+    inicio = time.perf_counter()
+    partidas = respostas = lotes = 0
+    while max_lotes is None or lotes < max_lotes:
+        jogos, eventos = descarregar_lote(tamanho_lote)
+        if not jogos:
+            break
+        partidas += jogos
+        respostas += eventos
+        lotes += 1
+    duracao = time.perf_counter() - inicio
+
+    return {
+        'partidas': partidas,
+        'respostas': respostas,
+        'lotes': lotes,
+        'tempo_ms': round(duracao * 1000, 3),
+        'respostas_por_segundo': round(respostas / duracao, 1) if duracao else 0.0,
+    }
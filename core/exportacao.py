@@ -0,0 +1,322 @@
+"""
+Exportação dos dados do jogo (partidas, pontuações, jogadores e respostas)
+em CSV ou Parquet, por streaming.
+
+Os filtros (período, status da partida, categoria da pergunta) são
+aplicados na consulta SQL, e as linhas são lidas com
+iterator(chunk_size=...) e enviadas à medida que chegam do banco: o CSV
+linha a linha e o Parquet em grupos de linhas (row groups), cada um
+descartado depois de escrito. A memória usada não depende do tamanho da
+exportação. Sob ASGI o conteúdo é entregue por um iterador assíncrono que
+pede cada parte ao gerador síncrono em sync_to_async (thread_sensitive,
+mantendo a conexão do banco na mesma thread); com um iterador síncrono o
+Django acumularia a resposta inteira antes de enviá-la.
+
+Usado pelo ExportacaoView, pelo comando exportar_dados e pelas ações de
+exportação do admin.
+"""
+import csv
+import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Game, Jogador, PontuacaoJogo, Pergunta, RespostaEvento
+
+# Linhas lidas do banco por vez
+TAMANHO_BLOCO = 2000
+# Linhas por row group do Parquet
+TAMANHO_GRUPO = 50000
+
+FORMATOS = ('csv', 'parquet')
+
+
+class Conjunto:
+    """
+    Conjunto exportável: modelo, colunas (nome, caminho no ORM, tipo) e os
+    caminhos usados por cada filtro (None quando o filtro não se aplica)
+    """
+
+    def __init__(self, modelo, colunas, data=None, status=None, categoria=None):
+        self.modelo = modelo
+        self.colunas = colunas
+        self.filtros = {'data': data, 'status': status, 'categoria': categoria}
+
+    @property
+    def cabecalho(self):
+        return [nome for nome, _, _ in self.colunas]
+
+
+CONJUNTOS = {
+    'partidas': Conjunto(
+        Game,
+        [
+            ('id', 'id', 'int'),
+            ('status', 'status', 'str'),
+            ('inicio', 'inicio_tempo', 'datetime'),
+            ('fim', 'fim_tempo', 'datetime'),
+            ('ganhador', 'ganhador__username', 'str'),
+            ('casa_atual', 'casa_atual', 'int'),
+            ('jogadas', 'jogadas', 'int'),
+        ],
+        data='inicio_tempo',
+        status='status',
+    ),
+    'pontuacoes': Conjunto(
+        PontuacaoJogo,
+        [
+            ('jogo_id', 'jogo_id', 'int'),
+            ('status', 'jogo__status', 'str'),
+            ('inicio', 'jogo__inicio_tempo', 'datetime'),
+            ('jogador', 'jogador__username', 'str'),
+            ('pontuacao', 'pontuacao', 'int'),
+        ],
+        data='jogo__inicio_tempo',
+        status='jogo__status',
+    ),
+    'jogadores': Conjunto(
+        Jogador,
+        [
+            ('jogador', 'user_jogador__username', 'str'),
+            ('jogos_jogados', 'jogos_jogados', 'int'),
+            ('vitorias', 'vitorias', 'int'),
+            ('pontuacao_media', 'pontuacao_media', 'float'),
+            ('maior_pontuacao', 'maior_pontuacao', 'int'),
+            ('tempo_medio_jogo', 'tempo_medio_jogo', 'int'),
+            ('total_perguntas_certas', 'total_perguntas_certas', 'int'),
+        ],
+    ),
+    'respostas': Conjunto(
+        RespostaEvento,
+        [
+            ('jogo_id', 'jogo_id', 'int'),
+            ('jogador_id', 'jogador_id', 'int'),
+            ('pergunta_id', 'pergunta_id', 'int'),
+            ('resposta_id', 'resposta_id', 'int'),
+            ('correta', 'correta', 'bool'),
+            ('usou_dica', 'usou_dica', 'bool'),
+            ('tempo_ms', 'tempo_ms', 'int'),
+            ('respondida_em', 'respondida_em', 'datetime'),
+        ],
+        data='respondida_em',
+        status='jogo_id',
+        categoria='pergunta_id',
+    ),
+}
+
+
+def _momento(dia):
+    momento = datetime.datetime.combine(dia, datetime.time.min)
+    return timezone.make_aware(momento) if settings.USE_TZ else momento
+
+
+def filtrar(conjunto, inicio=None, fim=None, status=None, categoria=None, base=None):
+    """
+    Queryset do conjunto com os filtros aplicados na consulta. O período
+    [inicio, fim] (datas, fim inclusive) vira um intervalo sobre a coluna,
+    para usar os índices. Filtros que não se aplicam ao conjunto geram
+    ValueError.
+    """
+    definicao = CONJUNTOS[conjunto]
+    consulta = definicao.modelo.objects.all() if base is None else base
+    condicoes = Q()
+
+    if inicio or fim:
+        campo = definicao.filtros['data']
+        if campo is None:
+            raise ValueError(f'O conjunto {conjunto} não tem filtro por período.')
+        if inicio:
+            condicoes &= Q(**{f'{campo}__gte': _momento(inicio)})
+        if fim:
+            condicoes &= Q(**{f'{campo}__lt': _momento(fim + datetime.timedelta(days=1))})
+
+    if status:
+        if status not in dict(Game.STATUS_CHOICES):
+            raise ValueError(f'Status inválido: {status}')
+        campo = definicao.filtros['status']
+        if campo is None:
+            raise ValueError(f'O conjunto {conjunto} não tem filtro por status.')
+        if definicao.modelo is RespostaEvento:
+            # Sem chave estrangeira: subconsulta pelos ids das partidas
+            condicoes &= Q(jogo_id__in=Game.objects.filter(status=status).values('id'))
+        else:
+            condicoes &= Q(**{campo: status})
+
+    if categoria:
+        if categoria not in dict(Pergunta.CATEGORY_CHOICES):
+            raise ValueError(f'Categoria inválida: {categoria}')
+        if definicao.filtros['categoria'] is None:
+            raise ValueError(f'O conjunto {conjunto} não tem filtro por categoria.')
+        condicoes &= Q(pergunta_id__in=Pergunta.objects.filter(category=categoria).values('id'))
+
+    return consulta.filter(condicoes)
+
+
+def linhas(conjunto, tamanho_bloco=TAMANHO_BLOCO, **filtros):
+    """Tuplas do conjunto na ordem das colunas, lidas em blocos do banco"""
+    caminhos = [caminho for _, caminho, _ in CONJUNTOS[conjunto].colunas]
+    return (
+        filtrar(conjunto, **filtros)
+        .order_by('pk')
+        .values_list(*caminhos)
+        .iterator(chunk_size=tamanho_bloco)
+    )
+
+
+# ----------------------------------------------------------------------
+# CSV
+# ----------------------------------------------------------------------
+
+class _Eco:
+    """Arquivo falso para o csv.writer: devolve a linha em vez de gravá-la"""
+
+    def write(self, valor):
+        return valor
+
+
+def linhas_csv(cabecalho, linhas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(cabecalho)
+    for linha in linhas:
+        yield escritor.writerow(linha)
+
+
+def resposta_csv(request, nome_arquivo, cabecalho, linhas):
+    """StreamingHttpResponse com o CSV de `linhas` para download"""
+    return _download(request, nome_arquivo, 'text/csv; charset=utf-8', linhas_csv(cabecalho, linhas))
+
+
+# ----------------------------------------------------------------------
+# Parquet
+# ----------------------------------------------------------------------
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError('Exportação em Parquet requer o pacote pyarrow (pip install pyarrow).')
+    return pa, pq
+
+
+def _esquema(pa, conjunto):
+    tipos = {
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'str': pa.string(),
+        'bool': pa.bool_(),
+        'datetime': pa.timestamp('us', tz='UTC' if settings.USE_TZ else None),
+    }
+    return pa.schema([(nome, tipos[tipo]) for nome, _, tipo in CONJUNTOS[conjunto].colunas])
+
+
+class _Coletor:
+    """Destino do ParquetWriter que guarda os bytes até serem enviados"""
+
+    def __init__(self):
+        self.partes = []
+        self.posicao = 0
+        self.closed = False
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        self.posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self.posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def esvaziar(self):
+        dados = b''.join(self.partes)
+        self.partes = []
+        return dados
+
+
+def _grupos(linhas, tamanho_grupo):
+    grupo = []
+    for linha in linhas:
+        grupo.append(linha)
+        if len(grupo) == tamanho_grupo:
+            yield grupo
+            grupo = []
+    if grupo:
+        yield grupo
+
+
+def blocos_parquet(conjunto, linhas, tamanho_grupo=TAMANHO_GRUPO):
+    """
+    Gera os bytes de um arquivo Parquet, um row group por vez. O rodapé
+    (metadados) sai no último bloco.
+    """
+    pa, pq = _pyarrow()
+    esquema = _esquema(pa, conjunto)
+    destino = _Coletor()
+    escritor = pq.ParquetWriter(destino, esquema)
+    try:
+        for grupo in _grupos(linhas, tamanho_grupo):
+            colunas = [list(coluna) for coluna in zip(*grupo)]
+            escritor.write_table(pa.Table.from_arrays(
+                [pa.array(coluna, type=campo.type) for coluna, campo in zip(colunas, esquema)],
+                schema=esquema,
+            ))
+            yield destino.esvaziar()
+    finally:
+        escritor.close()
+    yield destino.esvaziar()
+
+
+def resposta_parquet(request, nome_arquivo, conjunto, linhas, tamanho_grupo=TAMANHO_GRUPO):
+    """StreamingHttpResponse com o Parquet de `linhas` para download"""
+    return _download(
+        request, nome_arquivo, 'application/vnd.apache.parquet', blocos_parquet(conjunto, linhas, tamanho_grupo)
+    )
+
+
+# ----------------------------------------------------------------------
+# Resposta HTTP
+# ----------------------------------------------------------------------
+
+_FIM = object()
+
+
+async def _partes_assincronas(partes):
+    """
+    Iterador assíncrono sobre o gerador síncrono `partes`: cada parte é
+    pedida em sync_to_async, na thread das views síncronas, onde vive a
+    conexão usada pelo cursor da consulta
+    """
+    proxima = sync_to_async(next, thread_sensitive=True)
+    while (parte := await proxima(partes, _FIM)) is not _FIM:
+        yield parte
+
+
+def _download(request, nome_arquivo, content_type, partes):
+    if isinstance(request, ASGIRequest):
+        partes = _partes_assincronas(partes)
+    return StreamingHttpResponse(
+        partes,
+        content_type=content_type,
+        headers={'Content-Disposition': f'attachment; filename="{nome_arquivo}"'},
+    )
+
+
+def resposta(request, conjunto, formato='csv', **filtros):
+    """Resposta de download do conjunto no formato pedido"""
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato inválido: {formato}')
+    dados = linhas(conjunto, **filtros)
+    if formato == 'parquet':
+        # Verifica o pyarrow antes de iniciar o streaming
+        _pyarrow()
+        return resposta_parquet(request, f'{conjunto}.parquet', conjunto, dados)
+    return resposta_csv(request, f'{conjunto}.csv', CONJUNTOS[conjunto].cabecalho, dados)
@@ -0,0 +1,351 @@
+"""
+Importação do banco de perguntas a partir de planilhas e arquivos de dados.
+
+As fontes são lidas em blocos (Excel em modo somente leitura do openpyxl,
+CSV/JSONL com chunksize do pandas e Parquet por row groups), validadas de
+forma vetorizada e comparadas com o banco por um hash de conteúdo por
+código (nas respostas, pelo par código da pergunta + código da resposta,
+que é a chave única do modelo). Apenas linhas novas ou alteradas são gravadas, com
+bulk_create(update_conflicts=True) em lotes; reimportar um banco sem
+mudanças não grava nada.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import pandas as pd
+from django.db import transaction
+
+from .models import Pergunta, Resposta
+from . import banco_perguntas
+
+# Quantidade de linhas lidas e gravadas por vez
+TAMANHO_LOTE = 500
+
+CAMPOS_PERGUNTA = ['text', 'category', 'posicao_tabuleiro', 'dica', 'explicacao']
+CAMPOS_RESPOSTA = ['text', 'e_correto']
+
+FORMATOS = ('.xlsx', '.xlsm', '.csv', '.jsonl', '.ndjson', '.parquet')
+
+VALORES_VERDADEIROS = {'true', '1', 'sim', 's', 'verdadeiro', 'yes', 'x'}
+
+
+# ----------------------------------------------------------------------
+# Leitura das fontes
+# ----------------------------------------------------------------------
+
+def _ler_excel(caminho, planilha, tamanho_lote):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = workbook[planilha].iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        lote = []
+        for linha in linhas:
+            if all(valor is None for valor in linha):
+                continue
+            lote.append(linha)
+            if len(lote) == tamanho_lote:
+                yield pd.DataFrame(lote, columns=cabecalho)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote, columns=cabecalho)
+    finally:
+        workbook.close()
+
+
+def _ler_parquet(caminho, tamanho_lote):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError('Leitura de Parquet requer o pacote pyarrow (pip install pyarrow).')
+
+    arquivo = pq.ParquetFile(caminho)
+    for bloco in arquivo.iter_batches(batch_size=tamanho_lote):
+        yield bloco.to_pandas()
+
+
+def ler_fonte(caminho, planilha=None, tamanho_lote=TAMANHO_LOTE):
+    """
+    Gera DataFrames de até `tamanho_lote` linhas, sem carregar o arquivo
+    inteiro em memória. O índice de cada DataFrame é a linha de origem
+    (considerando o cabeçalho na linha 1).
+    """
+    extensao = Path(caminho).suffix.lower()
+    if extensao in ('.xlsx', '.xlsm'):
+        blocos = _ler_excel(caminho, planilha, tamanho_lote)
+    elif extensao == '.csv':
+        blocos = pd.read_csv(caminho, chunksize=tamanho_lote)
+    elif extensao in ('.jsonl', '.ndjson'):
+        blocos = pd.read_json(caminho, lines=True, chunksize=tamanho_lote)
+    elif extensao == '.parquet':
+        blocos = _ler_parquet(caminho, tamanho_lote)
+    else:
+        raise ValueError(f'Formato não suportado: {extensao} (use {", ".join(FORMATOS)})')
+
+    proxima_linha = 2
+    for bloco in blocos:
+        bloco.index = range(proxima_linha, proxima_linha + len(bloco))
+        proxima_linha += len(bloco)
+        yield bloco
+
+
+# ----------------------------------------------------------------------
+# Normalização e hash de conteúdo
+# ----------------------------------------------------------------------
+
+def _texto(valor):
+    """Texto opcional: vazio/NaN viram None"""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    valor = str(valor)
+    return valor if valor.strip() else None
+
+
+def _para_booleano(valor):
+    if isinstance(valor, str):
+        return valor.strip().lower() in VALORES_VERDADEIROS
+    return bool(valor) if pd.notna(valor) else False
+
+
+def _booleano(serie):
+    """Converte booleanos, números e textos ("True", "sim", "1") em bool"""
+    return serie.map(_para_booleano)
+
+
+def _hash(valores):
+    return hashlib.sha1(json.dumps(valores, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def valores_pergunta(text, category, posicao_tabuleiro, dica, explicacao):
+    return [_texto(text), _texto(category), int(posicao_tabuleiro), _texto(dica), _texto(explicacao)]
+
+
+def valores_resposta(codigo_pergunta, text, e_correto):
+    return [codigo_pergunta, _texto(text), bool(e_correto)]
+
+
+def hashes_perguntas_no_banco():
+    """{codigo: hash do conteúdo} de todas as perguntas (uma consulta)"""
+    return {
+        codigo: _hash(valores_pergunta(*valores))
+        for codigo, *valores in Pergunta.objects.values_list('codigo', *CAMPOS_PERGUNTA).iterator()
+    }
+
+
+def hashes_respostas_no_banco():
+    """
+    {(codigo da pergunta, codigo): hash do conteúdo} de todas as respostas
+    (uma consulta). O código da resposta só é único dentro da pergunta:
+    códigos antigos como "R001" se repetem entre perguntas.
+    """
+    return {
+        (codigo_pergunta, codigo): _hash(valores_resposta(codigo_pergunta, *valores))
+        for codigo, codigo_pergunta, *valores in Resposta.objects.values_list(
+            'codigo', 'pergunta__codigo', *CAMPOS_RESPOSTA
+        ).iterator()
+    }
+
+
+# ----------------------------------------------------------------------
+# Importação
+# ----------------------------------------------------------------------
+
+class Relatorio:
+    """Contadores da importação e diferenças encontradas (para o dry-run)"""
+
+    def __init__(self):
+        self.contadores = {
+            'perguntas_criadas': 0,
+            'perguntas_atualizadas': 0,
+            'perguntas_inalteradas': 0,
+            'perguntas_falhas': 0,
+            'respostas_criadas': 0,
+            'respostas_atualizadas': 0,
+            'respostas_inalteradas': 0,
+            'respostas_falhas': 0,
+        }
+        self.diferencas = []
+
+    def __getitem__(self, chave):
+        return self.contadores[chave]
+
+    def somar(self, chave, quantidade=1):
+        self.contadores[chave] += quantidade
+
+
+class Importador:
+    """
+    Compara cada bloco lido com os hashes do banco e grava somente o que
+    mudou. Com aplicar=False (dry-run) nada é gravado e as diferenças são
+    apenas registradas no relatório.
+    """
+
+    def __init__(self, aplicar=True, tamanho_lote=TAMANHO_LOTE, saida=print):
+        self.aplicar = aplicar
+        self.tamanho_lote = tamanho_lote
+        self.saida = saida
+        self.relatorio = Relatorio()
+        self.codigos_perguntas_lidas = set()
+
+    def _linhas_invalidas(self, bloco, validas, descricao, contador):
+        for linha, codigo in bloco.loc[~validas, 'codigo'].items():
+            self.saida(f"Código de {descricao} inválido: {codigo} na linha {linha}")
+        self.relatorio.somar(contador, int((~validas).sum()))
+
+    def _gravar(self, model, objetos, unique_fields, update_fields, descricao, contador_falhas):
+        """Grava um lote em uma transação curta; retorna quantos falharam"""
+        if not objetos or not self.aplicar:
+            return 0
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    objetos,
+                    update_conflicts=True,
+                    unique_fields=unique_fields,
+                    update_fields=update_fields,
+                )
+        except Exception as e:
+            self.saida(f"Erro ao gravar lote de {len(objetos)} {descricao}: {str(e)}")
+            self.relatorio.somar(contador_falhas, len(objetos))
+            return len(objetos)
+        return 0
+
+    def _classificar(self, chave, hash_novo, hashes_banco, descricao):
+        """Retorna 'criada', 'atualizada' ou 'inalterada' e registra a diferença"""
+        hash_atual = hashes_banco.get(chave)
+        if hash_atual == hash_novo:
+            return 'inalterada'
+        situacao = 'criada' if hash_atual is None else 'atualizada'
+        if not self.aplicar:
+            self.relatorio.diferencas.append(f"{'+' if hash_atual is None else '~'} {descricao}")
+        return situacao
+
+    def importar_perguntas(self, blocos):
+        hashes_banco = hashes_perguntas_no_banco()
+        for bloco in blocos:
+            bloco = bloco.copy()
+            bloco['codigo'] = bloco['codigo'].astype(str).str.strip()
+            bloco['posicao_tabuleiro'] = pd.to_numeric(bloco['posicao_tabuleiro'], errors='coerce')
+            for campo in ('dica', 'explicacao'):
+                if campo not in bloco:
+                    bloco[campo] = None
+
+            validas = (
+                bloco['codigo'].str.fullmatch(r'P\d{3}')
+                & bloco['posicao_tabuleiro'].notna()
+                & bloco['text'].notna()
+            )
+            self._linhas_invalidas(bloco, validas, 'pergunta', 'perguntas_falhas')
+            bloco = bloco[validas].drop_duplicates('codigo', keep='last')
+
+            perguntas = []
+            situacoes = []
+            for row in bloco[['codigo', *CAMPOS_PERGUNTA]].itertuples(index=False):
+                valores = valores_pergunta(*row[1:])
+                self.codigos_perguntas_lidas.add(row.codigo)
+                situacao = self._classificar(row.codigo, _hash(valores), hashes_banco, f'pergunta {row.codigo}')
+                if situacao == 'inalterada':
+                    self.relatorio.somar('perguntas_inalteradas')
+                    continue
+                perguntas.append(Pergunta(codigo=row.codigo, **dict(zip(CAMPOS_PERGUNTA, valores))))
+                situacoes.append(situacao)
+
+            falhas = self._gravar(
+                Pergunta, perguntas, ['codigo'], CAMPOS_PERGUNTA, 'perguntas', 'perguntas_falhas'
+            )
+            if not falhas:
+                self.relatorio.somar('perguntas_criadas', situacoes.count('criada'))
+                self.relatorio.somar('perguntas_atualizadas', situacoes.count('atualizada'))
+
+    def importar_respostas(self, blocos):
+        hashes_banco = hashes_respostas_no_banco()
+        for bloco in blocos:
+            bloco = bloco.copy()
+            bloco['codigo'] = bloco['codigo'].astype(str).str.strip()
+
+            # O código da pergunta vem do código da resposta (R00101 -> P001)
+            validas = bloco['codigo'].str.fullmatch(r'R\d{5}') & bloco['text'].notna()
+            self._linhas_invalidas(bloco, validas, 'resposta', 'respostas_falhas')
+            bloco = bloco[validas].drop_duplicates('codigo', keep='last').copy()
+            bloco['codigo_pergunta'] = 'P' + bloco['codigo'].str.slice(1, 4)
+            if 'e_correto' in bloco:
+                bloco['e_correto'] = _booleano(bloco['e_correto'])
+            else:
+                bloco['e_correto'] = False
+
+            alteradas = []
+            for row in bloco[['codigo', 'codigo_pergunta', *CAMPOS_RESPOSTA]].itertuples(index=False):
+                valores = valores_resposta(*row[1:])
+                situacao = self._classificar(
+                    (row.codigo_pergunta, row.codigo), _hash(valores), hashes_banco, f'resposta {row.codigo}'
+                )
+                if situacao == 'inalterada':
+                    self.relatorio.somar('respostas_inalteradas')
+                    continue
+                alteradas.append((row, valores, situacao))
+            if not alteradas:
+                continue
+
+            # Uma única consulta resolve as perguntas das respostas alteradas
+            perguntas = Pergunta.objects.in_bulk(
+                list({row.codigo_pergunta for row, _, _ in alteradas}), field_name='codigo'
+            )
+
+            respostas = []
+            situacoes = []
+            for row, valores, situacao in alteradas:
+                pergunta = perguntas.get(row.codigo_pergunta)
+                # No dry-run a pergunta pode ser nova e ainda não existir no banco
+                pendente = not self.aplicar and row.codigo_pergunta in self.codigos_perguntas_lidas
+                if pergunta is None and not pendente:
+                    self.saida(
+                        f"Pergunta com código {row.codigo_pergunta} não encontrada para a resposta {row.codigo}"
+                    )
+                    self.relatorio.somar('respostas_falhas')
+                    continue
+                respostas.append(Resposta(
+                    codigo=row.codigo,
+                    pergunta=pergunta,
+                    **dict(zip(CAMPOS_RESPOSTA, valores[1:]))
+                ))
+                situacoes.append(situacao)
+
+            falhas = self._gravar(
+                Resposta, respostas, ['codigo', 'pergunta'], CAMPOS_RESPOSTA, 'respostas', 'respostas_falhas'
+            )
+            if not falhas:
+                self.relatorio.somar('respostas_criadas', situacoes.count('criada'))
+                self.relatorio.somar('respostas_atualizadas', situacoes.count('atualizada'))
+
+    def concluir(self):
+        """Invalida o banco de perguntas em memória se algo foi gravado"""
+        contadores = self.relatorio.contadores
+        gravou = any(contadores[chave] for chave in (
+            'perguntas_criadas', 'perguntas_atualizadas', 'respostas_criadas', 'respostas_atualizadas'
+        ))
+        if self.aplicar and gravou:
+            banco_perguntas.invalidar()
+        return self.relatorio
+
+
+def importar(fonte_perguntas, fonte_respostas=None, planilha_perguntas='Pergunta',
+             planilha_respostas='Resposta', aplicar=True, tamanho_lote=TAMANHO_LOTE, saida=print):
+    """
+    Importa perguntas e respostas. Em planilhas Excel as duas fontes podem
+    ser o mesmo arquivo (abas diferentes); nos demais formatos cada fonte é
+    um arquivo. Retorna o Relatorio da importação.
+    """
+    importador = Importador(aplicar=aplicar, tamanho_lote=tamanho_lote, saida=saida)
+
+    saida("Iniciando importação de perguntas...")
+    importador.importar_perguntas(ler_fonte(fonte_perguntas, planilha_perguntas, tamanho_lote))
+
+    if fonte_respostas:
+        saida("Iniciando importação de respostas...")
+        importador.importar_respostas(ler_fonte(fonte_respostas, planilha_respostas, tamanho_lote))
+
+    return importador.concluir()
@@ -0,0 +1,58 @@
+# core/management/commands/agregar_estatisticas.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core import agregados
+
+
+class Command(BaseCommand):
+    help = (
+        'Agrega as partidas e respostas novas (desde a última marca) nas '
+        'estatísticas diárias por jogador e globais usadas no painel do jogador'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=agregados.TAMANHO_LOTE,
+            help='Quantidade de partidas (ou respostas) agregadas por transação'
+        )
+        parser.add_argument(
+            '--reiniciar', action='store_true',
+            help='Apaga os agregados e as marcas antes de agregar (reprocessa tudo)'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Executa continuamente, como um worker de longa duração'
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=60,
+            help='Segundos entre as execuções no modo --loop'
+        )
+
+    def handle(self, *args, **options):
+        if options['lote'] <= 0 or options['intervalo'] <= 0:
+            raise CommandError('--lote e --intervalo devem ser positivos.')
+
+        if options['reiniciar']:
+            agregados.reiniciar()
+            self.stdout.write('Agregados e marcas apagados.')
+
+        if not options['loop']:
+            self._relatar(agregados.agregar(options['lote']))
+            return
+
+        self.stdout.write("Agregando estatísticas diárias (Ctrl+C para sair)")
+        try:
+            while True:
+                relatorio = agregados.agregar(options['lote'])
+                if relatorio['partidas'] or relatorio['respostas']:
+                    self._relatar(relatorio)
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('Worker encerrado.')
+
+    def _relatar(self, relatorio):
+        self.stdout.write(self.style.SUCCESS(
+            f"{relatorio['partidas']} partidas e {relatorio['respostas']} respostas agregadas "
+            f"em {relatorio['lotes']} lotes, {relatorio['tempo_ms']}ms"
+        ))
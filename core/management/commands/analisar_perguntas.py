@@ -0,0 +1,76 @@
+# core/management/commands/analisar_perguntas.py
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from core import analise_perguntas, eventos_resposta
+
+# Limite abaixo do qual a discriminação de uma pergunta é considerada baixa
+DISCRIMINACAO_BAIXA = 0.2
+
+
+class Command(BaseCommand):
+    help = (
+        'Calcula dificuldade, discriminação, frequência dos distratores e '
+        'acerto por categoria a partir dos eventos de resposta do tabuleiro'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=analise_perguntas.TAMANHO_LOTE,
+            help='Quantidade de eventos lidos por consulta'
+        )
+        parser.add_argument(
+            '--minimo', type=int, default=analise_perguntas.MINIMO_RESPOSTAS,
+            help='Respostas mínimas para calcular os índices de uma pergunta'
+        )
+        parser.add_argument(
+            '--saida', help='Diretório onde gravar os resultados em CSV'
+        )
+        parser.add_argument(
+            '--sem-descarregar', action='store_true',
+            help='Não grava antes as respostas pendentes das partidas encerradas'
+        )
+
+    def handle(self, *args, **options):
+        if options['lote'] <= 0 or options['minimo'] <= 0:
+            raise CommandError('--lote e --minimo devem ser positivos.')
+
+        if not options['sem_descarregar']:
+            eventos_resposta.descarregar()
+
+        inicio = time.perf_counter()
+        respostas = analise_perguntas.carregar_respostas(options['lote'])
+        carga = time.perf_counter() - inicio
+        resultado = analise_perguntas.analisar(respostas, minimo=options['minimo'])
+        calculo = time.perf_counter() - inicio - carga
+
+        perguntas = resultado['perguntas']
+        self.stdout.write(resultado['categorias'].to_string(index=False))
+
+        avaliadas = perguntas.dropna(subset=['indice_acerto'])
+        if not avaliadas.empty:
+            self.stdout.write('\nMais difíceis:')
+            self.stdout.write(
+                avaliadas.nsmallest(5, 'indice_acerto')[['codigo', 'respostas', 'indice_acerto', 'discriminacao']]
+                .to_string(index=False)
+            )
+        baixa = int((perguntas['discriminacao'] < DISCRIMINACAO_BAIXA).sum())
+        fracos = int(resultado['distratores']['fraco'].sum())
+        self.stdout.write(
+            f"\n{baixa} perguntas com discriminação abaixo de {DISCRIMINACAO_BAIXA}; "
+            f"{fracos} distratores escolhidos por menos de "
+            f"{analise_perguntas.FREQUENCIA_MINIMA_DISTRATOR:.0%} das respostas"
+        )
+
+        if options['saida']:
+            destino = Path(options['saida'])
+            destino.mkdir(parents=True, exist_ok=True)
+            for nome, tabela in resultado.items():
+                tabela.to_csv(destino / f'{nome}.csv', index=False)
+            self.stdout.write(f'Resultados gravados em {destino}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(respostas)} respostas de {len(perguntas)} perguntas analisadas "
+            f"(carga {carga * 1000:.0f}ms, cálculo {calculo * 1000:.0f}ms)"
+        ))
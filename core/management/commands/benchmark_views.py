@@ -0,0 +1,113 @@
+# core/management/commands/benchmark_views.py
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede consultas SQL, tempo e memória de cada view do core em um banco '
+        'de teste populado; falha se algum orçamento for excedido ou se houver '
+        'regressão em relação a --comparar'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=2000, help='Quantidade de usuários')
+        parser.add_argument('--jogos', type=int, default=20000, help='Quantidade de partidas finalizadas')
+        parser.add_argument('--perguntas-por-casa', type=int, default=20, help='Perguntas em cada zona')
+        parser.add_argument('--repeticoes', type=int, default=5, help='Medições por endpoint')
+        parser.add_argument('--saida', help='Arquivo JSON onde gravar os resultados')
+        parser.add_argument(
+            '--comparar',
+            help='JSON de uma execução anterior; falha se algum endpoint piorar além da tolerância'
+        )
+        parser.add_argument(
+            '--tolerancia-tempo', type=float, default=benchmark.TOLERANCIA_TEMPO,
+            help='Aumento relativo de tempo aceito na comparação (0.5 = 50%%)'
+        )
+        parser.add_argument(
+            '--tolerancia-memoria', type=float, default=benchmark.TOLERANCIA_MEMORIA,
+            help='Aumento relativo do pico de memória aceito na comparação'
+        )
+
+    def handle(self, *args, **options):
+        # Usa sempre um banco de teste descartável, nunca o banco configurado
+        setup_test_environment()
+        config_antiga = setup_databases(verbosity=0, interactive=False)
+        try:
+            inicio = timezone.now()
+            users = benchmark.popular_dados(
+                usuarios=options['usuarios'],
+                jogos=options['jogos'],
+                perguntas_por_casa=options['perguntas_por_casa'],
+            )
+            self.stdout.write(f'Dados populados em {(timezone.now() - inicio).total_seconds():.1f}s')
+            resultados = benchmark.executar(users, repeticoes=options['repeticoes'])
+        finally:
+            teardown_databases(config_antiga, verbosity=0)
+            teardown_test_environment()
+
+        relatorio = {
+            'commit': self._commit_atual(),
+            'gerado_em': timezone.now().isoformat(),
+            'parametros': {
+                chave: options[chave]
+                for chave in ('usuarios', 'jogos', 'perguntas_por_casa', 'repeticoes')
+            },
+            'resultados': resultados,
+            'engine': benchmark.medir_engine(),
+        }
+
+        anteriores = {}
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as arquivo:
+                anteriores = json.load(arquivo).get('resultados', {})
+
+        self._imprimir(resultados, anteriores)
+        self.stdout.write(
+            f"engine: {relatorio['engine']['jogadas']} jogadas em {relatorio['engine']['tempo_ms']:.1f} ms"
+            f" ({relatorio['engine']['us_por_jogada']:.2f} µs por jogada)"
+        )
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultados gravados em {options['saida']}")
+
+        estouros = benchmark.estouros(resultados)
+        if estouros:
+            raise CommandError('Orçamento excedido:\n' + '\n'.join(estouros))
+        regressoes = benchmark.regressoes(
+            resultados, anteriores, options['tolerancia_tempo'], options['tolerancia_memoria']
+        )
+        if regressoes:
+            raise CommandError('Regressão em relação à execução anterior:\n' + '\n'.join(regressoes))
+        self.stdout.write(self.style.SUCCESS('Todos os endpoints dentro do orçamento'))
+
+    def _imprimir(self, resultados, anteriores):
+        self.stdout.write(f"{'endpoint':<36}{'consultas':>10}{'tempo ms':>11}{'memória KB':>12}")
+        for nome, metricas in sorted(resultados.items()):
+            linha = (
+                f"{nome:<36}{metricas['consultas']:>10}"
+                f"{metricas['tempo_ms']:>11.2f}{metricas['memoria_pico_kb']:>12.1f}"
+            )
+            anterior = anteriores.get(nome)
+            if anterior:
+                linha += (
+                    f"   (antes: {anterior['consultas']} consultas,"
+                    f" {anterior['tempo_ms']:.2f} ms, {anterior['memoria_pico_kb']:.1f} KB)"
+                )
+            self.stdout.write(linha)
+
+    def _commit_atual(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,61 @@
+# core/management/commands/cancelar_partidas_abandonadas.py
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core import abandonadas
+
+
+class Command(BaseCommand):
+    help = (
+        'Cancela as partidas em andamento sem atividade há mais que o tempo '
+        'limite e recalcula as estatísticas dos jogadores afetados'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutos', type=int, default=settings.PARTIDA_ABANDONADA_MINUTOS,
+            help='Minutos sem atividade para considerar uma partida abandonada'
+        )
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help='Quantidade de jogadores recalculados por lote'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Executa continuamente, como um worker de longa duração'
+        )
+        parser.add_argument(
+            '--intervalo', type=int, default=60,
+            help='Segundos entre as varreduras no modo --loop'
+        )
+
+    def handle(self, *args, **options):
+        if options['minutos'] <= 0 or options['lote'] <= 0 or options['intervalo'] <= 0:
+            raise CommandError('--minutos, --lote e --intervalo devem ser positivos.')
+        ociosidade = datetime.timedelta(minutes=options['minutos'])
+
+        if not options['loop']:
+            self._varrer(ociosidade, options['lote'])
+            return
+
+        self.stdout.write(
+            f"Coletando partidas ociosas há mais de {options['minutos']} min "
+            f"a cada {options['intervalo']}s (Ctrl+C para sair)"
+        )
+        try:
+            while True:
+                self._varrer(ociosidade, options['lote'])
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('Coletor encerrado.')
+
+    def _varrer(self, ociosidade, tamanho_lote):
+        relatorio = abandonadas.cancelar_abandonadas(ociosidade, tamanho_lote=tamanho_lote)
+        self.stdout.write(self.style.SUCCESS(
+            f"{relatorio['canceladas']} partidas canceladas em {relatorio['tempo_cancelamento_ms']}ms "
+            f"({relatorio['partidas_por_segundo']}/s); "
+            f"{relatorio['jogadores']} jogadores recalculados em {relatorio['tempo_estatisticas_ms']}ms "
+            f"({relatorio['jogadores_por_segundo']}/s)"
+        ))
@@ -0,0 +1,157 @@
+# core/management/commands/carga_tabuleiro.py
+import http.client
+import json
+import secrets
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from core import banco_perguntas, selecao_perguntas
+from core.models import Game, PontuacaoJogo
+
+PREFIXO_USUARIO = 'carga_'
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga local das ações do tabuleiro contra um servidor em '
+        'execução, para comparar os perfis WSGI e ASGI (SERVIDOR no Dockerfile). '
+        'Usa o banco configurado para criar os jogadores de carga'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Endereço do servidor')
+        parser.add_argument(
+            '--endpoint', choices=['acoes', 'tabuleiro'], default='acoes',
+            help="'acoes' (view assíncrona) ou 'tabuleiro' (POST na página do tabuleiro)"
+        )
+        parser.add_argument(
+            '--acao', choices=['check_status', 'get_pergunta', 'update_score'], default='check_status',
+            help='Ação enviada em cada requisição'
+        )
+        parser.add_argument('--usuarios', type=int, default=20, help='Jogadores simulados')
+        parser.add_argument('--requisicoes', type=int, default=2000, help='Total de requisições')
+        parser.add_argument('--concorrencia', type=int, default=50, help='Requisições simultâneas')
+        parser.add_argument(
+            '--limpar', action='store_true',
+            help='Remove os jogadores de carga (e suas partidas) ao final'
+        )
+
+    def handle(self, *args, **options):
+        if min(options['usuarios'], options['requisicoes'], options['concorrencia']) <= 0:
+            raise CommandError('--usuarios, --requisicoes e --concorrencia devem ser positivos.')
+        destino = urlsplit(options['url'])
+        if destino.scheme not in ('http', 'https') or not destino.hostname:
+            raise CommandError(f"URL inválida: {options['url']}")
+
+        jogadores = self._preparar_jogadores(options['usuarios'])
+        try:
+            relatorio = self._executar(destino, jogadores, options)
+        finally:
+            if options['limpar']:
+                User.objects.filter(username__startswith=PREFIXO_USUARIO).delete()
+
+        self.stdout.write(json.dumps(relatorio, indent=2, ensure_ascii=False))
+        self.stdout.write(self.style.SUCCESS(
+            f"{relatorio['requisicoes_por_segundo']} req/s com concorrência {options['concorrencia']} "
+            f"(p50 {relatorio['latencia_p50_ms']}ms, p95 {relatorio['latencia_p95_ms']}ms, "
+            f"{relatorio['erros']} erros)"
+        ))
+
+    def _preparar_jogadores(self, quantidade):
+        """Cria (ou reaproveita) jogadores logados, cada um com uma partida em andamento"""
+        motor_sessao = import_module(settings.SESSION_ENGINE)
+        # Posiciona todos numa zona de pergunta para que get_pergunta seja válido
+        casa = min(banco_perguntas.obter_banco().por_casa, default=0)
+        jogadores = []
+        for i in range(quantidade):
+            user, _ = User.objects.get_or_create(username=f'{PREFIXO_USUARIO}{i}')
+            jogo = Game.objects.filter(partidas=user, status='IN_PROGRESS').first()
+            if jogo is None:
+                jogo = Game.objects.create(baralho=selecao_perguntas.sortear_baralho())
+                jogo.partidas.add(user)
+                PontuacaoJogo.objects.create(jogo=jogo, jogador=user, pontuacao=0)
+            Game.objects.filter(pk=jogo.pk).update(casa_atual=casa)
+
+            sessao = motor_sessao.SessionStore()
+            sessao[SESSION_KEY] = str(user.pk)
+            sessao[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+            sessao[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            sessao.save()
+
+            jogadores.append({
+                'jogo_id': jogo.id,
+                'casa': casa,
+                'sessao': sessao.session_key,
+                'csrf': secrets.token_hex(16),
+            })
+        return jogadores
+
+    def _executar(self, destino, jogadores, options):
+        endpoint, acao = options['endpoint'], options['acao']
+        conexoes = threading.local()
+        latencias = []
+        erros = []
+
+        def caminho(jogador):
+            if endpoint == 'acoes':
+                return reverse('tabuleiro_acoes')
+            return reverse('tabuleiro_continue', args=[jogador['jogo_id']])
+
+        def requisitar(i):
+            jogador = jogadores[i % len(jogadores)]
+            # Uma conexão keep-alive por thread
+            if getattr(conexoes, 'http', None) is None:
+                classe = http.client.HTTPSConnection if destino.scheme == 'https' else http.client.HTTPConnection
+                conexoes.http = classe(destino.hostname, destino.port, timeout=30)
+            corpo = urlencode({'action': acao, 'jogo_id': jogador['jogo_id'], 'casa_id': jogador['casa']})
+            cabecalhos = {
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Cookie': f"{settings.SESSION_COOKIE_NAME}={jogador['sessao']}; "
+                          f"{settings.CSRF_COOKIE_NAME}={jogador['csrf']}",
+                'X-CSRFToken': jogador['csrf'],
+            }
+            inicio = time.perf_counter()
+            try:
+                conexoes.http.request('POST', caminho(jogador), corpo, cabecalhos)
+                resposta = conexoes.http.getresponse()
+                resposta.read()
+                status = resposta.status
+            except (OSError, http.client.HTTPException) as e:
+                conexoes.http.close()
+                conexoes.http = None
+                status = type(e).__name__
+            latencias.append(time.perf_counter() - inicio)
+            if status != 200:
+                erros.append(status)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concorrencia']) as executor:
+            list(executor.map(requisitar, range(options['requisicoes'])))
+        duracao = time.perf_counter() - inicio
+
+        latencias.sort()
+        percentis = statistics.quantiles(latencias, n=100) if len(latencias) > 1 else latencias * 99
+        return {
+            'url': destino.geturl(),
+            'endpoint': endpoint,
+            'acao': acao,
+            'requisicoes': len(latencias),
+            'concorrencia': options['concorrencia'],
+            'duracao_s': round(duracao, 3),
+            'requisicoes_por_segundo': round(len(latencias) / duracao, 1) if duracao else 0.0,
+            'latencia_media_ms': round(statistics.fmean(latencias) * 1000, 2),
+            'latencia_p50_ms': round(percentis[49] * 1000, 2),
+            'latencia_p95_ms': round(percentis[94] * 1000, 2),
+            'latencia_p99_ms': round(percentis[98] * 1000, 2),
+            'erros': len(erros),
+            'status_erros': sorted({str(status) for status in erros}),
+        }
@@ -0,0 +1,81 @@
+# core/management/commands/importar_perguntas.py
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core import importacao
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa o banco de perguntas de uma planilha Excel ou de arquivos '
+        'CSV/Parquet/JSONL, gravando apenas as linhas novas ou alteradas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'perguntas',
+            help='Arquivo de perguntas (.xlsx, .csv, .parquet ou .jsonl)'
+        )
+        parser.add_argument(
+            '--respostas',
+            help='Arquivo de respostas (padrão: a aba de respostas do mesmo Excel)'
+        )
+        parser.add_argument('--planilha-perguntas', default='Pergunta', help='Aba de perguntas no Excel')
+        parser.add_argument('--planilha-respostas', default='Resposta', help='Aba de respostas no Excel')
+        parser.add_argument(
+            '--lote', type=int, default=importacao.TAMANHO_LOTE,
+            help='Quantidade de linhas lidas e gravadas por vez'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Apenas exibe as diferenças em relação ao banco, sem gravar'
+        )
+
+    def handle(self, *args, **options):
+        fontes = [options['perguntas']]
+        respostas = options['respostas']
+        if respostas is None and os.path.splitext(options['perguntas'])[1].lower() in ('.xlsx', '.xlsm'):
+            respostas = options['perguntas']
+        if respostas:
+            fontes.append(respostas)
+        for fonte in fontes:
+            if not os.path.exists(fonte):
+                raise CommandError(f'Arquivo {fonte} não encontrado!')
+
+        aplicar = not options['dry_run']
+        inicio = time.perf_counter()
+        try:
+            relatorio = importacao.importar(
+                options['perguntas'],
+                respostas,
+                planilha_perguntas=options['planilha_perguntas'],
+                planilha_respostas=options['planilha_respostas'],
+                aplicar=aplicar,
+                tamanho_lote=options['lote'],
+                saida=self.stdout.write,
+            )
+        except (ValueError, KeyError) as e:
+            raise CommandError(f'Erro ao ler a fonte: {e}')
+        duracao = time.perf_counter() - inicio
+
+        if not aplicar:
+            self.stdout.write('\n---------- DIFERENÇAS (dry-run) ----------')
+            for diferenca in relatorio.diferencas:
+                self.stdout.write(diferenca)
+            if not relatorio.diferencas:
+                self.stdout.write('Nenhuma diferença encontrada.')
+
+        verbo = 'seriam' if not aplicar else 'foram'
+        self.stdout.write('\n---------- RELATÓRIO DE IMPORTAÇÃO ----------')
+        self.stdout.write(f"Perguntas que {verbo} criadas: {relatorio['perguntas_criadas']}")
+        self.stdout.write(f"Perguntas que {verbo} atualizadas: {relatorio['perguntas_atualizadas']}")
+        self.stdout.write(f"Perguntas inalteradas: {relatorio['perguntas_inalteradas']}")
+        self.stdout.write(f"Falhas em perguntas: {relatorio['perguntas_falhas']}")
+        self.stdout.write(f"Respostas que {verbo} criadas: {relatorio['respostas_criadas']}")
+        self.stdout.write(f"Respostas que {verbo} atualizadas: {relatorio['respostas_atualizadas']}")
+        self.stdout.write(f"Respostas inalteradas: {relatorio['respostas_inalteradas']}")
+        self.stdout.write(f"Falhas em respostas: {relatorio['respostas_falhas']}")
+        self.stdout.write('--------------------------------------------')
+
+        self.stdout.write(self.style.SUCCESS(f'Importação concluída em {duracao:.2f}s'))
@@ -0,0 +1,73 @@
+# core/management/commands/processar_eventos_fim_de_jogo.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core import estatisticas, eventos_resposta
+
+
+class Command(BaseCommand):
+    help = (
+        'Consome a caixa de saída de partidas encerradas e atualiza as '
+        'estatísticas dos jogadores, agrupando os eventos por jogador. Também '
+        'grava em lote as respostas acumuladas nas partidas encerradas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help='Quantidade de eventos consumidos por transação'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Executa continuamente, como um worker de longa duração'
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=2,
+            help='Segundos de espera no modo --loop quando a fila está vazia'
+        )
+        parser.add_argument(
+            '--atraso-maximo', type=float, default=30,
+            help='Atraso (s) acima do qual o worker emite um aviso'
+        )
+
+    def handle(self, *args, **options):
+        if options['lote'] <= 0 or options['intervalo'] <= 0:
+            raise CommandError('--lote e --intervalo devem ser positivos.')
+
+        if not options['loop']:
+            self._relatar(estatisticas.processar_eventos(options['lote']), options['atraso_maximo'])
+            self._relatar_respostas(eventos_resposta.descarregar(options['lote']))
+            return
+
+        self.stdout.write("Processando eventos de fim de jogo (Ctrl+C para sair)")
+        try:
+            while True:
+                relatorio = estatisticas.processar_eventos(options['lote'])
+                respostas = eventos_resposta.descarregar(options['lote'])
+                if relatorio['eventos']:
+                    self._relatar(relatorio, options['atraso_maximo'])
+                if respostas['partidas']:
+                    self._relatar_respostas(respostas)
+                if not relatorio['eventos'] and not respostas['partidas']:
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('Worker encerrado.')
+
+    def _relatar(self, relatorio, atraso_maximo):
+        self.stdout.write(self.style.SUCCESS(
+            f"{relatorio['eventos']} eventos aplicados a {relatorio['jogadores']} jogadores "
+            f"em {relatorio['lotes']} lotes, {relatorio['tempo_ms']}ms "
+            f"({relatorio['eventos_por_segundo']}/s); "
+            f"atraso máximo {relatorio['atraso_max_s']}s, médio {relatorio['atraso_medio_s']}s"
+        ))
+        if relatorio['atraso_max_s'] > atraso_maximo:
+            self.stdout.write(self.style.WARNING(
+                f"Atraso acima de {atraso_maximo}s: aumente --lote ou o número de workers"
+            ))
+
+    def _relatar_respostas(self, relatorio):
+        self.stdout.write(self.style.SUCCESS(
+            f"{relatorio['respostas']} respostas de {relatorio['partidas']} partidas gravadas "
+            f"em {relatorio['lotes']} lotes, {relatorio['tempo_ms']}ms "
+            f"({relatorio['respostas_por_segundo']}/s)"
+        ))
@@ -0,0 +1,24 @@
+# core/management/commands/recalcular_estatisticas.py
+from django.core.management.base import BaseCommand
+from core.estatisticas import recalcular_estatisticas
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói as estatísticas acumuladas dos jogadores a partir do histórico de partidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuarios', nargs='+', type=int,
+            help='IDs dos usuários a recalcular (padrão: todos)'
+        )
+        parser.add_argument(
+            '--lote', type=int, default=500,
+            help='Quantidade de jogadores processados por lote'
+        )
+
+    def handle(self, *args, **options):
+        total = recalcular_estatisticas(options['usuarios'], tamanho_lote=options['lote'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Estatísticas recalculadas para {total} jogadores')
+        )
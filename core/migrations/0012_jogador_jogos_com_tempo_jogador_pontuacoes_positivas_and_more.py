@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_alter_pergunta_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jogador',
+            name='jogos_com_tempo',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='jogador',
+            name='pontuacoes_positivas',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='jogador',
+            name='soma_pontuacoes_positivas',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='jogador',
+            name='soma_tempo_jogo',
+            field=models.FloatField(default=0.0),
+        ),
+    ]
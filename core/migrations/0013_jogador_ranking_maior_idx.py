@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_jogador_jogos_com_tempo_jogador_pontuacoes_positivas_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jogador',
+            index=models.Index(condition=models.Q(('jogos_jogados__gt', 0)), fields=['-maior_pontuacao', 'id'], name='jogador_ranking_maior_idx'),
+        ),
+    ]
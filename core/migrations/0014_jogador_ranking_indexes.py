@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_jogador_ranking_maior_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jogador',
+            index=models.Index(condition=models.Q(('jogos_jogados__gt', 0)), fields=['-pontuacao_media', 'id'], name='jogador_ranking_media_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jogador',
+            index=models.Index(condition=models.Q(('jogos_jogados__gt', 0)), fields=['-vitorias', 'id'], name='jogador_ranking_vitorias_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jogador',
+            index=models.Index(condition=models.Q(('jogos_jogados__gt', 0)), fields=['-jogos_jogados', 'id'], name='jogador_ranking_jogos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jogador',
+            index=models.Index(condition=models.Q(('jogos_jogados__gt', 0)), fields=['-total_perguntas_certas', 'id'], name='jogador_ranking_certas_idx'),
+        ),
+    ]
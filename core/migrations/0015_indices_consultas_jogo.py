@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_jogador_ranking_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(('status', 'IN_PROGRESS')), fields=['inicio_tempo'], name='game_em_andamento_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['status', '-inicio_tempo'], name='game_status_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pergunta',
+            index=models.Index(fields=['posicao_tabuleiro', 'category'], name='pergunta_casa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pontuacaojogo',
+            index=models.Index(fields=['jogador', 'jogo'], name='pontuacao_jogador_jogo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resposta',
+            index=models.Index(fields=['pergunta', 'e_correto'], name='resposta_pergunta_correta_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_indices_consultas_jogo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='baralho',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
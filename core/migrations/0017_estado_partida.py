@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_game_baralho'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='casa_atual',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='casas_respondidas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='dica_usada',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='pergunta_atual',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
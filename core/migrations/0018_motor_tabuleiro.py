@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:00
+
+import core.engine
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_estado_partida'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='jogadas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='semente',
+            field=models.BigIntegerField(default=core.engine.nova_semente),
+        ),
+    ]
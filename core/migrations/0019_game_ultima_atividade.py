@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:03
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+
+def preencher_ultima_atividade(apps, schema_editor):
+    # Partidas existentes: a última atividade conhecida é o fim ou o início
+    Game = apps.get_model('core', 'Game')
+    Game.objects.update(ultima_atividade=Coalesce(F('fim_tempo'), F('inicio_tempo')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_motor_tabuleiro'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='ultima_atividade',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(preencher_ultima_atividade, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(('status', 'IN_PROGRESS')), fields=['ultima_atividade'], name='game_ociosa_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_game_ultima_atividade'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoFimDeJogo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pontuacao', models.IntegerField()),
+                ('duracao', models.FloatField(default=0)),
+                ('vitoria', models.BooleanField(default=False)),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('jogador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_fim', to=settings.AUTH_USER_MODEL)),
+                ('jogo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_fim', to='core.game')),
+            ],
+            options={
+                'verbose_name': 'Evento de fim de jogo',
+                'verbose_name_plural': 'Eventos de fim de jogo',
+                'unique_together': {('jogo', 'jogador')},
+            },
+        ),
+    ]
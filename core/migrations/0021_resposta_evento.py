@@ -0,0 +1,42 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_evento_fim_de_jogo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespostaEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jogo_id', models.IntegerField()),
+                ('jogador_id', models.IntegerField()),
+                ('pergunta_id', models.IntegerField()),
+                ('resposta_id', models.IntegerField()),
+                ('correta', models.BooleanField()),
+                ('usou_dica', models.BooleanField()),
+                ('tempo_ms', models.PositiveIntegerField(null=True)),
+                ('respondida_em', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Evento de resposta',
+                'verbose_name_plural': 'Eventos de resposta',
+            },
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='respostas_pendentes',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(('respostas_pendentes__isnull', False), models.Q(('status', 'IN_PROGRESS'), _negated=True)), fields=['id'], name='game_respostas_pendentes_idx'),
+        ),
+    ]
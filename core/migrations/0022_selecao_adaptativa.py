@@ -0,0 +1,69 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:20
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def preencher_contadores(apps, schema_editor):
+    # Respostas gravadas antes desta migração entram nos contadores
+    RespostaEvento = apps.get_model('core', 'RespostaEvento')
+    Pergunta = apps.get_model('core', 'Pergunta')
+    Jogador = apps.get_model('core', 'Jogador')
+
+    contagens = (
+        RespostaEvento.objects.values('pergunta_id')
+        .annotate(respostas=Count('id'), acertos=Count('id', filter=Q(correta=True)))
+    )
+    for linha in contagens:
+        Pergunta.objects.filter(id=linha['pergunta_id']).update(
+            respostas_registradas=linha['respostas'], acertos_registrados=linha['acertos']
+        )
+
+    jogadores = {}
+    for jogador_id, pergunta_id, correta in (
+        RespostaEvento.objects.order_by('jogador_id').values_list('jogador_id', 'pergunta_id', 'correta').iterator()
+    ):
+        respostas, acertos, vistas = jogadores.get(jogador_id, (0, 0, 0))
+        jogadores[jogador_id] = (respostas + 1, acertos + correta, vistas | 1 << pergunta_id)
+    for jogador_id, (respostas, acertos, vistas) in jogadores.items():
+        Jogador.objects.filter(user_jogador_id=jogador_id).update(
+            respostas_registradas=respostas,
+            acertos_registrados=acertos,
+            perguntas_vistas=vistas.to_bytes((vistas.bit_length() + 7) // 8, 'little'),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_resposta_evento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jogador',
+            name='acertos_registrados',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='jogador',
+            name='perguntas_vistas',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AddField(
+            model_name='jogador',
+            name='respostas_registradas',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pergunta',
+            name='acertos_registrados',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pergunta',
+            name='respostas_registradas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_selecao_adaptativa'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticaDiariaGlobal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(unique=True)),
+                ('partidas', models.IntegerField(default=0)),
+                ('partidas_completadas', models.IntegerField(default=0)),
+                ('soma_pontuacao', models.IntegerField(default=0)),
+                ('soma_duracao', models.FloatField(default=0.0)),
+                ('respostas', models.IntegerField(default=0)),
+                ('acertos', models.IntegerField(default=0)),
+                ('por_categoria', models.JSONField(default=dict)),
+                ('histograma', models.JSONField(default=dict)),
+            ],
+            options={
+                'verbose_name': 'Estatística diária global',
+                'verbose_name_plural': 'Estatísticas diárias globais',
+            },
+        ),
+        migrations.CreateModel(
+            name='MarcaAgregacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True)),
+                ('ultimo_id', models.BigIntegerField(default=0)),
+                ('processados', models.JSONField(default=list)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Marca de agregação',
+                'verbose_name_plural': 'Marcas de agregação',
+            },
+        ),
+        migrations.CreateModel(
+            name='EstatisticaDiariaJogador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('partidas', models.IntegerField(default=0)),
+                ('partidas_completadas', models.IntegerField(default=0)),
+                ('vitorias', models.IntegerField(default=0)),
+                ('soma_pontuacao', models.IntegerField(default=0)),
+                ('maior_pontuacao', models.IntegerField(default=0)),
+                ('soma_duracao', models.FloatField(default=0.0)),
+                ('respostas', models.IntegerField(default=0)),
+                ('acertos', models.IntegerField(default=0)),
+                ('por_categoria', models.JSONField(default=dict)),
+                ('jogador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estatisticas_diarias', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Estatística diária do jogador',
+                'verbose_name_plural': 'Estatísticas diárias dos jogadores',
+                'constraints': [models.UniqueConstraint(fields=('jogador', 'dia'), name='estatistica_diaria_jogador_dia')],
+            },
+        ),
+    ]
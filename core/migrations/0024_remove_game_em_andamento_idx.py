@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_agregados_diarios'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='game',
+            name='game_em_andamento_idx',
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_remove_game_em_andamento_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaVersao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True)),
+                ('valor', models.CharField(max_length=32)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Marca de versão',
+                'verbose_name_plural': 'Marcas de versão',
+            },
+        ),
+    ]
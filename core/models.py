@@ -1,5 +1,6 @@
 import os
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.validators import RegexValidator
@@ -7,6 +8,8 @@ from imagekit.models import ProcessedImageField
 from imagekit.processors import ResizeToFit
 from django.core.exceptions import ValidationError
 
+from . import engine
+
 
 def validate_image(value):
     file_extension = os.path.splitext(value.name)[1].lower()
@@ -25,6 +28,17 @@ class Jogador(models.Model):
     maior_pontuacao = models.IntegerField(default=0)  # Nova estatística
     tempo_medio_jogo = models.IntegerField(default=0)  # Em segundos
     total_perguntas_certas = models.IntegerField(default=0)  # Total de perguntas certas
+    # Agregados acumulados usados para manter as médias em O(1) ao fim de cada partida
+    pontuacoes_positivas = models.IntegerField(default=0)  # Partidas com pontuação > 0
+    soma_pontuacoes_positivas = models.IntegerField(default=0)
+    jogos_com_tempo = models.IntegerField(default=0)  # Partidas com duração válida
+    soma_tempo_jogo = models.FloatField(default=0.0)  # Em segundos
+    # Respostas já gravadas em RespostaEvento (core.eventos_resposta): acerto
+    # acumulado e perguntas vistas (bitset pelo id da pergunta), usados pela
+    # seleção adaptativa de perguntas (core.selecao_perguntas)
+    respostas_registradas = models.IntegerField(default=0)
+    acertos_registrados = models.IntegerField(default=0)
+    perguntas_vistas = models.BinaryField(default=b'')
 
     def __str__(self):
         return self.user_jogador.username
@@ -33,6 +47,35 @@ class Jogador(models.Model):
         verbose_name = 'Jogador'
         verbose_name_plural = 'Jogadores'
         ordering = ['-jogos_jogados']
+        indexes = [
+            # Um índice por critério do ranking (apenas jogadores ranqueados).
+            # Percorrido de trás para frente, atende também à ordem crescente.
+            models.Index(
+                fields=['-maior_pontuacao', 'id'],
+                name='jogador_ranking_maior_idx',
+                condition=Q(jogos_jogados__gt=0),
+            ),
+            models.Index(
+                fields=['-pontuacao_media', 'id'],
+                name='jogador_ranking_media_idx',
+                condition=Q(jogos_jogados__gt=0),
+            ),
+            models.Index(
+                fields=['-vitorias', 'id'],
+                name='jogador_ranking_vitorias_idx',
+                condition=Q(jogos_jogados__gt=0),
+            ),
+            models.Index(
+                fields=['-jogos_jogados', 'id'],
+                name='jogador_ranking_jogos_idx',
+                condition=Q(jogos_jogados__gt=0),
+            ),
+            models.Index(
+                fields=['-total_perguntas_certas', 'id'],
+                name='jogador_ranking_certas_idx',
+                condition=Q(jogos_jogados__gt=0),
+            ),
+        ]
 
 
 class Game(models.Model):
@@ -60,10 +103,69 @@ class Game(models.Model):
         blank=True,
         related_name='jogos_ganhos'
     )
+    # Baralho da partida: id da pergunta sorteada para cada casa do
+    # tabuleiro (posição 0 = casa 1); None nas casas sem pergunta
+    baralho = models.JSONField(default=list, blank=True)
+
+    # Estado da partida em andamento, guardado por partida (e não na sessão)
+    # para que várias abas e partidas convivam e o cliente não possa alterá-lo.
+    # Semente do dado, posição e lançamentos formam o estado do core.engine
+    semente = models.BigIntegerField(default=engine.nova_semente)
+    jogadas = models.PositiveIntegerField(default=0)
+    casa_atual = models.PositiveSmallIntegerField(default=0)
+    # Pergunta em aberto (id do banco de perguntas) e se a dica foi usada nela
+    pergunta_atual = models.IntegerField(null=True, blank=True)
+    dica_usada = models.BooleanField(default=False)
+    # Casas do baralho já respondidas: o bit n marca a casa n
+    casas_respondidas = models.PositiveIntegerField(default=0)
+    # Momento da última ação da partida: usado pelo coletor de partidas
+    # abandonadas (comando cancelar_partidas_abandonadas)
+    ultima_atividade = models.DateTimeField(default=timezone.now)
+    # Respostas da partida ainda não gravadas em RespostaEvento: lista de
+    # linhas compactas (core.eventos_resposta), descarregada em lote depois
+    # que a partida é encerrada
+    respostas_pendentes = models.JSONField(null=True, blank=True)
 
     def __str__(self):
         return f"Jogo {self.id} - {self.status}"
 
+    @property
+    def estado_engine(self):
+        return engine.EstadoJogo(self.semente, self.casa_atual, self.jogadas)
+
+    def casa_respondida(self, casa):
+        return bool(self.casas_respondidas & (1 << casa))
+
+    def pergunta_do_baralho(self, casa):
+        """Id da pergunta sorteada para a casa informada (ou None)"""
+        try:
+            casa = int(casa)
+        except (ValueError, TypeError):
+            return None
+        if 1 <= casa <= len(self.baralho):
+            return self.baralho[casa - 1]
+        return None
+
+    class Meta:
+        # A partida em andamento do jogador (partidas=user, status=IN_PROGRESS)
+        # é encontrada pelo índice de user_id da tabela intermediária e pela
+        # chave primária do Game; não precisa de índice próprio aqui.
+        indexes = [
+            models.Index(fields=['status', '-inicio_tempo'], name='game_status_inicio_idx'),
+            # Partidas em andamento ociosas, varridas pelo coletor de abandonadas
+            models.Index(
+                fields=['ultima_atividade'],
+                name='game_ociosa_idx',
+                condition=Q(status='IN_PROGRESS'),
+            ),
+            # Partidas encerradas com respostas ainda por descarregar
+            models.Index(
+                fields=['id'],
+                name='game_respostas_pendentes_idx',
+                condition=Q(respostas_pendentes__isnull=False) & ~Q(status='IN_PROGRESS'),
+            ),
+        ]
+
 
 class PontuacaoJogo(models.Model):
     """
@@ -75,11 +177,160 @@ class PontuacaoJogo(models.Model):
 
     class Meta:
         unique_together = ['jogo', 'jogador']
+        indexes = [
+            # Histórico de pontuações de um jogador
+            models.Index(fields=['jogador', 'jogo'], name='pontuacao_jogador_jogo_idx'),
+        ]
 
     def __str__(self):
         return f"{self.jogador.username} - Score: {self.pontuacao}"
 
 
+class EventoFimDeJogo(models.Model):
+    """
+    Caixa de saída (outbox) das partidas encerradas: gravada na mesma
+    transação que fecha o Game e consumida pelo comando
+    processar_eventos_fim_de_jogo, que incorpora o resultado às
+    estatísticas do Jogador. O evento é apagado ao ser aplicado.
+    """
+    jogo = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='eventos_fim')
+    jogador = models.ForeignKey(User, on_delete=models.CASCADE, related_name='eventos_fim')
+    pontuacao = models.IntegerField()
+    # Duração da partida em segundos (0 se os tempos não forem válidos)
+    duracao = models.FloatField(default=0)
+    vitoria = models.BooleanField(default=False)
+    criado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # Uma partida se encerra uma única vez para cada jogador
+        unique_together = ['jogo', 'jogador']
+        verbose_name = 'Evento de fim de jogo'
+        verbose_name_plural = 'Eventos de fim de jogo'
+
+    def __str__(self):
+        return f"Jogo {self.jogo_id} - {self.jogador_id}"
+
+
+class RespostaEvento(models.Model):
+    """
+    Registro (somente inclusão) de cada resposta dada no tabuleiro, para
+    análise das perguntas (core.analise_perguntas). Linha compacta: apenas
+    inteiros, sem chaves estrangeiras nem índices além da chave primária,
+    para que as inclusões em lote e a leitura sequencial sejam baratas.
+    """
+    jogo_id = models.IntegerField()
+    jogador_id = models.IntegerField()
+    pergunta_id = models.IntegerField()
+    resposta_id = models.IntegerField()
+    correta = models.BooleanField()
+    usou_dica = models.BooleanField()
+    # Tempo entre a pergunta ficar disponível e a resposta (None se desconhecido)
+    tempo_ms = models.PositiveIntegerField(null=True)
+    respondida_em = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Evento de resposta'
+        verbose_name_plural = 'Eventos de resposta'
+
+    def __str__(self):
+        return f"Pergunta {self.pergunta_id} - Resposta {self.resposta_id}"
+
+
+class EstatisticaDiariaJogador(models.Model):
+    """
+    Agregado diário das partidas e respostas de um jogador, preenchido de
+    forma incremental pelo comando agregar_estatisticas (core.agregados).
+    """
+    jogador = models.ForeignKey(User, on_delete=models.CASCADE, related_name='estatisticas_diarias')
+    dia = models.DateField()
+    # Partidas encerradas (completadas ou canceladas) e completadas
+    partidas = models.IntegerField(default=0)
+    partidas_completadas = models.IntegerField(default=0)
+    vitorias = models.IntegerField(default=0)
+    # Pontuação das partidas completadas
+    soma_pontuacao = models.IntegerField(default=0)
+    maior_pontuacao = models.IntegerField(default=0)
+    soma_duracao = models.FloatField(default=0.0)  # Em segundos
+    respostas = models.IntegerField(default=0)
+    acertos = models.IntegerField(default=0)
+    # {categoria: [respostas, acertos]}
+    por_categoria = models.JSONField(default=dict)
+
+    class Meta:
+        verbose_name = 'Estatística diária do jogador'
+        verbose_name_plural = 'Estatísticas diárias dos jogadores'
+        constraints = [
+            # Também é o índice das consultas por jogador e período
+            models.UniqueConstraint(fields=['jogador', 'dia'], name='estatistica_diaria_jogador_dia'),
+        ]
+
+    def __str__(self):
+        return f"{self.jogador_id} - {self.dia}"
+
+
+class EstatisticaDiariaGlobal(models.Model):
+    """
+    Agregado diário de todas as partidas, com o histograma das pontuações
+    das partidas completadas (faixas de core.agregados.LARGURA_FAIXA), usado
+    para calcular o percentil de um jogador sem ler as partidas.
+    """
+    dia = models.DateField(unique=True)
+    partidas = models.IntegerField(default=0)
+    partidas_completadas = models.IntegerField(default=0)
+    soma_pontuacao = models.IntegerField(default=0)
+    soma_duracao = models.FloatField(default=0.0)  # Em segundos
+    respostas = models.IntegerField(default=0)
+    acertos = models.IntegerField(default=0)
+    por_categoria = models.JSONField(default=dict)
+    # {início da faixa: partidas}
+    histograma = models.JSONField(default=dict)
+
+    class Meta:
+        verbose_name = 'Estatística diária global'
+        verbose_name_plural = 'Estatísticas diárias globais'
+
+    def __str__(self):
+        return str(self.dia)
+
+
+class MarcaAgregacao(models.Model):
+    """
+    Ponto até onde uma fonte já foi agregada: todos os registros com id até
+    `ultimo_id` foram processados, além dos ids em `processados` (acima da
+    marca, processados fora de ordem enquanto um registro anterior ainda não
+    estava pronto).
+    """
+    nome = models.CharField(max_length=50, unique=True)
+    ultimo_id = models.BigIntegerField(default=0)
+    processados = models.JSONField(default=list)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Marca de agregação'
+        verbose_name_plural = 'Marcas de agregação'
+
+    def __str__(self):
+        return f"{self.nome}: {self.ultimo_id}"
+
+
+class MarcaVersao(models.Model):
+    """
+    Versão de um dado que cada processo guarda em memória (banco de
+    perguntas, ranking). Fica no banco para ser vista por todos os
+    processos, qualquer que seja o backend de cache (core.versoes).
+    """
+    nome = models.CharField(max_length=50, unique=True)
+    valor = models.CharField(max_length=32)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Marca de versão'
+        verbose_name_plural = 'Marcas de versão'
+
+    def __str__(self):
+        return f"{self.nome}: {self.valor}"
+
+
 class Pergunta(models.Model):
     CATEGORY_CHOICES = [
         ('BASICA', 'Estatística Básica'),
@@ -133,6 +384,10 @@ class Pergunta(models.Model):
         validators=[validate_image],
     )
     criado_em = models.DateTimeField(auto_now_add=True)
+    # Respostas e acertos já gravados em RespostaEvento: a dificuldade usada
+    # pela seleção adaptativa (core.selecao_perguntas)
+    respostas_registradas = models.PositiveIntegerField(default=0, editable=False)
+    acertos_registrados = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"Casa {self.posicao_tabuleiro}: {self.text[:50]}"
@@ -141,6 +396,9 @@ class Pergunta(models.Model):
         verbose_name = "Pergunta"
         verbose_name_plural = "Perguntas"
         ordering = ['posicao_tabuleiro', 'category']
+        indexes = [
+            models.Index(fields=['posicao_tabuleiro', 'category'], name='pergunta_casa_idx'),
+        ]
 
 class Resposta(models.Model):
     codigo = models.CharField(
@@ -162,6 +420,10 @@ class Resposta(models.Model):
 
     class Meta:
         unique_together = ['codigo', 'pergunta']
+        indexes = [
+            # Resposta correta de uma pergunta
+            models.Index(fields=['pergunta', 'e_correto'], name='resposta_pergunta_correta_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Verifica se o código está no formato padrão
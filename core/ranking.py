@@ -0,0 +1,288 @@
+"""
+Ranking de jogadores.
+
+Centraliza os critérios aceitos pelo RankingView e o desempate (pelo id do
+jogador), para que a posição exibida nas estatísticas seja a mesma da
+tabela de ranking.
+
+Para cada critério e direção é mantida no cache uma "foto" materializada
+com os primeiros TAMANHO_SNAPSHOT jogadores. A foto é atualizada de forma
+incremental ao fim de cada partida (atualizar_jogadores) e reconstruída por
+completo quando fica mais velha que settings.RANKING_SNAPSHOT_MAX_IDADE,
+o que limita a defasagem causada por atualizações concorrentes. Páginas
+além da foto são lidas do banco com paginação por chave (keyset).
+
+Cada alteração grava uma nova marca de versão no banco de dados
+(core.versoes), visível a todos os processos mesmo com o cache locmem, e
+cada foto guarda a marca que reflete.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+
+from . import versoes
+from .models import Jogador
+
+# Critérios válidos de ordenação: parâmetro da URL -> campo do Jogador
+CAMPOS_ORDENACAO = {
+    'maior_pontuacao': 'maior_pontuacao',
+    'pontuacao_media': 'pontuacao_media',
+    'vitorias': 'vitorias',
+    'jogos': 'jogos_jogados',
+    'perguntas_certas': 'total_perguntas_certas',
+}
+ORDENACAO_PADRAO = 'maior_pontuacao'
+DIRECOES = ('desc', 'asc')
+
+TAMANHO_PAGINA = 20
+TAMANHO_SNAPSHOT = 100
+
+# Alias do cache onde ficam as fotos (settings.CACHES)
+ALIAS_CACHE = 'ranking'
+
+# Marca de alteração do ranking (core.versoes), lida pela transmissão em
+# tempo real (ranking_tempo_real) para saber quando recalcular o topo
+CHAVE_VERSAO = 'core:ranking:versao'
+
+# Campos guardados em cada linha da foto (suficientes para renderizar a página)
+CAMPOS_LINHA = (
+    'id', 'user_jogador_id', 'maior_pontuacao', 'pontuacao_media', 'vitorias',
+    'jogos_jogados', 'total_perguntas_certas', 'tempo_medio_jogo',
+)
+
+
+def jogadores_ranqueados():
+    """Apenas jogadores que tenham jogado pelo menos um jogo entram no ranking"""
+    return Jogador.objects.filter(jogos_jogados__gt=0)
+
+
+def ordenacao(campo, direcao='desc'):
+    """
+    Cláusula order_by do ranking. Empates são resolvidos pelo id do
+    jogador (quem se cadastrou primeiro fica à frente no ranking
+    decrescente); a ordem crescente é exatamente a inversa, de modo que
+    um único índice (campo DESC, id) atende às duas direções.
+    """
+    if direcao == 'asc':
+        return [campo, '-id']
+    return [f'-{campo}', 'id']
+
+
+def posicao_no_ranking(jogador, campo=ORDENACAO_PADRAO):
+    """
+    Posição do jogador no ranking decrescente por `campo`, calculada com um
+    único COUNT sobre os jogadores à sua frente (usa o índice do campo).
+    Retorna None se o jogador ainda não foi ranqueado.
+    """
+    if jogador.jogos_jogados <= 0:
+        return None
+
+    valor = getattr(jogador, campo)
+    a_frente = jogadores_ranqueados().filter(
+        Q(**{f'{campo}__gt': valor}) | Q(**{campo: valor, 'id__lt': jogador.id})
+    ).count()
+    return a_frente + 1
+
+
+# ----------------------------------------------------------------------
+# Fotos materializadas do ranking
+# ----------------------------------------------------------------------
+
+def _cache():
+    return caches[ALIAS_CACHE]
+
+
+def _chave(order_by, direcao):
+    return f'core:ranking:{order_by}:{direcao}'
+
+
+def _linhas(queryset):
+    """Converte jogadores em linhas compactas (uma única consulta com JOIN)"""
+    linhas = []
+    for linha in queryset.values(*CAMPOS_LINHA, 'user_jogador__username'):
+        linha['username'] = linha.pop('user_jogador__username')
+        linhas.append(linha)
+    return linhas
+
+
+def _chave_ordenacao(linha, campo, direcao):
+    """Chave Python equivalente à ordenação SQL do ranking"""
+    if direcao == 'asc':
+        return (linha[campo], -linha['id'])
+    return (-linha[campo], linha['id'])
+
+
+def _construir_snapshot(order_by, direcao, versao=None):
+    campo = CAMPOS_ORDENACAO[order_by]
+    linhas = _linhas(
+        jogadores_ranqueados().order_by(*ordenacao(campo, direcao))[:TAMANHO_SNAPSHOT]
+    )
+    snapshot = {
+        'gerado_em': time.time(),
+        # Marca de alteração refletida pela foto
+        'versao': versao,
+        # Completa = contém todos os jogadores ranqueados
+        'completo': len(linhas) < TAMANHO_SNAPSHOT,
+        'linhas': linhas,
+    }
+    _cache().set(_chave(order_by, direcao), snapshot, timeout=None)
+    return snapshot
+
+
+def _expirado(snapshot):
+    idade_maxima = getattr(settings, 'RANKING_SNAPSHOT_MAX_IDADE', 60)
+    return time.time() - snapshot['gerado_em'] > idade_maxima
+
+
+def obter_snapshot(order_by, direcao, versao=None):
+    """
+    Foto do ranking, reconstruída se ausente, expirada ou esvaziada. Com
+    `versao`, também se não refletir essa marca de alteração: com um cache
+    local ao processo, as fotos atualizadas por outro processo não chegam.
+    """
+    snapshot = _cache().get(_chave(order_by, direcao))
+    if (
+        snapshot is None
+        or _expirado(snapshot)
+        or (not snapshot['completo'] and len(snapshot['linhas']) < TAMANHO_PAGINA)
+        or (versao is not None and snapshot.get('versao') != versao)
+    ):
+        snapshot = _construir_snapshot(order_by, direcao, versao)
+    return snapshot
+
+
+def _mesclar(snapshot, linha, campo, direcao):
+    """
+    Reposiciona a linha de um jogador na foto. A foto continua sendo
+    sempre um prefixo exato do ranking: quem sai do topo simplesmente é
+    removido, e só entra quem fica à frente do último colocado.
+    """
+    linhas = [item for item in snapshot['linhas'] if item['id'] != linha['id']]
+
+    if linha['jogos_jogados'] > 0:
+        chave = _chave_ordenacao(linha, campo, direcao)
+        posicao = len(linhas)
+        for i, item in enumerate(linhas):
+            if chave < _chave_ordenacao(item, campo, direcao):
+                posicao = i
+                break
+        if posicao < len(linhas) or snapshot['completo']:
+            linhas.insert(posicao, linha)
+
+    if len(linhas) > TAMANHO_SNAPSHOT:
+        del linhas[TAMANHO_SNAPSHOT:]
+        snapshot['completo'] = False
+
+    snapshot['linhas'] = linhas
+    return snapshot
+
+
+def atualizar_jogadores(user_ids):
+    """
+    Atualiza de forma incremental todas as fotos existentes com as
+    estatísticas atuais dos jogadores (uma consulta, independente do
+    tamanho da tabela de jogadores).
+    """
+    versao = _marcar_alteracao()
+    chaves = {
+        _chave(order_by, direcao): (CAMPOS_ORDENACAO[order_by], direcao)
+        for order_by in CAMPOS_ORDENACAO
+        for direcao in DIRECOES
+    }
+    snapshots = _cache().get_many(list(chaves))
+    if not snapshots:
+        return
+
+    linhas = _linhas(Jogador.objects.filter(user_jogador_id__in=user_ids))
+    if not linhas:
+        return
+
+    for chave, snapshot in snapshots.items():
+        campo, direcao = chaves[chave]
+        for linha in linhas:
+            _mesclar(snapshot, linha, campo, direcao)
+            snapshot['versao'] = versao
+    _cache().set_many(snapshots, timeout=None)
+
+
+def invalidar():
+    """Descarta todas as fotos (ex.: após recalcular estatísticas em massa)"""
+    _marcar_alteracao()
+    _cache().delete_many([
+        _chave(order_by, direcao)
+        for order_by in CAMPOS_ORDENACAO
+        for direcao in DIRECOES
+    ])
+
+
+def _marcar_alteracao():
+    return versoes.gravar(CHAVE_VERSAO)
+
+
+async def aversao():
+    """Marca da última alteração do ranking (None se nunca alterado)"""
+    return await versoes.aler(CHAVE_VERSAO)
+
+
+# ----------------------------------------------------------------------
+# Paginação
+# ----------------------------------------------------------------------
+
+def codificar_cursor(linha, campo, posicao):
+    return f"{linha[campo]}_{linha['id']}_{posicao}"
+
+
+def _decodificar_cursor(cursor, campo):
+    try:
+        valor, jogador_id, posicao = cursor.split('_')
+        valor = float(valor) if campo == 'pontuacao_media' else int(valor)
+        jogador_id, posicao = int(jogador_id), int(posicao)
+    except (AttributeError, ValueError):
+        return None
+    if posicao < 0:
+        return None
+    return valor, jogador_id, posicao
+
+
+def obter_pagina(order_by, direcao, cursor=None):
+    """
+    Retorna (linhas, próximo cursor) de uma página do ranking. Cada linha
+    recebe sua posição. Páginas dentro da foto não consultam o banco; as
+    demais usam paginação por chave, com o mesmo custo da primeira página.
+    """
+    campo = CAMPOS_ORDENACAO[order_by]
+    snapshot = obter_snapshot(order_by, direcao)
+    linhas_snapshot = snapshot['linhas']
+
+    inicio = 0
+    chave_cursor = _decodificar_cursor(cursor, campo) if cursor else None
+    if chave_cursor:
+        valor, jogador_id, inicio = chave_cursor
+
+    fim = inicio + TAMANHO_PAGINA
+    cursor_na_foto = (
+        inicio == 0
+        or (inicio <= len(linhas_snapshot) and linhas_snapshot[inicio - 1]['id'] == jogador_id)
+    )
+    if cursor_na_foto and (fim <= len(linhas_snapshot) or snapshot['completo']):
+        linhas = [dict(linha) for linha in linhas_snapshot[inicio:fim]]
+    else:
+        if direcao == 'asc':
+            depois = Q(**{f'{campo}__gt': valor}) | Q(**{campo: valor, 'id__lt': jogador_id})
+        else:
+            depois = Q(**{f'{campo}__lt': valor}) | Q(**{campo: valor, 'id__gt': jogador_id})
+        linhas = _linhas(
+            jogadores_ranqueados()
+            .filter(depois)
+            .order_by(*ordenacao(campo, direcao))[:TAMANHO_PAGINA]
+        )
+
+    for i, linha in enumerate(linhas):
+        linha['posicao'] = inicio + i + 1
+
+    proximo = None
+    if len(linhas) == TAMANHO_PAGINA:
+        proximo = codificar_cursor(linhas[-1], campo, inicio + TAMANHO_PAGINA)
+    return linhas, proximo
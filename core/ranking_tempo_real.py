@@ -0,0 +1,176 @@
+"""
+Transmissão do ranking em tempo real (server-sent events).
+
+Cada processo mantém um único Transmissor, que atende todos os navegadores
+conectados ao stream do ranking naquele processo. O Transmissor verifica a
+marca de alteração do ranking (ranking.CHAVE_VERSAO, gravada no banco de
+dados quando as estatísticas de uma partida encerrada chegam às fotos) uma
+vez por intervalo. Só quando ela muda o topo de cada ordenação assistida é
+recalculado, uma única vez, a partir da foto materializada; a foto deste
+processo é reconstruída se ainda não refletir a nova marca. A diferença
+para o topo anterior é serializada uma vez e distribuída a todos os
+assinantes. Com 1.000 assinantes o custo é um cálculo, não 1.000.
+
+As mensagens têm o formato {"versao", "total", "linhas": [[posicao, linha], ...]}:
+a primeira mensagem de cada assinante traz o topo completo; as seguintes,
+apenas as posições alteradas. `total` é o tamanho atual do topo.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+
+from . import ranking
+
+# Posições transmitidas: a primeira página do ranking
+TAMANHO_TOPO = ranking.TAMANHO_PAGINA
+# Segundos entre verificações da marca de alteração do ranking
+INTERVALO_VERIFICACAO = 1.0
+# Segundos sem mensagens após os quais é enviado um comentário (mantém a
+# conexão aberta através de proxies)
+INTERVALO_PING = 15.0
+# Mensagens pendentes por assinante; um assinante lento que enche a fila
+# recebe o topo completo em vez das diferenças acumuladas
+TAMANHO_FILA = 8
+
+
+def linha_compacta(linha):
+    """[id, username, maior_pontuacao, pontuacao_media, vitorias, jogos_jogados]"""
+    return [
+        linha['id'], linha['username'], linha['maior_pontuacao'],
+        round(linha['pontuacao_media'], 1), linha['vitorias'], linha['jogos_jogados'],
+    ]
+
+
+def calcular_topo(order_by, direcao, versao=None):
+    """Topo do ranking em linhas compactas, lido da foto materializada"""
+    snapshot = ranking.obter_snapshot(order_by, direcao, versao)
+    return [linha_compacta(linha) for linha in snapshot['linhas'][:TAMANHO_TOPO]]
+
+
+def diferenca(anterior, atual):
+    """Posições (a partir de 1) cujas linhas mudaram, com a linha nova"""
+    alteradas = [
+        [posicao, linha]
+        for posicao, linha in enumerate(atual, start=1)
+        if posicao > len(anterior) or anterior[posicao - 1] != linha
+    ]
+    if not alteradas and len(anterior) == len(atual):
+        return None
+    return alteradas
+
+
+def _mensagem(versao, topo, linhas):
+    return json.dumps({'versao': versao, 'total': len(topo), 'linhas': linhas}, separators=(',', ':'))
+
+
+def _mensagem_completa(versao, topo):
+    return _mensagem(versao, topo, [[posicao, linha] for posicao, linha in enumerate(topo, start=1)])
+
+
+class Transmissor:
+    """Distribui as alterações do topo do ranking aos assinantes do processo"""
+
+    def __init__(self, intervalo=INTERVALO_VERIFICACAO):
+        self.intervalo = intervalo
+        # Quantidade de topos calculados (para medição)
+        self.calculos = 0
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._loop = None
+        self._tarefa = None
+        self._versao = None
+        # (order_by, direcao) -> conjunto de filas dos assinantes
+        self._assinantes = {}
+        # (order_by, direcao) -> topo transmitido por último
+        self._topos = {}
+
+    @property
+    def assinantes(self):
+        return sum(len(filas) for filas in self._assinantes.values())
+
+    async def _calcular(self, chave):
+        self.calculos += 1
+        return await sync_to_async(calcular_topo)(*chave, self._versao)
+
+    async def assinar(self, order_by, direcao):
+        """Registra um assinante e retorna sua fila, já com o topo completo"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Primeiro uso neste event loop (ou o anterior foi encerrado)
+            self._reiniciar()
+            self._loop = loop
+        if self._versao is None:
+            self._versao = await ranking.aversao()
+
+        chave = (order_by, direcao)
+        if chave not in self._topos:
+            self._topos[chave] = await self._calcular(chave)
+        fila = asyncio.Queue(maxsize=TAMANHO_FILA)
+        fila.put_nowait(_mensagem_completa(self._versao, self._topos[chave]))
+        self._assinantes.setdefault(chave, set()).add(fila)
+
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = loop.create_task(self._laco())
+        return fila
+
+    def cancelar(self, order_by, direcao, fila):
+        chave = (order_by, direcao)
+        filas = self._assinantes.get(chave)
+        if filas is None:
+            return
+        filas.discard(fila)
+        if not filas:
+            del self._assinantes[chave]
+            self._topos.pop(chave, None)
+
+    async def _laco(self):
+        # A tarefa termina sozinha quando o último assinante sai
+        while self._assinantes:
+            await asyncio.sleep(self.intervalo)
+            await self.verificar()
+
+    async def verificar(self):
+        """Recalcula e publica os topos assistidos se o ranking mudou"""
+        versao = await ranking.aversao()
+        if versao == self._versao:
+            return
+        self._versao = versao
+
+        for chave in list(self._assinantes):
+            topo = await self._calcular(chave)
+            alteradas = diferenca(self._topos.get(chave, []), topo)
+            self._topos[chave] = topo
+            if alteradas is not None:
+                self._publicar(chave, _mensagem(versao, topo, alteradas))
+
+    def _publicar(self, chave, mensagem):
+        for fila in self._assinantes.get(chave, ()):
+            try:
+                fila.put_nowait(mensagem)
+            except asyncio.QueueFull:
+                # Assinante lento: descarta as diferenças e reenvia o topo
+                while not fila.empty():
+                    fila.get_nowait()
+                fila.put_nowait(_mensagem_completa(self._versao, self._topos[chave]))
+
+
+transmissor = Transmissor()
+
+
+async def eventos(order_by, direcao):
+    """Gerador do stream SSE de um assinante"""
+    fila = await transmissor.assinar(order_by, direcao)
+    try:
+        # Tempo de reconexão do EventSource em caso de queda
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                mensagem = await asyncio.wait_for(fila.get(), timeout=INTERVALO_PING)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield f'event: ranking\ndata: {mensagem}\n\n'
+    finally:
+        transmissor.cancelar(order_by, direcao, fila)
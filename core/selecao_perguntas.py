@@ -0,0 +1,364 @@
+"""
+Seleção adaptativa das perguntas do tabuleiro.
+
+Cada pergunta recebe um nível de dificuldade (0 = mais fácil) a partir do
+seu índice de acerto nas respostas já gravadas, e cada jogador um nível
+alvo a partir da sua taxa de acerto corrente. Para cada casa do tabuleiro
+e cada nível alvo é mantido em memória um vetor de somas acumuladas dos
+pesos das perguntas (peso maior para níveis próximos do alvo): o sorteio
+ponderado é uma busca binária nesse vetor, O(log n), sem consultar o banco.
+
+As perguntas já vistas são bitsets (inteiros Python, gravados como bytes)
+indexados pelo id da pergunta: as usadas na partida nunca se repetem e as
+vistas em partidas anteriores são evitadas enquanto houver alternativas.
+
+Os contadores de respostas (Pergunta e Jogador) são atualizados pelo
+worker que descarrega as respostas (core.eventos_resposta), em outro
+processo. Ele grava uma nova versão das contagens no banco de dados
+(core.versoes); ao percebê-la, cada processo relê as contagens das
+perguntas (uma consulta, com uma cópia no cache de perguntas por versão) e
+reconstrói apenas os vetores das casas cujas perguntas mudaram de nível,
+sem recarregar o banco de perguntas.
+"""
+import random
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+from itertools import accumulate
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Jogador, Pergunta
+from . import banco_perguntas, versoes
+
+# Versão das contagens (respostas, acertos) das perguntas, gravada pelo
+# worker (core.versoes), e as cópias da versão e das contagens no mesmo
+# alias de cache do banco de perguntas
+CHAVE_VERSAO = 'core:selecao:versao'
+CHAVE_CONTAGENS = 'core:selecao:contagens'
+
+# Níveis de dificuldade das perguntas e de alvo dos jogadores
+NIVEIS = 5
+# Peso relativo de uma pergunta a cada nível de distância do alvo
+FATOR_DISTANCIA = 0.35
+# Sorteios ponderados tentados antes de filtrar as perguntas vistas
+TENTATIVAS = 8
+
+_lock = threading.Lock()
+_tabela = None
+
+
+# ----------------------------------------------------------------------
+# Dificuldade e bitsets
+# ----------------------------------------------------------------------
+
+def precisao(respostas, acertos):
+    """Taxa de acerto suavizada (0,5 sem respostas)"""
+    return (acertos + 1) / (respostas + 2)
+
+
+def nivel_pergunta(respostas, acertos):
+    """Nível de dificuldade: quanto menor o acerto, maior o nível"""
+    return min(int((1 - precisao(respostas, acertos)) * NIVEIS), NIVEIS - 1)
+
+
+def nivel_alvo(precisao_jogador):
+    """Nível de dificuldade indicado para a taxa de acerto do jogador"""
+    if precisao_jogador is None:
+        return NIVEIS // 2
+    return min(int(precisao_jogador * NIVEIS), NIVEIS - 1)
+
+
+def bitset(dados):
+    return int.from_bytes(bytes(dados or b''), 'little')
+
+
+def bitset_bytes(valor):
+    return valor.to_bytes((valor.bit_length() + 7) // 8, 'little')
+
+
+def marcar(valor, pergunta_ids):
+    for pergunta_id in pergunta_ids:
+        valor |= 1 << pergunta_id
+    return valor
+
+
+def contem(valor, pergunta_id):
+    return valor >> pergunta_id & 1
+
+
+# ----------------------------------------------------------------------
+# Tabela de pesos em memória
+# ----------------------------------------------------------------------
+
+def _cache():
+    return caches[banco_perguntas.ALIAS_CACHE]
+
+
+class TabelaSelecao:
+    """
+    Foto imutável dos pesos de seleção.
+
+    - niveis: {pergunta_id: nível de dificuldade}
+    - por_casa: {casa: (ids, acumulados)}, com acumulados[alvo] o vetor de
+      somas acumuladas dos pesos para aquele nível alvo
+    """
+    __slots__ = ('banco', 'versao_contagens', 'niveis', 'por_casa')
+
+    def __init__(self, banco, versao_contagens, niveis, por_casa):
+        self.banco = banco
+        self.versao_contagens = versao_contagens
+        self.niveis = niveis
+        self.por_casa = por_casa
+
+
+def _indexar_casa(ids, niveis):
+    acumulados = tuple(
+        list(accumulate(FATOR_DISTANCIA ** abs(niveis[pergunta_id] - alvo) for pergunta_id in ids))
+        for alvo in range(NIVEIS)
+    )
+    return ids, acumulados
+
+
+def _versao_contagens():
+    """Versão das contagens, relida do banco de dados quando a cópia no cache expira"""
+    versao = _cache().get(CHAVE_VERSAO)
+    if versao is None:
+        versao = versoes.ler(CHAVE_VERSAO)
+        _cache().set(CHAVE_VERSAO, versao, timeout=banco_perguntas.validade_versao())
+    return versao
+
+
+def _contagens(versao):
+    """{pergunta_id: (respostas, acertos)} na versão informada (cópia no cache)"""
+    copia = _cache().get(CHAVE_CONTAGENS)
+    if copia is not None and copia[0] == versao:
+        return copia[1]
+    contagens = {
+        pergunta_id: (respostas, acertos)
+        for pergunta_id, respostas, acertos in Pergunta.objects.values_list(
+            'id', 'respostas_registradas', 'acertos_registrados'
+        )
+    }
+    _cache().set(CHAVE_CONTAGENS, (versao, contagens), timeout=None)
+    return contagens
+
+
+def _construir(banco, versao_contagens, contagens, anterior=None):
+    incremental = anterior is not None and anterior.banco is banco
+    if incremental:
+        niveis = dict(anterior.niveis)
+    else:
+        niveis = {
+            pergunta_id: nivel_pergunta(pergunta['respostas_registradas'], pergunta['acertos_registrados'])
+            for pergunta_id, pergunta in banco.perguntas.items()
+        }
+
+    # As contagens só crescem: vale a mais recente entre a do banco e a relida
+    alteradas = set()
+    for pergunta_id, (respostas, acertos) in contagens.items():
+        pergunta = banco.perguntas.get(pergunta_id)
+        if pergunta is None or respostas < pergunta['respostas_registradas']:
+            continue
+        nivel = nivel_pergunta(respostas, acertos)
+        if niveis[pergunta_id] != nivel:
+            niveis[pergunta_id] = nivel
+            alteradas.add(pergunta['posicao_tabuleiro'])
+
+    if incremental:
+        por_casa = dict(anterior.por_casa)
+        casas = alteradas
+    else:
+        por_casa = {}
+        casas = banco.por_casa
+    for casa in casas:
+        por_casa[casa] = _indexar_casa(tuple(pergunta['id'] for pergunta in banco.por_casa[casa]), niveis)
+    return TabelaSelecao(banco, versao_contagens, niveis, por_casa)
+
+
+def _atual(tabela, banco, versao_contagens):
+    return tabela is not None and tabela.banco is banco and tabela.versao_contagens == versao_contagens
+
+
+def obter_tabela():
+    """
+    Tabela de pesos do processo, atualizada quando o banco de perguntas ou
+    a versão das contagens mudam (duas leituras de cache por chamada).
+    """
+    global _tabela
+    banco = banco_perguntas.obter_banco()
+    versao = _versao_contagens()
+    tabela = _tabela
+    if _atual(tabela, banco, versao):
+        return tabela
+
+    with _lock:
+        if not _atual(_tabela, banco, versao):
+            _tabela = _construir(banco, versao, _contagens(versao), _tabela)
+        return _tabela
+
+
+async def aobter_tabela():
+    """Versão assíncrona de obter_tabela: a reconstrução, rara, roda em thread"""
+    banco = await banco_perguntas.aobter_banco()
+    versao = await _cache().aget(CHAVE_VERSAO)
+    tabela = _tabela
+    if _atual(tabela, banco, versao):
+        return tabela
+    return await sync_to_async(obter_tabela)()
+
+
+# ----------------------------------------------------------------------
+# Sorteio
+# ----------------------------------------------------------------------
+
+def _sortear(tabela, casa, alvo, excluir, vistas, rng):
+    """
+    Id sorteado para a casa (ou None): nunca uma pergunta de `excluir` e,
+    se possível, nenhuma de `vistas`
+    """
+    entrada = tabela.por_casa.get(casa)
+    if entrada is None:
+        return None
+    ids, acumulados = entrada
+    acumulado = acumulados[alvo]
+
+    for _ in range(TENTATIVAS):
+        i = min(bisect_right(acumulado, rng.random() * acumulado[-1]), len(ids) - 1)
+        if not contem(excluir, ids[i]) and not contem(vistas, ids[i]):
+            return ids[i]
+
+    # Poucas perguntas livres: sorteia entre elas, preferindo as nunca vistas
+    livres = [i for i, pergunta_id in enumerate(ids) if not contem(excluir, pergunta_id)]
+    candidatas = [i for i in livres if not contem(vistas, ids[i])] or livres
+    if not candidatas:
+        return None
+    pesos = [acumulado[i] - (acumulado[i - 1] if i else 0) for i in candidatas]
+    return ids[rng.choices(candidatas, weights=pesos)[0]]
+
+
+def sortear_pergunta(casa, precisao_jogador=None, excluir=0, vistas=0, rng=random):
+    """Pergunta sorteada para a casa informada (ou None)"""
+    tabela = obter_tabela()
+    pergunta_id = _sortear(tabela, casa, nivel_alvo(precisao_jogador), excluir, vistas, rng)
+    return tabela.banco.perguntas[pergunta_id] if pergunta_id is not None else None
+
+
+async def asortear_pergunta(casa, precisao_jogador=None, excluir=0, vistas=0, rng=random):
+    """Versão assíncrona de sortear_pergunta"""
+    tabela = await aobter_tabela()
+    pergunta_id = _sortear(tabela, casa, nivel_alvo(precisao_jogador), excluir, vistas, rng)
+    return tabela.banco.perguntas[pergunta_id] if pergunta_id is not None else None
+
+
+def sortear_baralho(precisao_jogador=None, vistas=0, rng=random):
+    """
+    Sorteia o baralho de uma partida: uma pergunta por casa do tabuleiro,
+    sem repetição. Retorna a lista compacta de ids (None nas casas sem
+    pergunta), na ordem de banco_perguntas.CASAS_TABULEIRO.
+    """
+    tabela = obter_tabela()
+    alvo = nivel_alvo(precisao_jogador)
+    sorteadas = 0
+    baralho = []
+    for casa in banco_perguntas.CASAS_TABULEIRO:
+        pergunta_id = _sortear(tabela, casa, alvo, sorteadas, vistas, rng)
+        if pergunta_id is not None:
+            sorteadas |= 1 << pergunta_id
+        baralho.append(pergunta_id)
+    return baralho
+
+
+def perfil_jogador(user):
+    """(taxa de acerto, bitset das perguntas vistas) do jogador, em uma consulta"""
+    linha = (
+        Jogador.objects
+        .filter(user_jogador=user)
+        .values_list('respostas_registradas', 'acertos_registrados', 'perguntas_vistas')
+        .first()
+    )
+    if linha is None:
+        return None, 0
+    respostas, acertos, vistas = linha
+    return precisao(respostas, acertos), bitset(vistas)
+
+
+def perfil_partida(respostas_pendentes, baralho=()):
+    """(taxa de acerto corrente, bitset das perguntas já usadas) de uma partida"""
+    linhas = respostas_pendentes or []
+    acertos = sum(1 for linha in linhas if linha[3])
+    usadas = marcar(0, [linha[1] for linha in linhas])
+    usadas = marcar(usadas, [pergunta_id for pergunta_id in baralho if pergunta_id])
+    return precisao(len(linhas), acertos), usadas
+
+
+# ----------------------------------------------------------------------
+# Atualização incremental
+# ----------------------------------------------------------------------
+
+def _incrementos(campo, valores):
+    """F(campo) + CASE id WHEN ... : um único UPDATE para vários registros"""
+    return F(campo) + Case(
+        *[When(id=chave, then=Value(valor)) for chave, valor in valores.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def aplicar_respostas(eventos):
+    """
+    Soma um lote de RespostaEvento aos contadores das perguntas e dos
+    jogadores e marca as perguntas vistas. Deve ser chamada dentro da
+    transação que grava os eventos; a nova versão das contagens é gravada
+    no commit.
+    """
+    if not eventos:
+        return
+    por_pergunta = defaultdict(lambda: [0, 0])
+    por_jogador = defaultdict(lambda: [0, 0, set()])
+    for evento in eventos:
+        por_pergunta[evento.pergunta_id][0] += 1
+        por_pergunta[evento.pergunta_id][1] += evento.correta
+        jogador = por_jogador[evento.jogador_id]
+        jogador[0] += 1
+        jogador[1] += evento.correta
+        jogador[2].add(evento.pergunta_id)
+
+    Pergunta.objects.filter(id__in=list(por_pergunta)).update(
+        respostas_registradas=_incrementos(
+            'respostas_registradas', {chave: valor[0] for chave, valor in por_pergunta.items()}
+        ),
+        acertos_registrados=_incrementos(
+            'acertos_registrados', {chave: valor[1] for chave, valor in por_pergunta.items()}
+        ),
+    )
+
+    # O bitset é lido e regravado com a linha do jogador travada
+    jogadores = list(
+        Jogador.objects
+        .select_for_update()
+        .filter(user_jogador_id__in=list(por_jogador))
+        .order_by('id')
+        .only('id', 'user_jogador_id', 'respostas_registradas', 'acertos_registrados', 'perguntas_vistas')
+    )
+    for jogador in jogadores:
+        respostas, acertos, vistas = por_jogador[jogador.user_jogador_id]
+        jogador.respostas_registradas += respostas
+        jogador.acertos_registrados += acertos
+        jogador.perguntas_vistas = bitset_bytes(marcar(bitset(jogador.perguntas_vistas), vistas))
+    Jogador.objects.bulk_update(
+        jogadores, ['respostas_registradas', 'acertos_registrados', 'perguntas_vistas']
+    )
+
+    transaction.on_commit(publicar_contagens)
+
+
+def publicar_contagens():
+    """
+    Grava uma nova versão das contagens, para que cada processo releia as
+    contagens das perguntas e atualize sua tabela de pesos
+    """
+    _cache().set(CHAVE_VERSAO, versoes.gravar(CHAVE_VERSAO), timeout=banco_perguntas.validade_versao())
@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Jogador
+from .models import Jogador, Pergunta, Resposta
+from . import banco_perguntas
 
 
 @receiver(post_save, sender=User)
@@ -12,3 +14,16 @@ def create_jogador_profile(sender, instance, created, **kwargs):
     """
     if created:  # Apenas quando o usuário é criado pela primeira vez
         Jogador.objects.create(user_jogador=instance)
+
+
+@receiver(post_save, sender=Pergunta)
+@receiver(post_delete, sender=Pergunta)
+@receiver(post_save, sender=Resposta)
+@receiver(post_delete, sender=Resposta)
+def invalidar_banco_perguntas(sender, **kwargs):
+    """
+    Invalida o cache do banco de perguntas sempre que uma pergunta ou
+    resposta é alterada. A invalidação só acontece após o commit, para que
+    nenhum processo recarregue o banco com dados ainda não confirmados.
+    """
+    transaction.on_commit(banco_perguntas.invalidar)
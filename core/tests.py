@@ -1,3 +1,1436 @@
-from django.test import TestCase
+import datetime
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+import pandas as pd
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from game_estatistica.caches import ALIASES, configurar_caches
+from .views import TabuleiroTemplateView
+from .models import (
+    EstatisticaDiariaGlobal, EstatisticaDiariaJogador, EventoFimDeJogo, Game, Jogador, MarcaAgregacao, MarcaVersao,
+    PontuacaoJogo, Pergunta, Resposta, RespostaEvento,
+)
+from . import (
+    abandonadas, agregados, analise_perguntas, banco_perguntas, benchmark, checks, engine, estaticos,
+    estatisticas, eventos_resposta, exportacao, importacao, ranking, ranking_tempo_real, selecao_perguntas,
+)
+
+
+class IndicesConsultasTests(TestCase):
+    """
+    Garante que as consultas quentes do jogo usam índices, capturando a
+    saída do EXPLAIN no SQLite e no PostgreSQL.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('indices')
+        cls.jogo = Game.objects.create()
+        cls.jogo.partidas.add(cls.user)
+        PontuacaoJogo.objects.create(jogo=cls.jogo, jogador=cls.user)
+        cls.pergunta = Pergunta.objects.create(
+            codigo='P001', text='Pergunta', category='BASICA', posicao_tabuleiro=3
+        )
+        Resposta.objects.create(codigo='R00101', pergunta=cls.pergunta, text='Certa', e_correto=True)
+
+    def consultas_quentes(self):
+        consultas = {
+            'partida_ativa': Game.objects.filter(partidas=self.user, status='IN_PROGRESS'),
+            'partida_ativa_primeira': Game.objects.filter(partidas=self.user, status='IN_PROGRESS').order_by('pk')[:1],
+            'partida_do_jogador': Game.objects.filter(id=self.jogo.id, partidas=self.user, status='IN_PROGRESS'),
+            'pontuacao_jogo': PontuacaoJogo.objects.filter(jogo=self.jogo, jogador=self.user),
+            'pontuacoes_jogador': PontuacaoJogo.objects.filter(jogador=self.user),
+            'perguntas_casa': Pergunta.objects.filter(posicao_tabuleiro=3),
+            'resposta_correta': Resposta.objects.filter(pergunta=self.pergunta, e_correto=True),
+        }
+        for order_by, campo in ranking.CAMPOS_ORDENACAO.items():
+            for direcao in ranking.DIRECOES:
+                consultas[f'ranking_{order_by}_{direcao}'] = (
+                    ranking.jogadores_ranqueados().order_by(*ranking.ordenacao(campo, direcao))[:20]
+                )
+        return consultas
+
+    def assertUsaIndice(self, nome, plano):
+        if connection.vendor == 'postgresql':
+            self.assertNotIn('Seq Scan', plano, f'{nome} faz leitura sequencial:\n{plano}')
+        else:
+            # No SQLite, "SCAN tabela" sem "USING ... INDEX" é leitura completa
+            varreduras = [
+                linha for linha in plano.splitlines()
+                if re.search(r'\bSCAN\b', linha) and 'INDEX' not in linha
+            ]
+            self.assertFalse(varreduras, f'{nome} faz leitura completa da tabela:\n{plano}')
+
+    def test_consultas_quentes_usam_indices(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('EXPLAIN verificado apenas no SQLite e no PostgreSQL')
+
+        if connection.vendor == 'postgresql':
+            # Com tabelas de teste minúsculas o planner preferiria a leitura
+            # sequencial; desativá-la revela se existe um índice utilizável
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        for nome, queryset in self.consultas_quentes().items():
+            with self.subTest(consulta=nome):
+                self.assertUsaIndice(nome, queryset.explain())
+
+        # A partida ativa do jogador parte do índice de user_id da tabela
+        # intermediária (e chega ao Game pela chave primária)
+        indice = Game._meta.get_field('partidas').remote_field.through._meta.db_table + '_user_id'
+        for nome in ('partida_ativa', 'partida_ativa_primeira'):
+            with self.subTest(consulta=nome):
+                self.assertIn(indice, self.consultas_quentes()[nome].explain())
+
+
+class OrcamentoConsultasTests(TestCase):
+    """
+    Regressão de consultas: exercita todas as views do core sobre um
+    conjunto de dados reduzido e falha se algum endpoint exceder o
+    orçamento definido em core.benchmark.ORCAMENTOS.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = benchmark.popular_dados(usuarios=30, jogos=300, perguntas_por_casa=3)
+
+    def test_endpoints_dentro_do_orcamento(self):
+        resultados = benchmark.executar(self.users, repeticoes=2)
+
+        self.assertEqual(set(resultados), set(benchmark.ORCAMENTOS))
+        self.assertEqual(benchmark.estouros(resultados), [])
+
+    def test_controle_de_transacao_fora_da_contagem(self):
+        # Dentro de TestCase o atomic() vira SAVEPOINT/RELEASE; no comando, BEGIN/COMMIT
+        sqls = ('BEGIN', 'SAVEPOINT "s1"', 'SELECT 1', 'RELEASE SAVEPOINT "s1"', 'COMMIT')
+        consultas = [{'sql': sql} for sql in sqls]
+        self.assertEqual(benchmark.contar_consultas(consultas), 1)
+
+    def test_regressao_de_tempo_e_memoria(self):
+        anterior = {'consultas': 3, 'tempo_ms': 10.0, 'memoria_pico_kb': 100.0}
+        self.assertEqual(benchmark.regressoes({'x': dict(anterior, tempo_ms=14.0)}, {'x': anterior}), [])
+        atual = {'consultas': 4, 'tempo_ms': 30.0, 'memoria_pico_kb': 200.0}
+        self.assertEqual(len(benchmark.regressoes({'x': atual}, {'x': anterior})), 2)
+
+
+class ImportacaoPerguntasTests(TestCase):
+    """Importação em todos os formatos, dry-run e reimportação sem gravações"""
+
+    PERGUNTAS = [
+        {'codigo': 'P001', 'text': 'Média?', 'category': 'TENDENCIA', 'posicao_tabuleiro': 3, 'dica': 'Soma'},
+        {'codigo': 'P002', 'text': 'Variância?', 'category': 'DISPERSAO', 'posicao_tabuleiro': 8, 'dica': None},
+    ]
+    RESPOSTAS = [
+        {'codigo': 'R00101', 'text': 'Soma/n', 'e_correto': True},
+        {'codigo': 'R00102', 'text': 'Moda', 'e_correto': False},
+        {'codigo': 'R00201', 'text': 'Quadrados dos desvios', 'e_correto': 'sim'},
+    ]
+
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.diretorio, ignore_errors=True)
+
+    def arquivos(self, formato, perguntas=None):
+        """Grava as fontes no formato pedido; retorna (perguntas, respostas)"""
+        perguntas = pd.DataFrame(perguntas or self.PERGUNTAS)
+        respostas = pd.DataFrame(self.RESPOSTAS).astype({'e_correto': str})
+        caminho = f'{self.diretorio}/perguntas.{formato}'
+        if formato == 'xlsx':
+            with pd.ExcelWriter(caminho) as planilha:
+                perguntas.to_excel(planilha, sheet_name='Pergunta', index=False)
+                respostas.to_excel(planilha, sheet_name='Resposta', index=False)
+            return caminho, caminho
+        caminho_respostas = f'{self.diretorio}/respostas.{formato}'
+        for dados, destino in ((perguntas, caminho), (respostas, caminho_respostas)):
+            if formato == 'csv':
+                dados.to_csv(destino, index=False)
+            elif formato == 'jsonl':
+                dados.to_json(destino, orient='records', lines=True, force_ascii=False)
+            else:
+                dados.to_parquet(destino, index=False)
+        return caminho, caminho_respostas
+
+    def importar(self, formato='csv', perguntas=None, aplicar=True):
+        return importacao.importar(
+            *self.arquivos(formato, perguntas), aplicar=aplicar, tamanho_lote=2, saida=lambda *_: None
+        )
+
+    def test_formatos(self):
+        for formato in ('csv', 'jsonl', 'parquet', 'xlsx'):
+            with self.subTest(formato=formato):
+                Pergunta.objects.all().delete()
+                fontes = self.arquivos(formato)
+                argumentos = [fontes[0]] if formato == 'xlsx' else [fontes[0], '--respostas', fontes[1]]
+                call_command('importar_perguntas', *argumentos, '--lote', '2', stdout=StringIO())
+
+                self.assertEqual(
+                    list(Pergunta.objects.order_by('codigo').values_list('codigo', 'posicao_tabuleiro', 'dica')),
+                    [('P001', 3, 'Soma'), ('P002', 8, None)],
+                )
+                self.assertEqual(
+                    list(Resposta.objects.order_by('codigo').values_list('pergunta__codigo', 'e_correto')),
+                    [('P001', True), ('P001', False), ('P002', True)],
+                )
+
+    def test_dry_run_e_reimportacao_sem_gravar(self):
+        self.importar()
+        alteradas = [dict(self.PERGUNTAS[0], text='Média aritmética?'), self.PERGUNTAS[1]]
+
+        relatorio = self.importar(perguntas=alteradas, aplicar=False)
+        self.assertEqual(relatorio.diferencas, ['~ pergunta P001'])
+        self.assertEqual(Pergunta.objects.get(codigo='P001').text, 'Média?')
+
+        # Sem mudanças, nada é gravado
+        with CaptureQueriesContext(connection) as contexto:
+            relatorio = self.importar()
+        escritas = [q['sql'] for q in contexto.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(escritas, [])
+        self.assertEqual((relatorio['perguntas_inalteradas'], relatorio['respostas_inalteradas']), (2, 3))
+
+    def test_codigo_de_resposta_repetido_entre_perguntas(self):
+        self.importar()
+        # Código antigo repetido em outra pergunta, com outro conteúdo
+        outra = Pergunta.objects.get(codigo='P002')
+        Resposta.objects.create(pergunta=outra, codigo='R00101', text='Outra', e_correto=False)
+
+        relatorio = self.importar()
+        self.assertEqual((relatorio['respostas_inalteradas'], relatorio['respostas_atualizadas']), (3, 0))
+        self.assertEqual(Resposta.objects.get(pergunta=outra, codigo='R00101').text, 'Outra')
+
+
+def caches_de_processo(nome):
+    """Caches locmem próprios, como os de um processo separado"""
+    caches_config = configurar_caches('locmem')
+    for config in caches_config.values():
+        config['LOCATION'] = f"{nome}:{config['LOCATION']}"
+    return caches_config
+
+
+class CachesTests(TestCase):
+    """
+    Configuração dos caches (memória local, arquivos e Redis) e uso dos
+    aliases nomeados pelo banco de perguntas, pelo ranking e pelas sessões.
+    """
+
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.diretorio, ignore_errors=True)
+
+    def configuracoes(self):
+        # O Redis é simulado pelo fakeredis (requirements-dev.txt)
+        return {
+            'locmem': configurar_caches('locmem'),
+            'file': configurar_caches('file', diretorio=self.diretorio),
+            'redis': configurar_caches(
+                'redis',
+                redis_url='redis://localhost:6379/0',
+                opcoes_redis={'connection_class': fakeredis.FakeConnection},
+            ),
+        }
+
+    def test_configuracao_por_backend(self):
+        for backend, caches_config in self.configuracoes().items():
+            with self.subTest(backend=backend):
+                self.assertEqual(set(caches_config), set(ALIASES))
+                # Os aliases nunca compartilham chaves
+                espacos = {
+                    (config['LOCATION'], config.get('KEY_PREFIX')) for config in caches_config.values()
+                }
+                self.assertEqual(len(espacos), len(ALIASES))
+
+        with self.assertRaises(ValueError):
+            configurar_caches('redis')
+        with self.assertRaises(ValueError):
+            configurar_caches('memcached')
+
+    def test_aliases_nomeados(self):
+        for backend, caches_config in self.configuracoes().items():
+            with self.subTest(backend=backend), override_settings(CACHES=caches_config):
+                for alias in ALIASES:
+                    caches[alias].clear()
+
+                banco_perguntas.invalidar()
+                self.assertIsNotNone(caches['perguntas'].get(banco_perguntas.CHAVE_VERSAO))
+                self.assertIsNone(caches['default'].get(banco_perguntas.CHAVE_VERSAO))
+
+                ranking.obter_pagina(ranking.ORDENACAO_PADRAO, 'desc')
+                chave = ranking._chave(ranking.ORDENACAO_PADRAO, 'desc')
+                self.assertIsNotNone(caches['ranking'].get(chave))
+                self.assertIsNone(caches['perguntas'].get(chave))
+
+                # Invalidar o banco de perguntas não afeta o ranking
+                banco_perguntas.invalidar()
+                self.assertIsNotNone(caches['ranking'].get(chave))
+
+    def test_versao_do_banco_vista_por_outro_processo(self):
+        with override_settings(CACHES=caches_de_processo('leitor')):
+            antes = banco_perguntas.obter_banco()
+
+        with override_settings(CACHES=caches_de_processo('escritor')):
+            banco_perguntas.invalidar()
+
+        with override_settings(CACHES=caches_de_processo('leitor')):
+            # Dentro da validade a cópia local da versão ainda vale
+            self.assertIs(banco_perguntas.obter_banco(), antes)
+            caches['perguntas'].delete(banco_perguntas.CHAVE_VERSAO)
+            with self.assertNumQueries(3):
+                depois = banco_perguntas.obter_banco()
+            self.assertIsNot(depois, antes)
+            self.assertEqual(depois.versao, MarcaVersao.objects.get(nome=banco_perguntas.CHAVE_VERSAO).valor)
+
+    @override_settings(STORAGES=benchmark.STORAGES_BENCHMARK)
+    def test_sessao_lida_do_cache(self):
+        for backend, caches_config in self.configuracoes().items():
+            with self.subTest(backend=backend), override_settings(CACHES=caches_config):
+                user = User.objects.create_user(f'sessao_{backend}')
+                self.client.force_login(user)
+                chave = self.client.session.session_key
+
+                # Gravada no cache e no banco (cached_db)
+                self.assertIsNotNone(caches['default'].get(SessionStore(chave).cache_key))
+                self.assertTrue(Session.objects.filter(session_key=chave).exists())
+
+                with CaptureQueriesContext(connection) as consultas:
+                    resposta = self.client.get(reverse('ranking'))
+                self.assertEqual(resposta.status_code, 200)
+                self.assertFalse(
+                    [q for q in consultas.captured_queries if 'django_session' in q['sql']]
+                )
+                self.client.logout()
+
+
+def jogar_ate_o_fim(semente):
+    """Todas as jogadas de uma partida com a semente informada"""
+    estado = engine.EstadoJogo(semente)
+    jogadas = []
+    while not estado.finalizado:
+        jogada = engine.rolar(estado)
+        jogadas.append(jogada)
+        estado = jogada.estado
+    return jogadas
+
+
+class EngineTests(SimpleTestCase):
+    """Regras do tabuleiro e dado do core.engine (Python puro, sem banco)"""
+
+    def test_dado_reproduzivel_por_semente(self):
+        self.assertEqual(jogar_ate_o_fim(123), jogar_ate_o_fim(123))
+        faces = [engine.valor_dado(7, n) for n in range(6000)]
+        self.assertEqual(set(faces), set(range(1, engine.FACES_DADO + 1)))
+        # Acesso direto ao n-ésimo lançamento, sem depender dos anteriores
+        jogadas = jogar_ate_o_fim(99)
+        self.assertEqual([j.dado for j in jogadas], [engine.valor_dado(99, n) for n in range(len(jogadas))])
+
+    def test_movimento_e_eventos(self):
+        for semente in range(200):
+            for jogada in jogar_ate_o_fim(semente):
+                with self.subTest(semente=semente, jogada=jogada):
+                    self.assertEqual(jogada.destino, min(jogada.origem + jogada.dado, engine.CASA_FINAL))
+                    self.assertEqual(jogada.estado.casa, jogada.destino)
+                    self.assertEqual(engine.evento_da_casa(jogada.destino), (jogada.evento, jogada.pontos))
+
+        self.assertEqual(engine.evento_da_casa(6), (engine.EVENTO_BONUS, 50))
+        self.assertEqual(engine.evento_da_casa(17), (engine.EVENTO_PENALIDADE, -30))
+        self.assertEqual(engine.evento_da_casa(12), (engine.EVENTO_PERGUNTA, 0))
+        self.assertEqual(engine.evento_da_casa(engine.CASA_FINAL), (engine.EVENTO_CHEGADA, 0))
+        self.assertEqual(engine.evento_da_casa(1), (None, 0))
+
+    def test_partida_finalizada_nao_rola(self):
+        jogadas = jogar_ate_o_fim(5)
+        self.assertTrue(jogadas[-1].finalizada)
+        with self.assertRaises(engine.PartidaFinalizada):
+            engine.rolar(jogadas[-1].estado)
+
+
+@override_settings(STORAGES=benchmark.STORAGES_BENCHMARK)
+class RolarDadoTests(TestCase):
+    """A posição e a pontuação da partida são calculadas pelo servidor"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('dado')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('tabuleiro'))
+        self.jogo = Game.objects.get(partidas=self.user, status='IN_PROGRESS')
+        self.url = reverse('tabuleiro_continue', args=[self.jogo.id])
+
+    def acao(self, **dados):
+        return self.client.post(self.url, {'jogo_id': self.jogo.id, **dados})
+
+    def test_partida_conduzida_pelo_servidor(self):
+        jogadas = []
+        pontuacao = 0
+        while True:
+            dados = self.acao(action='rolar_dado').json()
+            self.assertEqual(dados['status'], 'success')
+            jogadas.append(dados['dado'])
+            if dados['evento'] == engine.EVENTO_CHEGADA:
+                break
+            pontuacao += dados['pontos']
+            self.assertEqual(dados['pontuacao_atual'], pontuacao)
+
+        esperadas = jogar_ate_o_fim(self.jogo.semente)
+        self.assertEqual(jogadas, [jogada.dado for jogada in esperadas])
+
+        self.jogo.refresh_from_db()
+        self.assertEqual(self.jogo.status, 'COMPLETED')
+        self.assertEqual(self.acao(action='rolar_dado').status_code, 400)
+
+    def test_pontos_do_cliente_ignorados(self):
+        dados = self.acao(action='update_score', pontos=1000, casa_atual=21, finalizar='true').json()
+        self.assertEqual(dados['pontuacao_atual'], 0)
+        self.jogo.refresh_from_db()
+        self.assertEqual((self.jogo.status, self.jogo.casa_atual), ('IN_PROGRESS', 0))
+
+    def test_casa_pontua_uma_unica_vez(self):
+        corretas = {}
+        for i in range(3):
+            pergunta = Pergunta.objects.create(
+                codigo=f'P30{i}', text=f'Casa 3 ({i})?', category='BASICA', posicao_tabuleiro=3
+            )
+            corretas[pergunta.id] = Resposta.objects.create(
+                pergunta=pergunta, codigo='R001', text='Certa', e_correto=True
+            ).id
+        caches[banco_perguntas.ALIAS_CACHE].delete_many(
+            [selecao_perguntas.CHAVE_CONTAGENS, selecao_perguntas.CHAVE_VERSAO]
+        )
+        banco_perguntas.invalidar()
+        Game.objects.filter(pk=self.jogo.pk).update(casa_atual=3)
+
+        # Casa sem pergunta
+        self.assertEqual(self.acao(action='get_pergunta', casa_id=4).status_code, 400)
+
+        pergunta = self.acao(action='get_pergunta', casa_id=3).json()['pergunta']
+        dados = self.acao(action='responder_pergunta', resposta_id=corretas[pergunta['id']]).json()
+        self.assertEqual(dados['pontuacao_atual'], 100)
+
+        # Sem sair da casa não há nova pergunta (nem novos pontos)
+        self.assertEqual(self.acao(action='get_pergunta', casa_id=3).status_code, 404)
+        self.jogo.refresh_from_db()
+        self.assertTrue(self.jogo.casa_respondida(3))
+        self.assertEqual(PontuacaoJogo.objects.get(jogo=self.jogo).pontuacao, 100)
+
+    def test_chegada_em_partida_encerrada_desfaz_jogada(self):
+        ultima = jogar_ate_o_fim(self.jogo.semente)
+        Game.objects.filter(pk=self.jogo.pk).update(casa_atual=ultima[-1].origem, jogadas=len(ultima) - 1)
+        completar = TabuleiroTemplateView._complete_game
+
+        def cancelada_em_paralelo(view, request, jogo, *args, **kwargs):
+            Game.objects.filter(pk=jogo.pk).update(status='CANCELLED')
+            return completar(view, request, jogo, *args, **kwargs)
+
+        with mock.patch.object(TabuleiroTemplateView, '_complete_game', cancelada_em_paralelo):
+            resposta = self.acao(action='rolar_dado')
+        self.assertEqual(resposta.status_code, 400)
+
+        # A jogada, os pontos e o encerramento foram desfeitos juntos
+        self.jogo.refresh_from_db()
+        self.assertEqual(
+            (self.jogo.status, self.jogo.casa_atual, self.jogo.jogadas),
+            ('IN_PROGRESS', ultima[-1].origem, len(ultima) - 1),
+        )
+        self.assertEqual(PontuacaoJogo.objects.get(jogo=self.jogo).pontuacao, 0)
+
+
+class RespostaAtomicaTests(TestCase):
+    """A resposta é pontuada com F() e a mesma pergunta não pontua duas vezes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('atomico')
+        cls.pergunta = Pergunta.objects.create(text='Mediana?', category='TENDENCIA', posicao_tabuleiro=8)
+        cls.certa = Resposta.objects.create(pergunta=cls.pergunta, codigo='R001', text='Valor central', e_correto=True)
+        cls.errada = Resposta.objects.create(pergunta=cls.pergunta, codigo='R002', text='Média', e_correto=False)
+        banco_perguntas.invalidar()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.jogo = Game.objects.create(baralho=[], casa_atual=8, pergunta_atual=self.pergunta.id)
+        self.jogo.partidas.add(self.user)
+        PontuacaoJogo.objects.create(jogo=self.jogo, jogador=self.user, pontuacao=0)
+
+    def responder(self, resposta):
+        url = reverse('tabuleiro_continue', args=[self.jogo.id])
+        dados = {'jogo_id': self.jogo.id, 'action': 'responder_pergunta', 'resposta_id': resposta.id}
+        return self.client.post(url, dados)
+
+    def test_acerto_com_expressoes_f_e_sem_consultar_perguntas(self):
+        banco_perguntas.obter_banco()
+        with CaptureQueriesContext(connection) as contexto:
+            dados = self.responder(self.certa).json()
+        self.assertEqual((dados['pontos'], dados['pontuacao_atual']), (100, 100))
+
+        sql = [q['sql'] for q in contexto.captured_queries]
+        # Pergunta e respostas vêm do banco em memória
+        self.assertFalse([q for q in sql if 'core_resposta' in q or 'core_pergunta' in q])
+        # Incrementos feitos pelo banco, não leitura-modificação-escrita
+        self.assertTrue(any(
+            q.startswith('UPDATE "core_pontuacaojogo"') and '"pontuacao" + ' in q for q in sql
+        ))
+        self.assertTrue(any(
+            q.startswith('UPDATE "core_jogador"') and '"total_perguntas_certas" + ' in q for q in sql
+        ))
+        self.assertEqual(Jogador.objects.get(user_jogador=self.user).total_perguntas_certas, 1)
+
+    def test_segunda_resposta_rejeitada(self):
+        dados = self.responder(self.errada).json()
+        self.assertEqual((dados['penalidade'], dados['resposta_correta_obj']['text']), (20, 'Valor central'))
+
+        # A pergunta foi consumida pela primeira resposta
+        self.assertEqual(self.responder(self.certa).status_code, 400)
+        self.assertEqual(PontuacaoJogo.objects.get(jogo=self.jogo).pontuacao, -20)
+        self.assertEqual(Jogador.objects.get(user_jogador=self.user).total_perguntas_certas, 0)
+
+    def test_resposta_concorrente_rejeitada(self):
+        # Outra aba já gravou a resposta desta casa, mas esta leu a pergunta antes
+        Game.objects.filter(pk=self.jogo.pk).update(casas_respondidas=1 << 8)
+        self.assertEqual(self.responder(self.certa).status_code, 409)
+        self.assertEqual(PontuacaoJogo.objects.get(jogo=self.jogo).pontuacao, 0)
+
+
+class AcoesEmLoteTests(TestCase):
+    """O lote roda em uma transação: um erro desfaz as ações anteriores"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lote')
+        cls.jogo = Game.objects.create(baralho=[])
+        cls.jogo.partidas.add(cls.user)
+        PontuacaoJogo.objects.create(jogo=cls.jogo, jogador=cls.user, pontuacao=0)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def lote(self, *acoes):
+        corpo = json.dumps({'action': 'batch', 'jogo_id': self.jogo.id, 'acoes': list(acoes)})
+        return self.client.post(
+            reverse('tabuleiro_continue', args=[self.jogo.id]), corpo, content_type='application/json'
+        )
+
+    def test_turno_em_uma_requisicao(self):
+        dados = self.lote({'action': 'rolar_dado'}, {'action': 'check_status'}).json()
+        self.assertEqual([r['status_code'] for r in dados['resultados']], [200, 200])
+        destino = dados['resultados'][0]['resultado']['destino']
+        self.assertEqual(dados['resultados'][1]['resultado']['casa_atual'], destino)
+
+    def test_erro_desfaz_o_lote(self):
+        resposta = self.lote({'action': 'rolar_dado'}, {'action': 'responder_pergunta', 'resposta_id': 0})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual([r['status_code'] for r in resposta.json()['resultados']], [200, 400])
+        self.jogo.refresh_from_db()
+        self.assertEqual((self.jogo.casa_atual, self.jogo.jogadas), (0, 0))
+
+    def test_limite_de_acoes(self):
+        acoes = [{'action': 'check_status'}] * (TabuleiroTemplateView.MAX_ACOES_LOTE + 1)
+        self.assertEqual(self.lote(*acoes).status_code, 400)
+        self.assertEqual(self.lote({'action': 'batch'}).status_code, 400)
+
+
+@override_settings(STORAGES=benchmark.STORAGES_BENCHMARK)
+class BaralhoTests(TestCase):
+    """O baralho sorteia uma pergunta por casa, sem repetição e sem o gabarito"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('baralho')
+        perguntas = Pergunta.objects.bulk_create([
+            Pergunta(codigo=f'B{casa:02d}{i}', text=f'Casa {casa}?', category='BASICA', posicao_tabuleiro=casa)
+            for casa in banco_perguntas.CASAS_TABULEIRO
+            for i in range(2)
+        ])
+        Resposta.objects.bulk_create([
+            Resposta(pergunta=pergunta, codigo='R001', text='Certa', e_correto=True) for pergunta in perguntas
+        ])
+
+    def setUp(self):
+        caches[banco_perguntas.ALIAS_CACHE].delete_many(
+            [selecao_perguntas.CHAVE_CONTAGENS, selecao_perguntas.CHAVE_VERSAO]
+        )
+        banco_perguntas.invalidar()
+
+    def test_baralho_da_partida(self):
+        self.client.force_login(self.user)
+        resposta = self.client.get(reverse('tabuleiro'), follow=True)
+
+        baralho = Game.objects.values_list('baralho', flat=True).get(partidas=self.user)
+        self.assertEqual(len(baralho), 21)
+        self.assertEqual(len(set(baralho)), 21)
+        self.assertNotIn(None, baralho)
+
+        publico = resposta.context['baralho']
+        self.assertEqual(sorted(publico), list(banco_perguntas.CASAS_TABULEIRO))
+        self.assertEqual([publico[casa]['pergunta']['id'] for casa in sorted(publico)], baralho)
+        self.assertNotIn('e_correto', json.dumps(publico))
+
+    def test_sorteio_reproduzivel(self):
+        primeiro = selecao_perguntas.sortear_baralho(rng=random.Random(11))
+        self.assertEqual(selecao_perguntas.sortear_baralho(rng=random.Random(11)), primeiro)
+
+
+class EstadoDaPartidaTests(TestCase):
+    """A pergunta em aberto fica na partida: sem escrita de sessão, várias abas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('abas')
+        cls.corretas = {}
+        for casa in (3, 8):
+            pergunta = Pergunta.objects.create(
+                codigo=f'A00{casa}', text=f'Casa {casa}?', category='BASICA', posicao_tabuleiro=casa
+            )
+            cls.corretas[casa] = Resposta.objects.create(pergunta=pergunta, codigo='R001', text='Certa', e_correto=True)
+        cls.jogos = {}
+        for casa in (3, 8):
+            jogo = Game.objects.create(baralho=[], casa_atual=casa)
+            jogo.partidas.add(cls.user)
+            PontuacaoJogo.objects.create(jogo=jogo, jogador=cls.user, pontuacao=0)
+            cls.jogos[casa] = jogo
+
+    def setUp(self):
+        caches[banco_perguntas.ALIAS_CACHE].delete_many(
+            [selecao_perguntas.CHAVE_CONTAGENS, selecao_perguntas.CHAVE_VERSAO]
+        )
+        banco_perguntas.invalidar()
+        self.client.force_login(self.user)
+
+    def acao(self, casa, **dados):
+        jogo = self.jogos[casa]
+        return self.client.post(reverse('tabuleiro_continue', args=[jogo.id]), {'jogo_id': jogo.id, **dados})
+
+    def test_duas_partidas_sem_escrita_de_sessao(self):
+        sessao = dict(self.client.session)
+        with CaptureQueriesContext(connection) as contexto:
+            # Perguntas abertas nas duas partidas antes de responder qualquer uma
+            for casa in (3, 8):
+                self.assertEqual(self.acao(casa, action='get_pergunta', casa_id=casa).status_code, 200)
+            for casa in (3, 8):
+                dados = self.acao(casa, action='responder_pergunta', resposta_id=self.corretas[casa].id).json()
+                self.assertEqual(dados['pontuacao_atual'], 100)
+
+        self.assertFalse([q for q in contexto.captured_queries if 'django_session' in q['sql']])
+        self.assertEqual(dict(self.client.session), sessao)
+
+
+class ScriptsTabuleiroTests(TestCase):
+    """
+    static/js/dist e static/js/vendor não são versionados: sem o build
+    configurado o tabuleiro usa o outro, e sem nenhum é exibido sem scripts
+    """
+
+    def setUp(self):
+        self.origem = tempfile.mkdtemp()
+        self.coletados = tempfile.mkdtemp()
+        for diretorio in (self.origem, self.coletados):
+            self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        self.client.force_login(User.objects.create_user('scripts'))
+
+    def gravar(self, raiz, caminhos):
+        for caminho in caminhos:
+            destino = os.path.join(raiz, caminho)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            with open(destino, 'w', encoding='utf-8') as arquivo:
+                arquivo.write('//')
+
+    def coletar(self, caminhos):
+        """Simula o collectstatic: arquivos e manifesto em STATIC_ROOT"""
+        caminhos = ['css/style.css', 'css/tabuleiro.css', *caminhos]
+        self.gravar(self.coletados, caminhos)
+        with open(os.path.join(self.coletados, 'staticfiles.json'), 'w', encoding='utf-8') as arquivo:
+            json.dump({'paths': {caminho: caminho for caminho in caminhos}, 'version': '1.1'}, arquivo)
+
+    def pagina(self, coletados):
+        self.coletar(coletados)
+        with self.settings(STATIC_ROOT=self.coletados, STATICFILES_DIRS=[self.origem], TABULEIRO_JS_DEV=False):
+            resposta = self.client.get(reverse('tabuleiro'), follow=True)
+        self.assertEqual(resposta.status_code, 200)
+        return resposta
+
+    def test_recorre_ao_build_coletado(self):
+        # Produção configurada, mas apenas o build de desenvolvimento foi coletado
+        resposta = self.pagina(estaticos.ARQUIVOS_TABULEIRO[True])
+        self.assertContains(resposta, 'js/dist/Tabuleiro.js')
+        self.assertNotContains(resposta, 'Tabuleiro.min.js')
+
+    def test_sem_build_exibe_a_pagina_sem_scripts(self):
+        resposta = self.pagina([])
+        self.assertContains(resposta, 'tabuleiro-sem-scripts')
+        self.assertNotContains(resposta, 'js/vendor/')
+
+    def test_verificacao_do_build(self):
+        with self.settings(STATICFILES_DIRS=[self.origem]):
+            self.assertEqual([aviso.id for aviso in checks.scripts_do_tabuleiro(None)], ['core.W001'])
+            self.gravar(self.origem, estaticos.ARQUIVOS_TABULEIRO[False])
+            self.assertEqual(checks.scripts_do_tabuleiro(None), [])
+
+
+class PartidasAbandonadasTests(TestCase):
+    """O coletor cancela só as partidas ociosas e contabiliza as estatísticas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ausente = User.objects.create_user('ausente')
+        cls.ativo = User.objects.create_user('ativo')
+
+    def iniciar(self, user):
+        self.client.force_login(user)
+        self.client.get(reverse('tabuleiro'))
+        return Game.objects.get(partidas=user, status='IN_PROGRESS')
+
+    def test_cancela_ociosas_em_lote(self):
+        ociosa = self.iniciar(self.ausente)
+        ativa = self.iniciar(self.ativo)
+        ultima_atividade = timezone.now() - datetime.timedelta(hours=2)
+        Game.objects.filter(pk=ociosa.pk).update(
+            inicio_tempo=ultima_atividade - datetime.timedelta(minutes=5),
+            ultima_atividade=ultima_atividade,
+        )
+
+        relatorio = abandonadas.cancelar_abandonadas(datetime.timedelta(minutes=30))
+        self.assertEqual((relatorio['canceladas'], relatorio['jogadores']), (1, 1))
+
+        ociosa.refresh_from_db()
+        ativa.refresh_from_db()
+        self.assertEqual((ociosa.status, ativa.status), ('CANCELLED', 'IN_PROGRESS'))
+        # A duração vai até a última atividade, não até a coleta
+        self.assertEqual(ociosa.fim_tempo, ultima_atividade)
+
+        jogador = Jogador.objects.get(user_jogador=self.ausente)
+        self.assertEqual((jogador.jogos_jogados, jogador.vitorias, jogador.tempo_medio_jogo), (1, 0, 300))
+
+        # Uma segunda varredura não encontra nada
+        self.assertEqual(abandonadas.cancelar_abandonadas(datetime.timedelta(minutes=30))['canceladas'], 0)
+
+    def test_partida_coletada_nao_e_encerrada_de_novo(self):
+        jogo = self.iniciar(self.ausente)
+        abandonadas.cancelar_abandonadas(datetime.timedelta(0), agora=timezone.now() + datetime.timedelta(seconds=1))
+
+        resposta = self.client.post(
+            reverse('tabuleiro_continue', args=[jogo.id]),
+            {'jogo_id': jogo.id, 'action': 'cancel_game'},
+        )
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(Jogador.objects.get(user_jogador=self.ausente).jogos_jogados, 1)
+
+
+class EventosFimDeJogoTests(TestCase):
+    """O fim da partida vai para a caixa de saída e o worker agrupa por jogador"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('outbox')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def cancelar_nova_partida(self):
+        self.client.get(reverse('tabuleiro'))
+        jogo = Game.objects.get(partidas=self.user, status='IN_PROGRESS')
+        resposta = self.client.post(
+            reverse('tabuleiro_continue', args=[jogo.id]), {'jogo_id': jogo.id, 'action': 'cancel_game'}
+        )
+        self.assertEqual(resposta.status_code, 200)
+
+    def jogos_jogados(self):
+        return Jogador.objects.get(user_jogador=self.user).jogos_jogados
+
+    def test_fim_de_partida_registrado_na_caixa_de_saida(self):
+        self.client.get(reverse('tabuleiro'))
+        jogo = Game.objects.get(partidas=self.user, status='IN_PROGRESS')
+        url = reverse('tabuleiro_continue', args=[jogo.id])
+        while True:
+            dados = self.client.post(url, {'jogo_id': jogo.id, 'action': 'rolar_dado'}).json()
+            if dados['evento'] == engine.EVENTO_CHEGADA:
+                break
+
+        # A resposta já conta a partida, mas o Jogador ainda não foi tocado
+        self.assertEqual(dados['jogos_completados'], 1)
+        self.assertEqual(self.jogos_jogados(), 0)
+        self.assertEqual(EventoFimDeJogo.objects.filter(jogo=jogo).count(), 1)
+
+        relatorio = estatisticas.processar_eventos()
+        self.assertEqual((relatorio['eventos'], relatorio['jogadores']), (1, 1))
+        self.assertEqual(self.jogos_jogados(), 1)
+        self.assertFalse(EventoFimDeJogo.objects.exists())
+
+    def test_eventos_agrupados_por_jogador(self):
+        self.cancelar_nova_partida()
+        self.cancelar_nova_partida()
+
+        with CaptureQueriesContext(connection) as contexto:
+            aplicados, jogadores, atrasos = estatisticas.processar_lote_eventos()
+        self.assertEqual((aplicados, jogadores, len(atrasos)), (2, 1, 2))
+        updates = [q['sql'] for q in contexto.captured_queries if q['sql'].startswith('UPDATE "core_jogador"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.jogos_jogados(), 2)
+
+    def test_recalculo_nao_conta_evento_pendente_duas_vezes(self):
+        self.cancelar_nova_partida()
+        self.assertEqual(estatisticas.recalcular_estatisticas([self.user.id]), 1)
+        self.assertEqual(self.jogos_jogados(), 0)
+
+        estatisticas.processar_eventos()
+        self.assertEqual(self.jogos_jogados(), 1)
+        estatisticas.recalcular_estatisticas([self.user.id])
+        self.assertEqual(self.jogos_jogados(), 1)
+
+
+class EstatisticasIncrementaisTests(TestCase):
+    """Os agregados incrementais coincidem com a reconstrução a partir do histórico"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('incremental')
+        agora = timezone.now()
+        # (status, pontuação, duração em segundos)
+        for status, pontos, duracao in [
+            ('COMPLETED', 300, 120), ('COMPLETED', 0, 90), ('CANCELLED', 150, 45), ('CANCELLED', -20, 0),
+        ]:
+            jogo = Game.objects.create(
+                status=status, inicio_tempo=agora - datetime.timedelta(seconds=duracao), fim_tempo=agora,
+                ganhador=cls.user if status == 'COMPLETED' and pontos > 0 else None,
+            )
+            jogo.partidas.add(cls.user)
+            PontuacaoJogo.objects.create(jogo=jogo, jogador=cls.user, pontuacao=pontos)
+            estatisticas.registrar_fim_de_jogo(
+                jogo, cls.user, pontos, estatisticas.duracao_em_segundos(jogo), jogo.ganhador_id is not None
+            )
+
+    def agregados(self):
+        linha = Jogador.objects.values(*estatisticas.CAMPOS_RECALCULADOS).get(user_jogador=self.user)
+        linha['pontuacao_media'] = round(linha['pontuacao_media'], 6)
+        linha['soma_tempo_jogo'] = round(linha['soma_tempo_jogo'], 6)
+        return linha
+
+    def test_incremental_igual_ao_recalculo(self):
+        estatisticas.processar_eventos()
+        incremental = self.agregados()
+        self.assertEqual(
+            (incremental['jogos_jogados'], incremental['vitorias'], incremental['maior_pontuacao']), (4, 1, 300)
+        )
+        self.assertEqual((incremental['pontuacao_media'], incremental['tempo_medio_jogo']), (225.0, 85))
+
+        Jogador.objects.filter(user_jogador=self.user).update(
+            jogos_jogados=0, vitorias=0, maior_pontuacao=0, pontuacoes_positivas=0, soma_pontuacoes_positivas=0,
+        )
+        call_command('recalcular_estatisticas', stdout=StringIO())
+        self.assertEqual(self.agregados(), incremental)
+
+
+class TabuleiroAcoesAsyncTests(TestCase):
+    """A view assíncrona segue o mesmo protocolo das ações do tabuleiro"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('assincrono')
+        cls.jogo = Game.objects.create(baralho=[])
+        cls.jogo.partidas.add(cls.user)
+        PontuacaoJogo.objects.create(jogo=cls.jogo, jogador=cls.user, pontuacao=10)
+        pergunta = Pergunta.objects.create(text='Média?', category='BASICA', posicao_tabuleiro=3)
+        Resposta.objects.create(pergunta=pergunta, text='Soma/n', e_correto=True)
+        # A invalidação do banco em memória só ocorre no commit
+        banco_perguntas.invalidar()
+
+    async def acao(self, **dados):
+        return await self.async_client.post(reverse('tabuleiro_acoes'), {'jogo_id': self.jogo.id, **dados})
+
+    async def test_exige_login(self):
+        self.assertEqual((await self.acao(action='check_status')).status_code, 401)
+
+    async def test_acoes_assincronas_e_sincronas(self):
+        await self.async_client.aforce_login(self.user)
+
+        dados = (await self.acao(action='check_status')).json()
+        self.assertEqual((dados['jogo_status'], dados['pontuacao_atual'], dados['casa_atual']), ('IN_PROGRESS', 10, 0))
+
+        # Fora da casa a pergunta não é sorteada
+        self.assertEqual((await self.acao(action='get_pergunta', casa_id=3)).status_code, 404)
+
+        # rolar_dado roda a implementação transacional em uma thread
+        jogada = (await self.acao(action='rolar_dado')).json()
+        self.assertEqual(jogada['destino'], engine.valor_dado(self.jogo.semente, 0))
+
+        await Game.objects.filter(pk=self.jogo.pk).aupdate(casa_atual=3)
+        dados = (await self.acao(action='get_pergunta', casa_id=3)).json()
+        self.assertEqual(dados['pergunta']['text'], 'Média?')
+        self.assertNotIn('e_correto', dados['respostas'][0])
+
+
+class PosicaoRankingTests(TestCase):
+    """A posição nas estatísticas usa o mesmo desempate da tabela de ranking"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f'posicao{i}') for i in range(4)]
+        for user, pontos in zip(cls.users, (100, 300, 100, 0)):
+            Jogador.objects.filter(user_jogador=user).update(jogos_jogados=1, maior_pontuacao=pontos)
+        # Sem partidas: fora do ranking
+        Jogador.objects.filter(user_jogador=cls.users[3]).update(jogos_jogados=0)
+
+    def setUp(self):
+        caches[ranking.ALIAS_CACHE].clear()
+
+    def test_desempate_pelo_id(self):
+        jogadores = {j.user_jogador_id: j for j in Jogador.objects.all()}
+        with self.assertNumQueries(1):
+            posicao = ranking.posicao_no_ranking(jogadores[self.users[2].id])
+        self.assertEqual(posicao, 3)
+        self.assertEqual(ranking.posicao_no_ranking(jogadores[self.users[0].id]), 2)
+        self.assertIsNone(ranking.posicao_no_ranking(jogadores[self.users[3].id]))
+
+        # Mesma ordem da tabela de ranking
+        linhas, _ = ranking.obter_pagina('maior_pontuacao', 'desc')
+        for linha in linhas:
+            self.assertEqual(ranking.posicao_no_ranking(jogadores[linha['user_jogador_id']]), linha['posicao'])
+
+
+@mock.patch.object(ranking, 'TAMANHO_PAGINA', 3)
+@mock.patch.object(ranking, 'TAMANHO_SNAPSHOT', 5)
+class RankingPaginacaoTests(TestCase):
+    """Páginas além da foto seguem por chave, mesmo se a foto for refeita"""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [User.objects.create_user(f'pagina{i}') for i in range(11)]
+        for i, user in enumerate(users):
+            # Empates a cada dois jogadores
+            Jogador.objects.filter(user_jogador=user).update(jogos_jogados=1, maior_pontuacao=100 * (i // 2))
+
+    def setUp(self):
+        caches[ranking.ALIAS_CACHE].clear()
+
+    def test_cursor_atravessa_reconstrucao_da_foto(self):
+        esperados = list(
+            ranking.jogadores_ranqueados()
+            .order_by(*ranking.ordenacao('maior_pontuacao'))
+            .values_list('id', flat=True)
+        )
+        vistos = []
+        cursor = None
+        while True:
+            linhas, cursor = ranking.obter_pagina('maior_pontuacao', 'desc', cursor)
+            posicoes = list(range(len(vistos) + 1, len(vistos) + len(linhas) + 1))
+            self.assertEqual([linha['posicao'] for linha in linhas], posicoes)
+            vistos.extend(linha['id'] for linha in linhas)
+            if cursor is None:
+                break
+            # A foto é descartada entre as páginas (ex.: fim de partida)
+            ranking.invalidar()
+        self.assertEqual(vistos, esperados)
+
+    def test_pagina_profunda_custa_uma_consulta(self):
+        _, cursor = ranking.obter_pagina('maior_pontuacao', 'asc')
+        _, cursor = ranking.obter_pagina('maior_pontuacao', 'asc', cursor)
+        # A terceira página começa além da foto (5 linhas): leitura por chave
+        with self.assertNumQueries(1):
+            linhas, _ = ranking.obter_pagina('maior_pontuacao', 'asc', cursor)
+        self.assertEqual([linha['posicao'] for linha in linhas], [7, 8, 9])
+
+
+@override_settings(STORAGES=benchmark.STORAGES_BENCHMARK)
+class PaginasSemNMais1Tests(TestCase):
+    """Estatísticas e ranking com número de consultas independente das linhas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('paginas')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def adicionar(self, quantidade):
+        for _ in range(quantidade):
+            user = User.objects.create_user(f'paginas_{User.objects.count()}')
+            Jogador.objects.filter(user_jogador=user).update(jogos_jogados=1, maior_pontuacao=10)
+            jogo = Game.objects.create(status='COMPLETED', fim_tempo=timezone.now())
+            jogo.partidas.add(self.user, user)
+            PontuacaoJogo.objects.create(jogo=jogo, jogador=self.user, pontuacao=50)
+
+    def consultas(self, nome):
+        caches[ranking.ALIAS_CACHE].clear()
+        with CaptureQueriesContext(connection) as contexto:
+            self.assertEqual(self.client.get(reverse(nome)).status_code, 200)
+        return len(contexto.captured_queries)
+
+    def test_consultas_constantes(self):
+        self.adicionar(1)
+        poucas = {nome: self.consultas(nome) for nome in ('estatisticas_jogador', 'ranking')}
+        self.adicionar(10)
+        for nome, quantidade in poucas.items():
+            self.assertEqual(self.consultas(nome), quantidade, nome)
+
+        resposta = self.client.get(reverse('estatisticas_jogador'))
+        self.assertEqual([jogo.pontuacao_obtida for jogo in resposta.context['partidas_recentes']], [50] * 5)
+
+
+@override_settings(RANKING_TEMPO_REAL=True)
+class RankingTempoRealTests(TestCase):
+    """Um cálculo do topo por alteração, distribuído a todos os assinantes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f'sse{i}') for i in range(3)]
+        Jogador.objects.filter(user_jogador__in=cls.users).update(jogos_jogados=1)
+        for i, user in enumerate(cls.users):
+            Jogador.objects.filter(user_jogador=user).update(maior_pontuacao=100 * (i + 1))
+
+    def setUp(self):
+        caches[ranking.ALIAS_CACHE].clear()
+
+    def test_diferenca_apenas_das_posicoes_alteradas(self):
+        anterior = [[1, 'a', 300, 0, 0, 1], [2, 'b', 200, 0, 0, 1]]
+        self.assertIsNone(ranking_tempo_real.diferenca(anterior, list(anterior)))
+        atual = [[2, 'b', 400, 0, 0, 2], [1, 'a', 300, 0, 0, 1]]
+        self.assertEqual(ranking_tempo_real.diferenca(anterior, atual), [[1, atual[0]], [2, atual[1]]])
+        self.assertEqual(ranking_tempo_real.diferenca(anterior, anterior[:1]), [])
+
+    async def test_um_calculo_para_muitos_assinantes(self):
+        transmissor = ranking_tempo_real.Transmissor(intervalo=3600)
+        filas = [await transmissor.assinar('maior_pontuacao', 'desc') for _ in range(1000)]
+        self.assertEqual(transmissor.calculos, 1)
+        completos = {fila.get_nowait() for fila in filas}
+        self.assertEqual(len(completos), 1)
+        completo = json.loads(completos.pop())
+        self.assertEqual([linha[2] for _, linha in completo['linhas']], [300, 200, 100])
+
+        # Sem alteração do ranking nada é recalculado nem enviado
+        await transmissor.verificar()
+        self.assertEqual(transmissor.calculos, 1)
+
+        # Uma partida encerrada muda o topo: um cálculo, uma diferença por assinante
+        ultimo = self.users[0]
+        await Jogador.objects.filter(user_jogador=ultimo).aupdate(maior_pontuacao=500, jogos_jogados=2)
+        await sync_to_async(ranking.atualizar_jogadores)([ultimo.id])
+        await transmissor.verificar()
+        self.assertEqual(transmissor.calculos, 2)
+        diferencas = {filas[i].get_nowait() for i in range(1000)}
+        self.assertEqual(len(diferencas), 1)
+        diferenca = json.loads(diferencas.pop())
+        self.assertEqual(diferenca['total'], 3)
+        self.assertEqual([(posicao, linha[1]) for posicao, linha in diferenca['linhas']],
+                         [(1, 'sse0'), (2, 'sse2'), (3, 'sse1')])
+
+        for fila in filas:
+            transmissor.cancelar('maior_pontuacao', 'desc', fila)
+        self.assertEqual(transmissor.assinantes, 0)
+
+    async def test_alteracao_gravada_por_outro_processo(self):
+        # O worker que aplica as estatísticas e o servidor do stream não
+        # compartilham o cache (locmem)
+        with override_settings(CACHES=caches_de_processo('stream')):
+            transmissor = ranking_tempo_real.Transmissor(intervalo=3600)
+            fila = await transmissor.assinar('maior_pontuacao', 'desc')
+            fila.get_nowait()
+
+        with override_settings(CACHES=caches_de_processo('worker')):
+            ultimo = self.users[0]
+            await Jogador.objects.filter(user_jogador=ultimo).aupdate(maior_pontuacao=500, jogos_jogados=2)
+            await sync_to_async(ranking.obter_snapshot)('maior_pontuacao', 'desc')
+            await sync_to_async(ranking.atualizar_jogadores)([ultimo.id])
+
+        with override_settings(CACHES=caches_de_processo('stream')):
+            await transmissor.verificar()
+            diferenca = json.loads(fila.get_nowait())
+        self.assertEqual(diferenca['linhas'][0][1][1:3], ['sse0', 500])
+
+    async def test_stream_envia_o_topo_ao_conectar(self):
+        resposta = await self.async_client.get(reverse('ranking_stream'))
+        self.assertEqual(resposta['Content-Type'], 'text/event-stream')
+        eventos = aiter(resposta.streaming_content)
+        self.assertEqual(await anext(eventos), b'retry: 5000\n\n')
+        evento = (await anext(eventos)).decode()
+        self.assertTrue(evento.startswith('event: ranking\n'))
+        self.assertEqual(json.loads(evento.split('data: ', 1)[1])['total'], 3)
+
+    async def test_assinante_removido_ao_desconectar(self):
+        eventos = ranking_tempo_real.eventos('vitorias', 'asc')
+        await anext(eventos)
+        self.assertEqual(ranking_tempo_real.transmissor.assinantes, 1)
+        await eventos.aclose()
+        self.assertEqual(ranking_tempo_real.transmissor.assinantes, 0)
+
+
+class RespostaEventoTests(TestCase):
+    """As respostas são acumuladas na partida e gravadas em lote após o fim"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('respondente')
+        cls.pergunta = Pergunta.objects.create(text='Moda?', category='TENDENCIA', posicao_tabuleiro=5)
+        cls.certa = Resposta.objects.create(
+            pergunta=cls.pergunta, codigo='R001', text='Mais frequente', e_correto=True
+        )
+        cls.errada = Resposta.objects.create(
+            pergunta=cls.pergunta, codigo='R002', text='Maior valor', e_correto=False
+        )
+        Resposta.objects.create(pergunta=cls.pergunta, codigo='R003', text='Menor valor', e_correto=False)
+        banco_perguntas.invalidar()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def responder(self, resposta):
+        jogo = Game.objects.create(baralho=[], pergunta_atual=self.pergunta.id)
+        jogo.partidas.add(self.user)
+        PontuacaoJogo.objects.create(jogo=jogo, jogador=self.user, pontuacao=0)
+        url = reverse('tabuleiro_continue', args=[jogo.id])
+        dados = {'jogo_id': jogo.id, 'action': 'responder_pergunta', 'resposta_id': resposta.id}
+        self.assertEqual(self.client.post(url, dados).status_code, 200)
+        return jogo
+
+    def test_resposta_gravada_apos_fim_da_partida(self):
+        jogo = self.responder(self.errada)
+        jogo.refresh_from_db()
+        self.assertEqual(len(jogo.respostas_pendentes), 1)
+
+        # Partida em andamento: nada é descarregado
+        self.assertEqual(eventos_resposta.descarregar()['partidas'], 0)
+
+        Game.objects.filter(pk=jogo.pk).update(status='CANCELLED')
+        relatorio = eventos_resposta.descarregar()
+        self.assertEqual((relatorio['partidas'], relatorio['respostas']), (1, 1))
+        evento = RespostaEvento.objects.get()
+        self.assertEqual(
+            (evento.jogo_id, evento.jogador_id, evento.resposta_id, evento.correta, evento.usou_dica),
+            (jogo.id, self.user.id, self.errada.id, False, False),
+        )
+        jogo.refresh_from_db()
+        self.assertIsNone(jogo.respostas_pendentes)
+
+    def test_analise_vetorizada(self):
+        # Jogadores fortes acertam, fracos erram: discriminação máxima
+        linhas = [
+            (jogador, self.pergunta.id, self.certa.id if jogador < 5 else self.errada.id, jogador < 5)
+            for jogador in range(10)
+        ]
+        respostas = analise_perguntas.pd.DataFrame(
+            linhas, columns=['jogador_id', 'pergunta_id', 'resposta_id', 'correta']
+        )
+        respostas['usou_dica'] = False
+        respostas['tempo_ms'] = 1000.0
+
+        resultado = analise_perguntas.analisar(respostas, minimo=10)
+        pergunta = resultado['perguntas'].iloc[0]
+        self.assertEqual((pergunta['codigo'], pergunta['respostas']), (self.pergunta.codigo, 10))
+        self.assertAlmostEqual(pergunta['indice_acerto'], 0.5)
+        self.assertAlmostEqual(pergunta['discriminacao'], 1.0)
+
+        distratores = resultado['distratores']
+        self.assertEqual(len(distratores), 3)
+        self.assertEqual(distratores['fraco'].tolist(), [False, False, True])
+
+        categoria = resultado['categorias'].iloc[0]
+        self.assertEqual((categoria['category'], categoria['respostas']), ('TENDENCIA', 10))
+
+
+class SelecaoPerguntasTests(TestCase):
+    """O sorteio pondera pela dificuldade e evita perguntas já vistas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('adaptativo')
+        cls.facil = Pergunta.objects.create(codigo='P101', text='Fácil', category='BASICA', posicao_tabuleiro=3)
+        cls.dificil = Pergunta.objects.create(codigo='P102', text='Difícil', category='BASICA', posicao_tabuleiro=3)
+        Pergunta.objects.filter(pk=cls.facil.pk).update(respostas_registradas=100, acertos_registrados=95)
+        Pergunta.objects.filter(pk=cls.dificil.pk).update(respostas_registradas=100, acertos_registrados=5)
+
+    def setUp(self):
+        # Banco e contagens carregados em outros testes (o cache não é revertido)
+        caches[banco_perguntas.ALIAS_CACHE].delete_many(
+            [selecao_perguntas.CHAVE_CONTAGENS, selecao_perguntas.CHAVE_VERSAO]
+        )
+        banco_perguntas.invalidar()
+
+    def sortear(self, precisao, **kwargs):
+        rng = random.Random(7)
+        return [selecao_perguntas.sortear_pergunta(3, precisao, rng=rng, **kwargs)['id'] for _ in range(200)]
+
+    def test_dificuldade_ajustada_ao_acerto_do_jogador(self):
+        self.assertGreater(self.sortear(0.95).count(self.dificil.id), 180)
+        self.assertGreater(self.sortear(0.05).count(self.facil.id), 180)
+
+    def test_perguntas_usadas_e_vistas(self):
+        usadas = selecao_perguntas.marcar(0, [self.dificil.id])
+        self.assertEqual(set(self.sortear(0.95, excluir=usadas)), {self.facil.id})
+        # Vistas em outras partidas só são repetidas se não houver alternativa
+        self.assertEqual(set(self.sortear(0.95, vistas=usadas)), {self.facil.id})
+        todas = selecao_perguntas.marcar(usadas, [self.facil.id])
+        self.assertEqual(len(self.sortear(0.5, vistas=todas)), 200)
+        self.assertIsNone(selecao_perguntas.sortear_pergunta(3, excluir=todas))
+
+    def test_contadores_atualizados_pelo_descarregamento(self):
+        agora = int(timezone.now().timestamp() * 1000)
+        respostas = [
+            [self.user.id, self.facil.id, 0, False, False, 500, agora] for _ in range(200)
+        ]
+        Game.objects.create(status='COMPLETED', respostas_pendentes=respostas)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            eventos_resposta.descarregar()
+
+        pergunta = Pergunta.objects.get(pk=self.facil.pk)
+        self.assertEqual((pergunta.respostas_registradas, pergunta.acertos_registrados), (300, 95))
+        precisao, vistas = selecao_perguntas.perfil_jogador(self.user)
+        self.assertAlmostEqual(precisao, 1 / 202)
+        self.assertTrue(selecao_perguntas.contem(vistas, self.facil.id))
+
+        # A nova versão das contagens muda o nível da pergunta sem recarregar o banco
+        tabela = selecao_perguntas.obter_tabela()
+        self.assertEqual(tabela.niveis[self.facil.id], 3)
+
+    def test_contagens_gravadas_por_outro_processo(self):
+        agora = int(timezone.now().timestamp() * 1000)
+        Game.objects.create(
+            status='COMPLETED',
+            respostas_pendentes=[[self.user.id, self.facil.id, 0, False, False, 500, agora] for _ in range(200)],
+        )
+        with override_settings(CACHES=caches_de_processo('web')):
+            banco_perguntas.invalidar()
+            antes = selecao_perguntas.obter_tabela()
+            self.assertEqual(antes.niveis[self.facil.id], 0)
+
+        # O worker descarrega as respostas com o seu próprio cache (locmem)
+        with override_settings(CACHES=caches_de_processo('worker')), self.captureOnCommitCallbacks(execute=True):
+            eventos_resposta.descarregar()
+
+        with override_settings(CACHES=caches_de_processo('web')):
+            # Expirada a cópia local da versão, as contagens são relidas do banco
+            caches[banco_perguntas.ALIAS_CACHE].delete(selecao_perguntas.CHAVE_VERSAO)
+            depois = selecao_perguntas.obter_tabela()
+        self.assertIs(depois.banco, antes.banco)
+        self.assertEqual(depois.niveis[self.facil.id], 3)
+
+
+@override_settings(STORAGES=benchmark.STORAGES_BENCHMARK)
+class AgregadosDiariosTests(TestCase):
+    """Os agregados avançam pela marca sem contar partidas duas vezes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('agregado')
+        cls.outro = User.objects.create_user('agregado2')
+        cls.pergunta = Pergunta.objects.create(codigo='P201', text='?', category='DISPERSAO', posicao_tabuleiro=8)
+
+    def partida(self, status, pontuacoes, ganhador=None):
+        agora = timezone.now()
+        jogo = Game.objects.create(
+            status=status, inicio_tempo=agora - datetime.timedelta(minutes=10),
+            fim_tempo=None if status == 'IN_PROGRESS' else agora, ganhador=ganhador,
+        )
+        for user, pontuacao in pontuacoes.items():
+            PontuacaoJogo.objects.create(jogo=jogo, jogador=user, pontuacao=pontuacao)
+        return jogo
+
+    def test_marca_espera_partidas_em_andamento(self):
+        self.partida('COMPLETED', {self.user: 120, self.outro: 40}, ganhador=self.user)
+        em_andamento = self.partida('IN_PROGRESS', {self.user: 0})
+        ultima = self.partida('CANCELLED', {self.user: 10})
+
+        self.assertEqual(agregados.agregar()['partidas'], 2)
+        marca = MarcaAgregacao.objects.get(nome=agregados.MARCA_PARTIDAS)
+        self.assertEqual((marca.ultimo_id, marca.processados), (em_andamento.id - 1, [ultima.id]))
+        self.assertEqual(agregados.agregar()['partidas'], 0)
+
+        Game.objects.filter(pk=em_andamento.pk).update(status='COMPLETED', fim_tempo=timezone.now())
+        PontuacaoJogo.objects.filter(jogo=em_andamento).update(pontuacao=60)
+        self.assertEqual(agregados.agregar()['partidas'], 1)
+        marca.refresh_from_db()
+        self.assertEqual((marca.ultimo_id, marca.processados), (ultima.id, []))
+
+        diario = EstatisticaDiariaJogador.objects.get(jogador=self.user)
+        self.assertEqual(
+            (
+                diario.partidas, diario.partidas_completadas, diario.vitorias,
+                diario.soma_pontuacao, diario.maior_pontuacao,
+            ),
+            (3, 2, 1, 180, 120),
+        )
+        self.assertEqual(EstatisticaDiariaGlobal.objects.get().histograma, {'0': 1, '50': 1, '100': 1})
+
+    def test_partida_esquecida_nao_segura_a_marca(self):
+        esquecida = self.partida('IN_PROGRESS', {self.user: 0})
+        ultima = self.partida('COMPLETED', {self.user: 30})
+        parada = agregados.ESPERA_ABANDONADAS * abandonadas.tempo_limite_padrao() + datetime.timedelta(minutes=1)
+        Game.objects.filter(pk=esquecida.pk).update(ultima_atividade=timezone.now() - parada)
+
+        self.assertEqual(agregados.agregar()['partidas'], 1)
+        marca = MarcaAgregacao.objects.get(nome=agregados.MARCA_PARTIDAS)
+        self.assertEqual((marca.ultimo_id, marca.processados), (ultima.id, []))
+
+    def test_painel_lido_dos_agregados(self):
+        self.partida('COMPLETED', {self.user: 120, self.outro: 40})
+        agora = timezone.now()
+        RespostaEvento.objects.bulk_create([
+            RespostaEvento(
+                jogo_id=0, jogador_id=self.user.id, pergunta_id=self.pergunta.id, resposta_id=0,
+                correta=correta, usou_dica=False, respondida_em=agora,
+            )
+            for correta in (True, True, True, False)
+        ])
+        self.assertEqual(agregados.agregar()['respostas'], 4)
+
+        with self.assertNumQueries(2):
+            painel = agregados.painel_jogador(self.user)
+        self.assertEqual((painel['partidas'], painel['media']), (1, 120.0))
+        # 120 supera a partida de 40 e 40% da faixa [100, 150)
+        self.assertEqual(painel['percentil'], 70.0)
+        self.assertEqual(painel['categorias'], [
+            {'categoria': 'Dispersão', 'respostas': 4, 'acerto': 75.0, 'acerto_geral': 75.0},
+        ])
+
+        self.client.force_login(self.user)
+        resposta = self.client.get(reverse('estatisticas_jogador'))
+        self.assertContains(resposta, 'Dispersão')
+
+
+@override_settings(STORAGES=benchmark.STORAGES_BENCHMARK)
+class AdminTests(TestCase):
+    """As listagens do admin não carregam tabelas inteiras e as ações são em conjunto"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.users = [User.objects.create_user(f'admin_jogador{i}') for i in range(5)]
+        antigo = timezone.now() - datetime.timedelta(hours=2)
+        for user in cls.users:
+            jogo = Game.objects.create(ultima_atividade=antigo)
+            jogo.partidas.add(user)
+            PontuacaoJogo.objects.create(jogo=jogo, jogador=user, pontuacao=10)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_listagens_com_consultas_constantes(self):
+        listagens = (
+            'admin:core_game_changelist', 'admin:core_pontuacaojogo_changelist', 'admin:core_jogador_changelist',
+        )
+        for nome in listagens:
+            with CaptureQueriesContext(connection) as contexto:
+                resposta = self.client.get(reverse(nome))
+            self.assertEqual(resposta.status_code, 200)
+            self.assertLessEqual(len(contexto.captured_queries), 8, nome)
+        self.assertEqual(self.client.get(reverse('admin:core_game_changelist'), {'q': 'abc'}).status_code, 200)
+
+    def test_acoes_em_conjunto(self):
+        url = reverse('admin:core_game_changelist')
+        selecionados = list(Game.objects.values_list('id', flat=True)[:3])
+        resposta = self.client.post(url, {'action': 'cancelar_paradas', '_selected_action': selecionados})
+        self.assertEqual(resposta.status_code, 302)
+        self.assertEqual(Game.objects.filter(status='CANCELLED').count(), 3)
+        self.assertEqual(
+            Jogador.objects.filter(jogos_jogados=1).count(), 3
+        )
+
+        resposta = self.client.post(url, {'action': 'exportar_csv', '_selected_action': selecionados})
+        linhas = b''.join(resposta.streaming_content).decode().splitlines()
+        self.assertEqual(linhas[0].split(',')[:2], ['id', 'status'])
+        self.assertEqual(len(linhas), 4)
+
+
+class ExportacaoTests(TestCase):
+    """Exportação por streaming com os filtros aplicados na consulta"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.equipe = User.objects.create_user('exp_equipe', is_staff=True)
+        cls.user = User.objects.create_user('exp_jogador')
+        antigo = timezone.now() - datetime.timedelta(days=10)
+        cls.jogos = [
+            Game.objects.create(status='COMPLETED', inicio_tempo=antigo),
+            Game.objects.create(status='COMPLETED'),
+            Game.objects.create(status='CANCELLED'),
+        ]
+        for jogo in cls.jogos:
+            PontuacaoJogo.objects.create(jogo=jogo, jogador=cls.user, pontuacao=5)
+        cls.pergunta = Pergunta.objects.create(text='Exportação?', category='BASICA', posicao_tabuleiro=7)
+        RespostaEvento.objects.bulk_create([
+            RespostaEvento(
+                jogo_id=jogo.id, jogador_id=cls.user.id, pergunta_id=cls.pergunta.id, resposta_id=1,
+                correta=True, usou_dica=False, tempo_ms=900, respondida_em=timezone.now(),
+            )
+            for jogo in cls.jogos
+        ])
+
+    def _csv(self, resposta):
+        return b''.join(resposta.streaming_content).decode().splitlines()
+
+    def test_filtros_na_consulta(self):
+        hoje = timezone.now().date()
+        partidas = exportacao.filtrar('partidas', inicio=hoje, status='COMPLETED')
+        self.assertEqual(list(partidas.values_list('id', flat=True)), [self.jogos[1].id])
+        self.assertEqual(exportacao.filtrar('respostas', status='CANCELLED').count(), 1)
+        self.assertEqual(exportacao.filtrar('respostas', categoria='BASICA').count(), 3)
+        with self.assertRaises(ValueError):
+            exportacao.filtrar('jogadores', inicio=hoje)
+        with self.assertRaises(ValueError):
+            exportacao.filtrar('partidas', status='INEXISTENTE')
+
+    def test_view_csv_somente_equipe(self):
+        url = reverse('exportar', args=['pontuacoes'])
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.equipe)
+        linhas = self._csv(self.client.get(url, {'status': 'COMPLETED'}))
+        self.assertEqual(linhas[0], ','.join(exportacao.CONJUNTOS['pontuacoes'].cabecalho))
+        self.assertEqual(len(linhas), 3)
+        self.assertEqual(self.client.get(url, {'formato': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'inicio': 'ontem'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('exportar', args=['usuarios'])).status_code, 404)
+
+    def test_comando(self):
+        saida = StringIO()
+        call_command(
+            'exportar_dados', 'respostas', '--categoria', 'BASICA', '--bloco', '1', stdout=saida, stderr=StringIO()
+        )
+        self.assertEqual(len(saida.getvalue().splitlines()), 4)
+        with self.assertRaises(CommandError):
+            call_command('exportar_dados', 'jogadores', '--status', 'COMPLETED', stdout=StringIO())
+
+    def test_view_parquet(self):
+        import pyarrow.parquet as pq
+
+        self.client.force_login(self.equipe)
+        resposta = self.client.get(reverse('exportar', args=['partidas']), {'formato': 'parquet'})
+        self.assertEqual(resposta.status_code, 200)
+        tabela = pq.read_table(BytesIO(b''.join(resposta.streaming_content)))
+        self.assertEqual(tabela.column_names, exportacao.CONJUNTOS['partidas'].cabecalho)
+        self.assertEqual(sorted(tabela.column('id').to_pylist()), sorted(jogo.id for jogo in self.jogos))
+
+    async def test_asgi_entrega_sem_acumular(self):
+        lidas = []
+
+        def linhas_contadas(*args, **kwargs):
+            for linha in [('a', 1), ('b', 2)]:
+                lidas.append(linha)
+                yield linha
+
+        request = AsyncRequestFactory().get('/exportar/')
+        with mock.patch.object(exportacao, 'linhas', linhas_contadas):
+            resposta = exportacao.resposta(request, 'pontuacoes')
+        self.assertTrue(resposta.is_async)
+
+        partes = aiter(resposta.streaming_content)
+        self.assertTrue((await anext(partes)).startswith(b'jogo_id,'))
+        self.assertEqual(lidas, [])
+        await anext(partes)
+        self.assertEqual(len(lidas), 1)
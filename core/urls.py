@@ -1,5 +1,8 @@
 from django.urls import path
-from .views import IndexTemplateView, TutorialTemplateView, TabuleiroTemplateView, EstatisticasJogadorView, RankingView
+from .views import (
+    IndexTemplateView, TutorialTemplateView, TabuleiroTemplateView, TabuleiroAcoesView,
+    EstatisticasJogadorView, RankingView, RankingStreamView, ExportacaoView,
+)
 
 
 urlpatterns = [
@@ -7,6 +10,12 @@ urlpatterns = [
     path('tutorial/', TutorialTemplateView.as_view(), name='tutorial'),
     path('tabuleiro/', TabuleiroTemplateView.as_view(), name='tabuleiro'),
     path('tabuleiro/<int:jogo_id>/', TabuleiroTemplateView.as_view(), name='tabuleiro_continue'),
+    # Ações JSON do tabuleiro (view assíncrona, servida via ASGI)
+    path('tabuleiro/acoes/', TabuleiroAcoesView.as_view(), name='tabuleiro_acoes'),
     path('estatisticas/', EstatisticasJogadorView.as_view(), name='estatisticas_jogador'),
     path('ranking/', RankingView.as_view(), name='ranking'),
+    # Alterações do topo do ranking em tempo real (server-sent events)
+    path('ranking/stream/', RankingStreamView.as_view(), name='ranking_stream'),
+    # Exportação dos dados em CSV ou Parquet (somente equipe)
+    path('exportar/<str:conjunto>/', ExportacaoView.as_view(), name='exportar'),
 ]
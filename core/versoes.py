@@ -0,0 +1,34 @@
+"""
+Marcas de versão compartilhadas entre processos.
+
+Dados mantidos em memória por processo (o banco de perguntas, o topo do
+ranking transmitido em tempo real) precisam saber quando mudaram em outro
+processo. A marca fica em uma linha do banco (MarcaVersao), e não apenas no
+cache: com o cache locmem cada processo teria a sua própria marca e nunca
+veria as alterações dos demais.
+"""
+import uuid
+
+from .models import MarcaVersao
+
+
+def nova():
+    return uuid.uuid4().hex
+
+
+def ler(nome):
+    """Valor atual da marca, criando-a se ainda não existir"""
+    marca, _ = MarcaVersao.objects.get_or_create(nome=nome, defaults={'valor': nova()})
+    return marca.valor
+
+
+async def aler(nome):
+    """Valor atual da marca (None se ainda não existir)"""
+    return await MarcaVersao.objects.filter(nome=nome).values_list('valor', flat=True).afirst()
+
+
+def gravar(nome, valor=None):
+    """Grava um novo valor para a marca e o retorna"""
+    valor = valor or nova()
+    MarcaVersao.objects.update_or_create(nome=nome, defaults={'valor': valor})
+    return valor
@@ -1,12 +1,35 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.views import View
 from django.views.generic import TemplateView, DetailView
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.utils import timezone
-from django.http import JsonResponse
-from .models import Game, PontuacaoJogo, Jogador, Pergunta, Resposta
-import random
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import Game, PontuacaoJogo, Jogador
+from . import (
+    agregados, banco_perguntas, engine, estaticos, estatisticas, eventos_resposta, exportacao, ranking,
+    ranking_tempo_real, selecao_perguntas,
+)
 import datetime
+import json
+
+
+def _na_casa_sem_resposta(jogos, casa):
+    """
+    Filtra as partidas em andamento com o jogador na casa informada e cuja
+    pergunta ainda não foi respondida: cada casa pontua uma única vez por
+    partida, com ou sem baralho.
+    """
+    return (
+        jogos
+        .annotate(respondida=F('casas_respondidas').bitand(1 << casa))
+        .filter(status='IN_PROGRESS', casa_atual=casa, respondida=0)
+    )
 
 
 # Página inicial para usuários não logados
@@ -18,6 +41,32 @@ class TutorialTemplateView(TemplateView):
     template_name = 'tutorial.html'
 
 
+def ler_dados_acao(request):
+    """
+    Extrai os dados de uma ação do tabuleiro: request.POST (form-data) ou o
+    corpo JSON. Retorna None se o JSON for inválido.
+    """
+    if request.content_type != 'application/json':
+        return request.POST
+    try:
+        dados = json.loads(request.body)
+    except ValueError:
+        return None
+    return dados if isinstance(dados, dict) else None
+
+
+def erro_inesperado(e):
+    """Registra o erro no log e responde 500 em JSON"""
+    import traceback
+    print(f"Erro no POST do tabuleiro: {str(e)}")
+    print(traceback.format_exc())
+
+    return JsonResponse({
+        'status': 'error',
+        'message': f'Erro inesperado: {str(e)}'
+    }, status=500)
+
+
 class TabuleiroTemplateView(LoginRequiredMixin, TemplateView):
     """
     View para exibir o tabuleiro do jogo e gerenciar a partida.
@@ -26,6 +75,15 @@ class TabuleiroTemplateView(LoginRequiredMixin, TemplateView):
     template_name = 'tabuleiro.html'
     login_url = '/accounts/login/'  # URL para redirecionamento de usuários não logados
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Modo do bundle do tabuleiro (desenvolvimento ou produção), conforme
+        # os builds disponíveis; None se nenhum tiver sido gerado
+        modo = estaticos.modo_tabuleiro_js()
+        context['tabuleiro_js_dev'] = modo
+        context['tabuleiro_js_disponivel'] = modo is not None
+        return context
+
     def get(self, request, *args, **kwargs):
         jogo_id = kwargs.get('jogo_id')
 
@@ -43,6 +101,8 @@ class TabuleiroTemplateView(LoginRequiredMixin, TemplateView):
             context.update({
                 'jogo_id': jogo.id,
                 'jogador_nome': request.user.username,
+                # Perguntas do baralho da partida, entregues junto com a página
+                'baralho': banco_perguntas.baralho_publico(jogo.baralho),
             })
             return render(request, self.template_name, context)
 
@@ -61,9 +121,12 @@ class TabuleiroTemplateView(LoginRequiredMixin, TemplateView):
         # ---------------------------------------------
         # 3) Nenhuma ativa → criar nova
         # ---------------------------------------------
+        # Baralho ajustado à taxa de acerto do jogador, evitando perguntas já vistas
+        precisao, vistas = selecao_perguntas.perfil_jogador(request.user)
         novo_jogo = Game.objects.create(
             status='IN_PROGRESS',
-            inicio_tempo=timezone.now()
+            inicio_tempo=timezone.now(),
+            baralho=selecao_perguntas.sortear_baralho(precisao, vistas)
         )
         novo_jogo.partidas.add(request.user)
 
@@ -75,126 +138,190 @@ class TabuleiroTemplateView(LoginRequiredMixin, TemplateView):
 
         return redirect('tabuleiro_continue', jogo_id=novo_jogo.id)
 
+    # Ações aceitas dentro de um lote (action=batch) e tamanho máximo do lote
+    ACOES_LOTE = (
+        'rolar_dado', 'get_pergunta', 'responder_pergunta', 'usar_dica',
+        'check_status', 'update_score', 'cancel_game',
+    )
+    MAX_ACOES_LOTE = 10
+
     def post(self, request, *args, **kwargs):
         """
         Endpoint para processar ações durante o jogo:
-        - Atualizar pontuação (update_score)
+        - Lançar o dado e mover o jogador (rolar_dado)
+        - Sincronizar pontuação / finalizar ao chegar (update_score)
         - Verificar status atual (check_status)
         - Cancelar partida (cancel_game)
         - Buscar pergunta para casa específica (get_pergunta)
         - Processar resposta a pergunta (responder_pergunta)
+        - Revelar a dica da pergunta em aberto (usar_dica)
+        - Executar várias ações em uma única requisição (batch)
+
+        Aceita form-data ou um corpo JSON com os mesmos campos.
         """
         try:
-            # Extrai dados do POST
-            action = request.POST.get('action', 'update_score')
-            jogo_id = request.POST.get('jogo_id')
-
-            # Validar ID do jogo
-            if not jogo_id:
+            dados = ler_dados_acao(request)
+            if dados is None:
                 return JsonResponse({
                     'status': 'error',
-                    'message': 'ID do jogo não fornecido.'
+                    'message': 'JSON inválido.'
                 }, status=400)
 
-            # ========================================================
-            # AÇÕES QUE NÃO REQUEREM BUSCAR O JOGO INICIALMENTE
-            # ========================================================
+            action = dados.get('action', 'update_score')
+            if action == 'batch':
+                return self._executar_lote(request, dados)
+            return self._executar_acao(request, action, dados)
 
-            # 1. Ação: get_pergunta - Buscar pergunta para casa específica
-            if action == 'get_pergunta':
-                casa_id = request.POST.get('casa_id')
-                if not casa_id:
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': 'ID da casa não fornecido.'
-                    }, status=400)
-                return self._get_pergunta(request, jogo_id, casa_id)
+        except Exception as e:
+            return erro_inesperado(e)
 
-            # 2. Ação: responder_pergunta - Processar resposta do usuário
-            elif action == 'responder_pergunta':
-                # Verifica se os dados necessários foram enviados
-                resposta_id = request.POST.get('resposta_id')
-                if not resposta_id:
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': 'ID da resposta não fornecido.'
-                    }, status=400)
-                return self._processar_resposta(request, jogo_id)
+    def _executar_acao(self, request, action, dados):
+        """
+        Executa uma ação do jogo. `dados` é o request.POST ou o dicionário
+        da ação (em um lote ou em um corpo JSON).
+        """
+        jogo_id = dados.get('jogo_id')
+
+        # Validar ID do jogo
+        if not jogo_id:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'ID do jogo não fornecido.'
+            }, status=400)
 
-            # ========================================================
-            # AÇÕES QUE REQUEREM BUSCAR O JOGO
-            # ========================================================
+        # ========================================================
+        # AÇÕES QUE NÃO REQUEREM BUSCAR O JOGO INICIALMENTE
+        # ========================================================
 
-            # Busca o jogo no banco de dados
-            try:
-                jogo = Game.objects.get(id=jogo_id, partidas=request.user)
-            except Game.DoesNotExist:
+        # 1. Ação: get_pergunta - Buscar pergunta para casa específica
+        if action == 'get_pergunta':
+            casa_id = dados.get('casa_id')
+            if not casa_id:
                 return JsonResponse({
                     'status': 'error',
-                    'message': 'Jogo não encontrado.'
-                }, status=404)
+                    'message': 'ID da casa não fornecido.'
+                }, status=400)
+            return self._get_pergunta(request, jogo_id, casa_id)
+
+        # 2. Ação: responder_pergunta - Processar resposta do usuário
+        elif action == 'responder_pergunta':
+            # Verifica se os dados necessários foram enviados
+            resposta_id = dados.get('resposta_id')
+            if not resposta_id:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'ID da resposta não fornecido.'
+                }, status=400)
+            return self._processar_resposta(request, jogo_id, dados)
 
-            # 3. Ação: cancel_game - Cancelar uma partida em andamento
-            if action == 'cancel_game':
-                return self._cancel_game(request, jogo)
+        # 3. Ação: usar_dica - Revelar a dica da pergunta em aberto
+        elif action == 'usar_dica':
+            return self._usar_dica(request, jogo_id, dados)
 
-            # 4. Ação: check_status - Verificar o status atual do jogo
-            elif action == 'check_status':
-                return self._check_game_status(request, jogo)
+        # ========================================================
+        # AÇÕES QUE REQUEREM BUSCAR O JOGO
+        # ========================================================
 
-            # 5. Ação: update_score (default) - Atualizar pontuação do jogador
-            else:
-                # Verifica se o jogo está em andamento
-                if jogo.status != 'IN_PROGRESS':
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': 'Esta partida não está mais em andamento.'
-                    }, status=400)
+        # Busca o jogo no banco de dados
+        try:
+            jogo = Game.objects.get(id=jogo_id, partidas=request.user)
+        except Game.DoesNotExist:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Jogo não encontrado.'
+            }, status=404)
 
-                # Extrai e valida os parâmetros
-                try:
-                    pontos = int(request.POST.get('pontos', 0))
-                    casa_atual = int(request.POST.get('casa_atual', 0))
-                    finalizar = request.POST.get('finalizar', 'false').lower() == 'true'
-                except (ValueError, TypeError):
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': 'Parâmetros inválidos.'
-                    }, status=400)
+        # 4. Ação: cancel_game - Cancelar uma partida em andamento
+        if action == 'cancel_game':
+            return self._cancel_game(request, jogo)
 
-                # Obtém e atualiza a pontuação
-                try:
-                    pontuacao_jogo = PontuacaoJogo.objects.get(jogo=jogo, jogador=request.user)
-                    pontuacao_jogo.pontuacao += pontos
-                    pontuacao_jogo.save()
-                except PontuacaoJogo.DoesNotExist:
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': 'Pontuação do jogo não encontrada.'
-                    }, status=404)
+        # 5. Ação: check_status - Verificar o status atual do jogo
+        elif action == 'check_status':
+            return self._check_game_status(request, jogo)
 
-                # Se finalizar ou chegou ao final do tabuleiro
-                if finalizar or casa_atual >= 21:
-                    return self._complete_game(request, jogo, pontuacao_jogo)
+        # 6. Ação: rolar_dado - Lançar o dado e mover o jogador (no servidor)
+        elif action == 'rolar_dado':
+            return self._rolar_dado(request, jogo)
 
-                # Retorna a pontuação atualizada
+        # 7. Ação: update_score (default) - Sincronizar pontuação do jogador
+        else:
+            # Verifica se o jogo está em andamento
+            if jogo.status != 'IN_PROGRESS':
                 return JsonResponse({
-                    'status': 'success',
-                    'pontuacao_atual': pontuacao_jogo.pontuacao,
-                    'jogo_id': jogo.id
-                })
+                    'status': 'error',
+                    'message': 'Esta partida não está mais em andamento.'
+                }, status=400)
 
-        except Exception as e:
-            # Log do erro para debugging
-            import traceback
-            print(f"Erro no POST do tabuleiro: {str(e)}")
-            print(traceback.format_exc())
+            # A pontuação e a posição são calculadas pelo servidor (rolar_dado):
+            # os campos `pontos` e `casa_atual` enviados pelo cliente são ignorados
+            try:
+                pontuacao_jogo = PontuacaoJogo.objects.get(jogo=jogo, jogador=request.user)
+            except PontuacaoJogo.DoesNotExist:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Pontuação do jogo não encontrada.'
+                }, status=404)
+
+            # Finaliza apenas se o jogador de fato chegou ao final do tabuleiro
+            if jogo.estado_engine.finalizado:
+                return self._complete_game(request, jogo, pontuacao_jogo)
 
+            # Retorna a pontuação atual
+            return JsonResponse({
+                'status': 'success',
+                'pontuacao_atual': pontuacao_jogo.pontuacao,
+                'jogo_id': jogo.id
+            })
+
+    def _executar_lote(self, request, dados):
+        """
+        Executa uma lista ordenada de ações em uma única transação, poupando
+        uma ida e volta ao servidor por ação. O lote é interrompido na
+        primeira ação com erro e tudo o que foi feito antes é desfeito.
+
+        Corpo: {"action": "batch", "jogo_id": 1, "acoes": [{"action": ...}, ...]}
+        Resposta: {"status": ..., "resultados": [{"status_code": ..., "resultado": {...}}, ...]}
+        """
+        acoes = dados.get('acoes')
+        if not isinstance(acoes, list) or not acoes:
             return JsonResponse({
                 'status': 'error',
-                'message': f'Erro inesperado: {str(e)}'
-            }, status=500)
-    
+                'message': 'Lista de ações não fornecida.'
+            }, status=400)
+        if len(acoes) > self.MAX_ACOES_LOTE:
+            return JsonResponse({
+                'status': 'error',
+                'message': f'Máximo de {self.MAX_ACOES_LOTE} ações por lote.'
+            }, status=400)
+
+        resultados = []
+        status_http = 200
+        with transaction.atomic():
+            for acao in acoes:
+                if not isinstance(acao, dict) or acao.get('action') not in self.ACOES_LOTE:
+                    resposta = JsonResponse({
+                        'status': 'error',
+                        'message': 'Ação inválida no lote.'
+                    }, status=400)
+                else:
+                    resposta = self._executar_acao(
+                        request, acao['action'], {'jogo_id': dados.get('jogo_id'), **acao}
+                    )
+                resultados.append({
+                    'status_code': resposta.status_code,
+                    'resultado': json.loads(resposta.content),
+                })
+                if resposta.status_code >= 400:
+                    # Desfaz as ações anteriores do lote
+                    transaction.set_rollback(True)
+                    status_http = resposta.status_code
+                    break
+
+        return JsonResponse({
+            'status': 'success' if status_http == 200 else 'error',
+            'resultados': resultados,
+        }, status=status_http)
+
     def _check_game_status(self, request, jogo):
         """
         Método para verificar o status atual do jogo
@@ -206,6 +333,7 @@ class TabuleiroTemplateView(LoginRequiredMixin, TemplateView):
                 'status': 'success',
                 'jogo_status': jogo.status,
                 'pontuacao_atual': pontuacao_jogo.pontuacao,
+                'casa_atual': jogo.casa_atual,
                 'jogo_id': jogo.id
             })
         except PontuacaoJogo.DoesNotExist:
@@ -214,65 +342,84 @@ class TabuleiroTemplateView(LoginRequiredMixin, TemplateView):
                 'message': 'Pontuação do jogo não encontrada.'
             }, status=404)
 
-    def _update_player_stats(self, jogador):
+    def _rolar_dado(self, request, jogo):
         """
-        Atualiza estatísticas calculadas do jogador após uma partida.
-        Considera apenas pontuações positivas para cálculos de estatísticas de pontuação.
-        Inclui verificações detalhadas para o cálculo do tempo médio de jogo.
+        Lança o dado com o core.engine, move o jogador e aplica os pontos da
+        casa de destino (bônus/penalidade), tudo em uma transação. Ao chegar
+        à casa final a partida é finalizada na mesma requisição.
         """
-        # Buscar todas as pontuações do jogador em jogos completados ou cancelados
-        pontuacoes = PontuacaoJogo.objects.filter(
-            jogador=jogador.user_jogador,
-            jogo__status__in=['COMPLETED', 'CANCELLED']
-        )
-
-        # Filtrar apenas pontuações positivas para estatísticas de pontuação
-        pontuacoes_positivas = [p.pontuacao for p in pontuacoes if p.pontuacao > 0]
-
-        # Calcular pontuação média apenas com pontuações positivas
-        if pontuacoes_positivas:
-            jogador.pontuacao_media = sum(pontuacoes_positivas) / len(pontuacoes_positivas)
-            jogador.maior_pontuacao = max(pontuacoes_positivas)
-        else:
-            jogador.pontuacao_media = 0
-            jogador.maior_pontuacao = 0
-
-        # Calcular tempo médio de jogo - consulta os jogos diretamente
-        jogos_com_tempo = Game.objects.filter(
-            partidas=jogador.user_jogador,
-            status__in=['COMPLETED', 'CANCELLED']
-        ).exclude(
-            inicio_tempo__isnull=True
-        ).exclude(
-            fim_tempo__isnull=True
-        )
-
-        if jogos_com_tempo.exists():
-            jogos_validos = 0
-            total_segundos = 0
-
-            for jogo in jogos_com_tempo:
-                # Verificação para garantir que os tempos são válidos
-                if jogo.inicio_tempo and jogo.fim_tempo:
-                    duracao = jogo.fim_tempo - jogo.inicio_tempo
-                    segundos = duracao.total_seconds()
+        with transaction.atomic():
+            # Trava a partida: dois lançamentos simultâneos não podem usar o
+            # mesmo número de jogada
+            try:
+                jogo = (
+                    Game.objects
+                    .select_for_update()
+                    .get(pk=jogo.pk, status='IN_PROGRESS')
+                )
+            except Game.DoesNotExist:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Esta partida não está mais em andamento.'
+                }, status=400)
 
-                    # Verifica se a duração é positiva
-                    if segundos > 0:
-                        total_segundos += segundos
-                        jogos_validos += 1
+            try:
+                jogada = engine.rolar(jogo.estado_engine)
+            except engine.PartidaFinalizada as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+            # Nova posição; uma pergunta em aberto deixa de valer ao sair da casa
+            jogo.casa_atual = jogada.estado.casa
+            jogo.jogadas = jogada.estado.jogadas
+            jogo.pergunta_atual = None
+            jogo.dica_usada = False
+            Game.objects.filter(pk=jogo.pk).update(
+                casa_atual=jogo.casa_atual,
+                jogadas=jogo.jogadas,
+                pergunta_atual=None,
+                dica_usada=False,
+                ultima_atividade=timezone.now(),
+            )
 
-            # Calcula o tempo médio apenas se existirem jogos válidos
-            if jogos_validos > 0:
-                jogador.tempo_medio_jogo = int(total_segundos / jogos_validos)
+            pontuacao_jogo = (
+                PontuacaoJogo.objects
+                .only('id', 'pontuacao')
+                .get(jogo=jogo, jogador=request.user)
+            )
+            if jogada.pontos:
+                PontuacaoJogo.objects.filter(pk=pontuacao_jogo.pk).update(
+                    pontuacao=F('pontuacao') + jogada.pontos
+                )
+                pontuacao_jogo.pontuacao += jogada.pontos
+
+            dados_jogada = {
+                'dado': jogada.dado,
+                'origem': jogada.origem,
+                'destino': jogada.destino,
+                'evento': jogada.evento,
+                'pontos': jogada.pontos,
+            }
+
+            if jogada.finalizada:
+                resposta = self._complete_game(request, jogo, pontuacao_jogo, **dados_jogada)
+                if resposta.status_code != 200:
+                    # A partida foi encerrada em paralelo: desfaz a jogada e os pontos
+                    transaction.set_rollback(True)
+                return resposta
 
-        # Salvar as alterações
-        jogador.save()
+        return JsonResponse({
+            'status': 'success',
+            **dados_jogada,
+            'pontuacao_atual': pontuacao_jogo.pontuacao,
+            'jogo_id': jogo.id
+        })
 
-    def _complete_game(self, request, jogo, pontuacao_jogo):
+    def _complete_game(self, request, jogo, pontuacao_jogo, **extra):
         """
         Método auxiliar para finalizar um jogo completado com sucesso.
         Um jogo só é considerado vitória se a pontuação final for maior que zero.
+        Os campos de `extra` (ex.: a jogada que chegou ao final) são incluídos
+        na resposta de sucesso.
         """
         # Atualiza o status do jogo para completo
         jogo.status = 'COMPLETED'
@@ -285,25 +432,34 @@ class TabuleiroTemplateView(LoginRequiredMixin, TemplateView):
             # Se pontuação for zero ou negativa, não registra ganhador
             jogo.ganhador = None
 
-        # Salva as alterações no jogo
-        jogo.save()
-
-        # Atualiza as estatísticas do jogador
-        jogador, created = Jogador.objects.get_or_create(user_jogador=request.user)
-
-        # Sempre incrementa o contador de jogos jogados
-        jogador.jogos_jogados += 1
-
         # Verifica se foi uma vitória (pontuação > 0)
         e_vitoria = pontuacao_jogo.pontuacao > 0
         if e_vitoria:
-            jogador.vitorias += 1
             mensagem = 'Parabéns! Você completou o jogo com sucesso!'
         else:
             mensagem = 'Jogo finalizado, mas sem pontuação suficiente para vitória.'
 
-        # Recalcula a pontuação média
-        self._update_player_stats(jogador)
+        # Sem savepoint: dentro de rolar_dado já há uma transação aberta
+        with transaction.atomic(savepoint=False):
+            # Encerra a partida apenas se ainda estiver em andamento: o coletor
+            # de partidas abandonadas pode tê-la cancelado em paralelo
+            encerrados = (
+                Game.objects
+                .filter(pk=jogo.pk, status='IN_PROGRESS')
+                .update(status=jogo.status, fim_tempo=jogo.fim_tempo, ganhador=jogo.ganhador)
+            )
+            if not encerrados:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Esta partida não está mais em andamento.'
+                }, status=400)
+
+            # As estatísticas do jogador são atualizadas depois, pelo worker da
+            # caixa de saída; aqui só o evento é gravado junto com o Game
+            estatisticas.registrar_fim_de_jogo(
+                jogo, request.user, pontuacao_jogo.pontuacao, estatisticas.duracao_em_segundos(jogo), e_vitoria
+            )
+        jogos_completados, vitorias = estatisticas.contagens_previstas(request.user)
 
         # Preparar informações adicionais para a resposta
         tempo_jogo = None
@@ -322,9 +478,10 @@ class TabuleiroTemplateView(LoginRequiredMixin, TemplateView):
             'e_vitoria': e_vitoria,
             'tempo_jogo': tempo_jogo,
             'tempo_formatado': tempo_formatado,
-            'jogos_completados': jogador.jogos_jogados,
-            'vitorias': jogador.vitorias,
-            'redirect_url': reverse('index')
+            'jogos_completados': jogos_completados,
+            'vitorias': vitorias,
+            'redirect_url': reverse('index'),
+            **extra,
         })
 
     def _cancel_game(self, request, jogo):
@@ -340,14 +497,31 @@ class TabuleiroTemplateView(LoginRequiredMixin, TemplateView):
 
         jogo.status = 'CANCELLED'
         jogo.fim_tempo = timezone.now()
-        jogo.save()
-
-        # Atualiza as estatísticas do jogador
-        jogador, created = Jogador.objects.get_or_create(user_jogador=request.user)
-        jogador.jogos_jogados += 1  # Incrementa jogos jogados, mesmo que tenha desistido
+        with transaction.atomic(savepoint=False):
+            # UPDATE condicional: não cancela duas vezes se o coletor de
+            # partidas abandonadas (ou outra aba) encerrou a partida antes
+            cancelados = (
+                Game.objects
+                .filter(pk=jogo.pk, status='IN_PROGRESS')
+                .update(status=jogo.status, fim_tempo=jogo.fim_tempo)
+            )
+            if not cancelados:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Esta partida não pode ser cancelada.'
+                }, status=400)
 
-        # Recalcula a pontuação média (não incrementa vitórias)
-        self._update_player_stats(jogador)
+            # Registra o fim da partida para as estatísticas do jogador: conta a
+            # partida mesmo que tenha desistido, mas não incrementa vitórias
+            pontuacao = (
+                PontuacaoJogo.objects
+                .filter(jogo=jogo, jogador=request.user)
+                .values_list('pontuacao', flat=True)
+                .first()
+            ) or 0
+            estatisticas.registrar_fim_de_jogo(
+                jogo, request.user, pontuacao, estatisticas.duracao_em_segundos(jogo), False
+            )
 
         return JsonResponse({
             'status': 'success',
@@ -358,51 +532,59 @@ class TabuleiroTemplateView(LoginRequiredMixin, TemplateView):
     # Adicionar estes métodos à classe TabuleiroTemplateView
     def _get_pergunta(self, request, jogo_id, casa_id):
         """
-        Método para buscar uma pergunta aleatória para uma casa específica
-        e retornar os dados em formato JSON
+        Método para sortear uma pergunta para uma casa específica (seleção
+        adaptativa, core.selecao_perguntas) e retornar os dados em formato JSON
         """
         try:
-            # Verificar se o jogo existe e está em andamento
-            jogo = get_object_or_404(Game, id=jogo_id, partidas=request.user, status='IN_PROGRESS')
+            try:
+                casa = int(casa_id)
+            except (ValueError, TypeError):
+                casa = None
+            if casa not in engine.CASAS_PERGUNTA:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'ID da casa inválido.'
+                }, status=400)
+
+            # Partida do jogador, na casa informada: acerto corrente e perguntas já usadas
+            partida = (
+                _na_casa_sem_resposta(Game.objects.filter(id=jogo_id, partidas=request.user), casa)
+                .values_list('respostas_pendentes', 'baralho')
+                .first()
+            )
+            if partida is None:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Jogo não encontrado, jogador fora desta casa ou casa já respondida.'
+                }, status=404)
 
-            # Buscar perguntas para esta casa
-            perguntas = Pergunta.objects.filter(posicao_tabuleiro=casa_id)
+            # Sorteio ponderado pela dificuldade, sem repetir perguntas da partida
+            precisao, usadas = selecao_perguntas.perfil_partida(*partida)
+            pergunta = selecao_perguntas.sortear_pergunta(casa, precisao, excluir=usadas)
 
             # Se não houver perguntas para esta casa
-            if not perguntas.exists():
+            if pergunta is None:
                 return JsonResponse({
                     'status': 'error',
                     'message': 'Não há perguntas para esta casa'
                 })
 
-            # Selecionar uma pergunta aleatória
-            pergunta = random.choice(perguntas)
-
-            # Buscar as respostas para esta pergunta
-            respostas = Resposta.objects.filter(pergunta=pergunta)
-            respostas_json = []
-
-            # Formatar respostas para JSON (sem revelar qual é a correta)
-            for resp in respostas:
-                respostas_json.append({
-                    'id': resp.id,
-                    'text': resp.text
-                })
-
-            # Salvar na sessão a pergunta atual para validação posterior
-            request.session['pergunta_atual_id'] = pergunta.id
+            # Um único UPDATE valida a partida e a posição do jogador e grava a
+            # pergunta em aberto
+            atualizados = (
+                _na_casa_sem_resposta(Game.objects.filter(id=jogo_id, partidas=request.user), casa)
+                .update(pergunta_atual=pergunta['id'], dica_usada=False, ultima_atividade=timezone.now())
+            )
+            if not atualizados:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Jogo não encontrado, jogador fora desta casa ou casa já respondida.'
+                }, status=404)
 
-            # Retornar dados da pergunta
+            # Retornar dados da pergunta (sem revelar qual resposta é a correta)
             return JsonResponse({
                 'status': 'success',
-                'pergunta': {
-                    'id': pergunta.id,
-                    'text': pergunta.text,
-                    'category': pergunta.get_category_display(),
-                    'dica': pergunta.dica,
-                    'imagem_url': pergunta.imagem.url if pergunta.imagem else None
-                },
-                'respostas': respostas_json,
+                **banco_perguntas.dados_publicos(pergunta),
                 'casa_id': casa_id
             })
         except Exception as e:
@@ -411,87 +593,204 @@ class TabuleiroTemplateView(LoginRequiredMixin, TemplateView):
                 'message': f'Erro ao buscar pergunta: {str(e)}'
             }, status=500)
 
-    def _processar_resposta(self, request, jogo_id):
+    def _usar_dica(self, request, jogo_id, dados):
         """
-        Método para processar a resposta selecionada pelo usuário
-        e retornar feedback em formato JSON
+        Registra o uso da dica na pergunta em aberto e devolve o texto da dica.
+        No modo baralho (`casa_id` informado) a pergunta é a da casa do jogador.
         """
-        try:
-            # Verificar se o jogo existe
-            jogo = get_object_or_404(Game, id=jogo_id, partidas=request.user)
+        casa_id = dados.get('casa_id')
+        with transaction.atomic():
+            try:
+                jogo = (
+                    Game.objects
+                    .select_for_update(of=('self',))
+                    .only('id', 'baralho', 'casa_atual', 'pergunta_atual', 'casas_respondidas')
+                    .get(id=jogo_id, partidas=request.user, status='IN_PROGRESS')
+                )
+            except (Game.DoesNotExist, ValueError):
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Jogo não encontrado.'
+                }, status=404)
 
-            # Obter dados do formulário
-            resposta_id = request.POST.get('resposta_id')
-            pergunta_id = request.session.get('pergunta_atual_id')
-            usou_dica = request.POST.get('usou_dica') == 'true'
+            if casa_id:
+                # Modo baralho: vale apenas a casa onde o jogador está
+                casa = jogo.casa_atual
+                pergunta_id = None
+                if str(casa_id) == str(casa) and not jogo.casa_respondida(casa):
+                    pergunta_id = jogo.pergunta_do_baralho(casa)
+            else:
+                pergunta_id = jogo.pergunta_atual
+            pergunta = banco_perguntas.obter_pergunta(pergunta_id)
 
-            # Verificar se temos todos os dados necessários
-            if not all([resposta_id, pergunta_id]):
+            if pergunta is None or not pergunta['dica']:
                 return JsonResponse({
                     'status': 'error',
-                    'message': 'Dados incompletos'
+                    'message': 'Não há dica para a pergunta atual.'
                 }, status=400)
 
-            # Buscar objetos necessários
-            resposta = Resposta.objects.get(id=resposta_id)
-            pergunta = Pergunta.objects.get(id=pergunta_id)
-            pontuacao = PontuacaoJogo.objects.get(jogo=jogo, jogador=request.user)
+            Game.objects.filter(pk=jogo.pk).update(
+                pergunta_atual=pergunta_id, dica_usada=True, ultima_atividade=timezone.now()
+            )
 
-            # Verificar se a resposta está correta
-            if resposta.e_correto:
-                # Pontuação base por acerto: 100 pontos
-                pontos = 100
+        return JsonResponse({
+            'status': 'success',
+            'dica': pergunta['dica']
+        })
+
+    def _processar_resposta(self, request, jogo_id, dados):
+        """
+        Método para processar a resposta selecionada pelo usuário
+        e retornar feedback em formato JSON.
+
+        A pergunta e a resposta vêm do banco de perguntas em memória; no banco
+        de dados apenas a pontuação é travada e atualizada com expressões F(),
+        dentro de uma única transação, para que duas abas não percam pontos.
+        A pergunta em aberto é consumida com um UPDATE condicional, de modo
+        que a mesma pergunta não pode ser respondida (e pontuada) duas vezes.
+        """
+        try:
+            # Obter dados do formulário
+            resposta_id = dados.get('resposta_id')
+            casa_id = dados.get('casa_id')
+
+            # Buscar a resposta no banco em memória
+            try:
+                resposta = banco_perguntas.obter_resposta(int(resposta_id))
+            except (ValueError, TypeError):
+                resposta = None
+
+            with transaction.atomic():
+                # Trava a linha da pontuação (e valida que o jogo é do usuário)
+                try:
+                    pontuacao = (
+                        PontuacaoJogo.objects
+                        .select_for_update(of=('self',))
+                        .select_related('jogo')
+                        .only(
+                            'id', 'pontuacao', 'jogo__status', 'jogo__baralho', 'jogo__casa_atual',
+                            'jogo__pergunta_atual', 'jogo__dica_usada', 'jogo__casas_respondidas',
+                            'jogo__ultima_atividade', 'jogo__respostas_pendentes',
+                        )
+                        .get(jogo_id=jogo_id, jogador=request.user)
+                    )
+                except (PontuacaoJogo.DoesNotExist, ValueError):
+                    return JsonResponse({
+                        'status': 'error',
+                        'message': 'Jogo não encontrado.'
+                    }, status=404)
+
+                jogo = pontuacao.jogo
+                if jogo.status != 'IN_PROGRESS':
+                    return JsonResponse({
+                        'status': 'error',
+                        'message': 'Esta partida não está mais em andamento.'
+                    }, status=400)
+
+                # No modo baralho a pergunta vem do sorteio guardado na partida;
+                # sem casa, vale a pergunta em aberto sorteada por get_pergunta
+                novo_estado = {
+                    'pergunta_atual': None,
+                    'dica_usada': False,
+                    'ultima_atividade': timezone.now(),
+                }
+                pendente = Game.objects.none()
+                if casa_id:
+                    # Só a pergunta da casa onde o jogador está pode ser respondida
+                    casa = jogo.casa_atual
+                    pergunta_id = jogo.pergunta_do_baralho(casa) if str(casa_id) == str(casa) else None
+                    if pergunta_id:
+                        bit = 1 << casa
+                        novo_estado['casas_respondidas'] = F('casas_respondidas').bitor(bit)
+                        pendente = (
+                            Game.objects
+                            .annotate(respondida=F('casas_respondidas').bitand(bit))
+                            .filter(pk=jogo.pk, status='IN_PROGRESS', respondida=0)
+                        )
+                else:
+                    # A pergunta em aberto também marca a casa como respondida
+                    pergunta_id = jogo.pergunta_atual
+                    novo_estado['casas_respondidas'] = F('casas_respondidas').bitor(1 << jogo.casa_atual)
+                    pendente = _na_casa_sem_resposta(
+                        Game.objects.filter(pk=jogo.pk, pergunta_atual=pergunta_id), jogo.casa_atual
+                    )
+                pergunta = banco_perguntas.obter_pergunta(pergunta_id)
+
+                # A resposta precisa pertencer à pergunta sorteada para o jogador
+                if pergunta is None or resposta is None or resposta['pergunta_id'] != pergunta['id']:
+                    return JsonResponse({
+                        'status': 'error',
+                        'message': 'Resposta inválida para a pergunta atual.'
+                    }, status=400)
+
+                # A dica só vale se foi registrada (usar_dica) para esta pergunta
+                usou_dica = jogo.dica_usada and jogo.pergunta_atual == pergunta_id
+
+                # O evento de resposta segue no mesmo UPDATE, acumulado na partida
+                novo_estado['respostas_pendentes'] = eventos_resposta.acumular(
+                    jogo, request.user.id, pergunta_id, resposta, usou_dica, novo_estado['ultima_atividade']
+                )
+
+                # Consome a pergunta: se outra requisição já a respondeu, nada muda
+                if not pendente.update(**novo_estado):
+                    return JsonResponse({
+                        'status': 'error',
+                        'message': 'Esta pergunta já foi respondida.'
+                    }, status=409)
 
-                # Se usou dica, reduzir 30 pontos
-                if usou_dica:
-                    pontos -= 30
+                if resposta['e_correto']:
+                    # Pontuação base por acerto: 100 pontos
+                    # Se usou dica, reduzir 30 pontos
+                    pontos = 70 if usou_dica else 100
+                else:
+                    # Resposta incorreta - penalidade por resposta errada: 20 pontos
+                    pontos = -20
 
-                # Atualizar pontuação
-                pontuacao.pontuacao += pontos
-                pontuacao.save()
+                PontuacaoJogo.objects.filter(pk=pontuacao.pk).update(
+                    pontuacao=F('pontuacao') + pontos
+                )
 
                 # Atualizar contador de perguntas corretas
-                jogador, created = Jogador.objects.get_or_create(user_jogador=request.user)
-                jogador.total_perguntas_certas += 1
-                jogador.save()
+                if resposta['e_correto']:
+                    atualizados = Jogador.objects.filter(user_jogador=request.user).update(
+                        total_perguntas_certas=F('total_perguntas_certas') + 1
+                    )
+                    if not atualizados:
+                        Jogador.objects.create(user_jogador=request.user, total_perguntas_certas=1)
+
+            pontuacao_atual = pontuacao.pontuacao + pontos
 
+            if resposta['e_correto']:
                 # Resposta correta
                 return JsonResponse({
                     'status': 'success',
                     'resposta_correta': True,
                     'pontos': pontos,
                     'pergunta': {
-                        'text': pergunta.text,
-                        'explicacao': pergunta.explicacao
+                        'text': pergunta['text'],
+                        'explicacao': pergunta['explicacao']
                     },
                     'resposta': {
-                        'text': resposta.text
+                        'text': resposta['text']
                     },
-                    'pontuacao_atual': pontuacao.pontuacao
+                    'pontuacao_atual': pontuacao_atual
                 })
-            else:
-                # Resposta incorreta - penalidade
-                penalidade = 20  # Penalidade por resposta errada: 20 pontos
-                pontuacao.pontuacao -= penalidade
-                pontuacao.save()
 
-                # Buscar a resposta correta
-                resposta_correta = Resposta.objects.get(pergunta=pergunta, e_correto=True)
-
-                # Retornar feedback
-                return JsonResponse({
-                    'status': 'success',
-                    'resposta_correta': False,
-                    'penalidade': penalidade,
-                    'pergunta': {
-                        'text': pergunta.text,
-                        'explicacao': pergunta.explicacao
-                    },
-                    'resposta_correta_obj': {
-                        'text': resposta_correta.text
-                    },
-                    'pontuacao_atual': pontuacao.pontuacao
-                })
+            # Retornar feedback com a resposta correta
+            resposta_correta = pergunta['resposta_correta']
+            return JsonResponse({
+                'status': 'success',
+                'resposta_correta': False,
+                'penalidade': -pontos,
+                'pergunta': {
+                    'text': pergunta['text'],
+                    'explicacao': pergunta['explicacao']
+                },
+                'resposta_correta_obj': {
+                    'text': resposta_correta['text'] if resposta_correta else None
+                },
+                'pontuacao_atual': pontuacao_atual
+            })
         except Exception as e:
             return JsonResponse({
                 'status': 'error',
@@ -499,6 +798,154 @@ class TabuleiroTemplateView(LoginRequiredMixin, TemplateView):
             }, status=500)
 
 
+class TabuleiroAcoesView(View):
+    """
+    Ações JSON do tabuleiro servidas de forma assíncrona (ASGI).
+
+    Mesmo protocolo do POST de TabuleiroTemplateView. As ações de leitura e
+    a de UPDATE único (check_status, update_score e get_pergunta) usam o ORM
+    assíncrono e não ocupam uma thread enquanto esperam o banco; as que
+    dependem de transação e de travas de linha (rolar_dado, respostas, dica,
+    cancelamento, lotes e o encerramento da partida) executam a implementação
+    síncrona em uma thread, com as mesmas garantias.
+    """
+    http_method_names = ['post']
+
+    async def post(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Usuário não autenticado.'
+            }, status=401)
+
+        try:
+            dados = ler_dados_acao(request)
+            if dados is None:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'JSON inválido.'
+                }, status=400)
+
+            action = dados.get('action', 'update_score')
+            jogo_id = dados.get('jogo_id')
+            if action in ('check_status', 'update_score', 'get_pergunta') and not jogo_id:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'ID do jogo não fornecido.'
+                }, status=400)
+
+            if action == 'get_pergunta':
+                return await self._get_pergunta(user, jogo_id, dados.get('casa_id'))
+            if action in ('check_status', 'update_score'):
+                return await self._status_ou_pontuacao(request, user, action, jogo_id)
+
+            return await sync_to_async(self._executar_sincrono)(request, action, dados)
+        except Exception as e:
+            return erro_inesperado(e)
+
+    @staticmethod
+    def _executar_sincrono(request, action, dados):
+        tabuleiro = TabuleiroTemplateView()
+        if action == 'batch':
+            return tabuleiro._executar_lote(request, dados)
+        return tabuleiro._executar_acao(request, action, dados)
+
+    async def _status_ou_pontuacao(self, request, user, action, jogo_id):
+        try:
+            jogo = await (
+                Game.objects
+                .only('id', 'status', 'semente', 'casa_atual', 'jogadas', 'inicio_tempo')
+                .aget(id=jogo_id, partidas=user)
+            )
+        except (Game.DoesNotExist, ValueError):
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Jogo não encontrado.'
+            }, status=404)
+
+        if action == 'update_score' and jogo.status != 'IN_PROGRESS':
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Esta partida não está mais em andamento.'
+            }, status=400)
+
+        try:
+            pontuacao_jogo = await PontuacaoJogo.objects.only('id', 'pontuacao').aget(jogo=jogo, jogador=user)
+        except PontuacaoJogo.DoesNotExist:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Pontuação do jogo não encontrada.'
+            }, status=404)
+
+        if action == 'check_status':
+            return JsonResponse({
+                'status': 'success',
+                'jogo_status': jogo.status,
+                'pontuacao_atual': pontuacao_jogo.pontuacao,
+                'casa_atual': jogo.casa_atual,
+                'jogo_id': jogo.id
+            })
+
+        # Encerrar a partida grava o Game e a caixa de saída em uma transação
+        if jogo.estado_engine.finalizado:
+            return await sync_to_async(TabuleiroTemplateView()._complete_game)(request, jogo, pontuacao_jogo)
+
+        return JsonResponse({
+            'status': 'success',
+            'pontuacao_atual': pontuacao_jogo.pontuacao,
+            'jogo_id': jogo.id
+        })
+
+    async def _get_pergunta(self, user, jogo_id, casa_id):
+        try:
+            casa = int(casa_id)
+        except (ValueError, TypeError):
+            casa = None
+        if casa not in engine.CASAS_PERGUNTA:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'ID da casa inválido.'
+            }, status=400)
+
+        partida = await (
+            _na_casa_sem_resposta(Game.objects.filter(id=jogo_id, partidas=user), casa)
+            .values_list('respostas_pendentes', 'baralho')
+            .afirst()
+        )
+        if partida is None:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Jogo não encontrado, jogador fora desta casa ou casa já respondida.'
+            }, status=404)
+
+        precisao, usadas = selecao_perguntas.perfil_partida(*partida)
+        pergunta = await selecao_perguntas.asortear_pergunta(casa, precisao, excluir=usadas)
+        if pergunta is None:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Não há perguntas para esta casa'
+            })
+
+        # Um único UPDATE valida a partida e a posição do jogador e grava a
+        # pergunta em aberto
+        atualizados = await (
+            _na_casa_sem_resposta(Game.objects.filter(id=jogo_id, partidas=user), casa)
+            .aupdate(pergunta_atual=pergunta['id'], dica_usada=False, ultima_atividade=timezone.now())
+        )
+        if not atualizados:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'Jogo não encontrado, jogador fora desta casa ou casa já respondida.'
+            }, status=404)
+
+        return JsonResponse({
+            'status': 'success',
+            **banco_perguntas.dados_publicos(pergunta),
+            'casa_id': casa_id
+        })
+
+
 class EstatisticasJogadorView(LoginRequiredMixin, DetailView):
     """
     View para exibir estatísticas detalhadas do jogador.
@@ -510,13 +957,17 @@ class EstatisticasJogadorView(LoginRequiredMixin, DetailView):
     login_url = '/accounts/login/'
 
     def get_object(self, queryset=None):
-        # Retorna o perfil do jogador do usuário atual
-        jogador, created = Jogador.objects.get_or_create(user_jogador=self.request.user)
+        # Retorna o perfil do jogador do usuário atual (já com o usuário carregado)
+        jogador, created = (
+            Jogador.objects
+            .select_related('user_jogador')
+            .get_or_create(user_jogador=self.request.user)
+        )
         return jogador
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        jogador = self.get_object()
+        jogador = self.object
 
         # Calculando estatísticas adicionais
         context['taxa_vitoria'] = (jogador.vitorias / jogador.jogos_jogados * 100) if jogador.jogos_jogados > 0 else 0
@@ -533,35 +984,30 @@ class EstatisticasJogadorView(LoginRequiredMixin, DetailView):
         else:
             context['media_perguntas_certas'] = 0
 
-        # Obtendo partidas recentes
-        partidas_recentes = Game.objects.filter(
-            partidas=jogador.user_jogador
-        ).order_by('-inicio_tempo')[:5]
-
-        # Adicionando pontuações às partidas
-        for partida in partidas_recentes:
-            try:
-                pontuacao = PontuacaoJogo.objects.get(jogo=partida, jogador=jogador.user_jogador)
-                partida.pontuacao_obtida = pontuacao.pontuacao
-            except PontuacaoJogo.DoesNotExist:
-                partida.pontuacao_obtida = 0
+        # Obtendo partidas recentes, já anotadas com a pontuação do jogador
+        # em cada uma (subconsulta, sem uma consulta extra por partida)
+        pontuacao_obtida = PontuacaoJogo.objects.filter(
+            jogo=OuterRef('pk'),
+            jogador=jogador.user_jogador,
+        ).values('pontuacao')[:1]
+        partidas_recentes = (
+            Game.objects
+            .filter(partidas=jogador.user_jogador)
+            .annotate(pontuacao_obtida=Coalesce(Subquery(pontuacao_obtida), 0))
+            .order_by('-inicio_tempo')[:5]
+        )
 
         context['partidas_recentes'] = partidas_recentes
 
         # ➜ NOVO – calcular posição no ranking geral (por maior pontuação)
-        ranking = (
-            Jogador.objects
-            .filter(jogos_jogados__gt=0)  # só quem jogou
-            .order_by('-maior_pontuacao')  # critério do RankingView
-            .values_list('id', flat=True)
-        )
-        try:
-            posicao = list(ranking).index(jogador.id) + 1
-        except ValueError:
-            posicao = None  # ainda não ranqueado
+        posicao = ranking.posicao_no_ranking(jogador)  # None se ainda não ranqueado
 
         context['posicao_ranking'] = posicao
 
+        # Tendências, acerto por categoria e percentil, lidos dos agregados
+        # diários (comando agregar_estatisticas)
+        context['painel'] = agregados.painel_jogador(jogador.user_jogador)
+
         return context
 
 
@@ -581,50 +1027,98 @@ class RankingView(TemplateView):
         # Definir direção da ordenação (padrão: decrescente)
         order_dir = self.request.GET.get('dir', 'desc')
         
-        # Mapear critérios válidos de ordenação
-        valid_order_fields = {
-            'maior_pontuacao': 'maior_pontuacao',
-            'pontuacao_media': 'pontuacao_media',
-            'vitorias': 'vitorias',
-            'jogos': 'jogos_jogados',
-            'perguntas_certas': 'total_perguntas_certas'
-        }
-        
         # Verificar se o critério é válido, senão usar o padrão
-        if order_by not in valid_order_fields:
-            order_by = 'maior_pontuacao'
-        
-        # Construir string de ordenação
-        order_field = valid_order_fields[order_by]
-        if order_dir == 'asc':
-            order_string = order_field
-        else:
-            order_string = f'-{order_field}'
-        
-        # Buscar apenas jogadores que tenham jogado pelo menos um jogo
-        jogadores = Jogador.objects.filter(jogos_jogados__gt=0).order_by(order_string)[:20]
-        
-        # Adicionar posição no ranking
-        for i, jogador in enumerate(jogadores):
-            jogador.posicao = i + 1
-            
+        if order_by not in ranking.CAMPOS_ORDENACAO:
+            order_by = ranking.ORDENACAO_PADRAO
+
+        if order_dir not in ranking.DIRECOES:
+            order_dir = 'desc'
+
+        # Página do ranking a partir da foto materializada (posição já incluída)
+        jogadores, proximo_cursor = ranking.obter_pagina(order_by, order_dir, self.request.GET.get('apos'))
+
+        for jogador in jogadores:
             # Formatar tempo médio para exibição
-            if jogador.tempo_medio_jogo > 0:
-                jogador.tempo_formatado = str(datetime.timedelta(seconds=jogador.tempo_medio_jogo))
+            if jogador['tempo_medio_jogo'] > 0:
+                jogador['tempo_formatado'] = str(datetime.timedelta(seconds=jogador['tempo_medio_jogo']))
             else:
-                jogador.tempo_formatado = "00:00:00"
-            
+                jogador['tempo_formatado'] = "00:00:00"
+
             # Calcular taxa de vitória
-            if jogador.jogos_jogados > 0:
-                jogador.taxa_vitoria = (jogador.vitorias / jogador.jogos_jogados) * 100
+            if jogador['jogos_jogados'] > 0:
+                jogador['taxa_vitoria'] = (jogador['vitorias'] / jogador['jogos_jogados']) * 100
             else:
-                jogador.taxa_vitoria = 0
-        
+                jogador['taxa_vitoria'] = 0
+
         context['jogadores'] = jogadores
         context['order_by'] = order_by
         context['order_dir'] = order_dir
+        context['proximo_cursor'] = proximo_cursor
+        # O topo do ranking é atualizado ao vivo (stream SSE); páginas
+        # seguintes continuam estáticas
+        context['ranking_tempo_real'] = settings.RANKING_TEMPO_REAL and not self.request.GET.get('apos')
         
         return context
 
+class RankingStreamView(View):
+    """
+    Stream (server-sent events) com as alterações do topo do ranking.
+    Todos os assinantes do processo são atendidos por um único transmissor
+    (core.ranking_tempo_real); requer o servidor ASGI.
+    """
+    http_method_names = ['get']
+
+    async def get(self, request, *args, **kwargs):
+        if not settings.RANKING_TEMPO_REAL:
+            raise Http404('Ranking em tempo real desativado.')
+
+        order_by = request.GET.get('order_by', ranking.ORDENACAO_PADRAO)
+        order_dir = request.GET.get('dir', 'desc')
+        if order_by not in ranking.CAMPOS_ORDENACAO:
+            order_by = ranking.ORDENACAO_PADRAO
+        if order_dir not in ranking.DIRECOES:
+            order_dir = 'desc'
+
+        resposta = StreamingHttpResponse(
+            ranking_tempo_real.eventos(order_by, order_dir),
+            content_type='text/event-stream'
+        )
+        resposta['Cache-Control'] = 'no-cache'
+        # Desativa o buffer de proxies (nginx) para que os eventos saiam na hora
+        resposta['X-Accel-Buffering'] = 'no'
+        return resposta
+
+
+class ExportacaoView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Download (somente equipe) de um conjunto de dados em CSV ou Parquet, por
+    streaming. Parâmetros: formato, inicio e fim (AAAA-MM-DD), status e
+    categoria; os filtros são aplicados na consulta (core.exportacao).
+    """
+    http_method_names = ['get']
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, conjunto, *args, **kwargs):
+        if conjunto not in exportacao.CONJUNTOS:
+            raise Http404('Conjunto de dados inexistente')
+        try:
+            filtros = {
+                campo: datetime.date.fromisoformat(request.GET[campo])
+                for campo in ('inicio', 'fim') if request.GET.get(campo)
+            }
+            return exportacao.resposta(
+                request,
+                conjunto,
+                formato=request.GET.get('formato', 'csv'),
+                status=request.GET.get('status') or None,
+                categoria=request.GET.get('categoria') or None,
+                **filtros,
+            )
+        except ValueError as erro:
+            return JsonResponse({'status': 'error', 'message': str(erro)}, status=400)
+
+
 # A classe CasaBonusTemplateView foi removida para simplificar o código
 # O bônus agora é exibido diretamente no tabuleiro usando um modal
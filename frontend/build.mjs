@@ -0,0 +1,66 @@
+// frontend/build.mjs
+//
+// Compila static/js/src/*.jsx com o esbuild para static/js/dist e copia os
+// builds UMD do React para static/js/vendor, para que o tabuleiro funcione
+// sem CDN e sem Babel no navegador.
+//
+//   npm run build   -> Tabuleiro.min.js / TabuleiroN.min.js (produção)
+//   npm run dev     -> Tabuleiro.js / TabuleiroN.js com sourcemap, em modo watch
+//
+// O hash de conteúdo no nome dos arquivos é aplicado pelo collectstatic
+// (CompressedManifestStaticFilesStorage do WhiteNoise), que também gera as
+// versões .gz/.br servidas com cache de longa duração.
+import { copyFile, mkdir } from 'node:fs/promises';
+import { createRequire } from 'node:module';
+import path from 'node:path';
+import * as esbuild from 'esbuild';
+
+const require = createRequire(import.meta.url);
+const raiz = path.resolve(path.dirname(new URL(import.meta.url).pathname), '..');
+const dev = process.argv.includes('--dev');
+const watch = process.argv.includes('--watch');
+
+const ENTRADAS = ['Tabuleiro.jsx', 'TabuleiroN.jsx'].map(
+    (arquivo) => path.join(raiz, 'static/js/src', arquivo)
+);
+
+const VENDOR = [
+    ['react', 'umd/react.production.min.js'],
+    ['react', 'umd/react.development.js'],
+    ['react-dom', 'umd/react-dom.production.min.js'],
+    ['react-dom', 'umd/react-dom.development.js'],
+];
+
+async function copiarVendor() {
+    const destino = path.join(raiz, 'static/js/vendor');
+    await mkdir(destino, { recursive: true });
+    for (const [pacote, arquivo] of VENDOR) {
+        const origem = path.join(path.dirname(require.resolve(`${pacote}/package.json`)), arquivo);
+        await copyFile(origem, path.join(destino, path.basename(arquivo)));
+    }
+}
+
+// React e ReactDOM continuam globais (window.React), vindos dos builds UMD
+const opcoes = {
+    entryPoints: ENTRADAS,
+    outdir: path.join(raiz, 'static/js/dist'),
+    entryNames: dev ? '[name]' : '[name].min',
+    bundle: true,
+    format: 'iife',
+    target: ['es2017'],
+    loader: { '.jsx': 'jsx' },
+    jsx: 'transform',
+    minify: !dev,
+    sourcemap: dev,
+    legalComments: 'none',
+    define: { 'process.env.NODE_ENV': JSON.stringify(dev ? 'development' : 'production') },
+    logLevel: 'info',
+};
+
+await copiarVendor();
+if (watch) {
+    const contexto = await esbuild.context(opcoes);
+    await contexto.watch();
+} else {
+    await esbuild.build(opcoes);
+}
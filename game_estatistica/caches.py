@@ -0,0 +1,50 @@
+"""
+Montagem do setting CACHES.
+
+Cada cache da aplicação tem seu próprio alias, para que possa ser
+dimensionado, limpo e monitorado separadamente:
+
+- default: sessões (SESSION_ENGINE cached_db) e usos gerais
+- perguntas: cópia da versão do banco de perguntas em memória (core.banco_perguntas)
+- ranking: fotos materializadas do ranking (core.ranking)
+"""
+import os
+
+ALIASES = ('default', 'perguntas', 'ranking')
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+
+def configurar_caches(backend='locmem', redis_url=None, diretorio=None, opcoes_redis=None):
+    """
+    Retorna o dicionário CACHES com todos os aliases no backend escolhido.
+
+    - locmem: um cache por processo (padrão para desenvolvimento)
+    - file: um diretório por alias dentro de `diretorio`
+    - redis: um único servidor (`redis_url`), com KEY_PREFIX por alias
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f'Backend de cache desconhecido: {backend} (use {", ".join(BACKENDS)})')
+    if backend == 'redis' and not redis_url:
+        raise ValueError('O backend redis requer REDIS_URL')
+    if backend == 'file' and not diretorio:
+        raise ValueError('O backend file requer um diretório')
+
+    caches = {}
+    for alias in ALIASES:
+        config = {'BACKEND': BACKENDS[backend]}
+        if backend == 'locmem':
+            config['LOCATION'] = alias
+        elif backend == 'file':
+            config['LOCATION'] = os.path.join(diretorio, alias)
+        else:
+            config['LOCATION'] = redis_url
+            config['KEY_PREFIX'] = alias
+            if opcoes_redis:
+                config['OPTIONS'] = dict(opcoes_redis)
+        caches[alias] = config
+    return caches
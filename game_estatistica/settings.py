@@ -13,6 +13,7 @@ import os
 from pathlib import Path
 import dj_database_url
 from dotenv import load_dotenv
+from .caches import configurar_caches
 load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -100,9 +101,14 @@ WSGI_APPLICATION = 'game_estatistica.wsgi.application'
 
 # Sobrescreve com a URL do banco de dados do Railway em produção
 DATABASE_URL = os.environ.get('DATABASE_URL')
+# Servidor da aplicação (ver Dockerfile): 'asgi' (workers uvicorn) ou 'wsgi'.
+# Sob ASGI o código síncrono de cada requisição roda em uma thread própria,
+# então conexões persistentes não seriam reaproveitadas, apenas acumuladas
+SERVIDOR = os.environ.get('SERVIDOR', 'wsgi')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 0 if SERVIDOR == 'asgi' else 600))
 if DATABASE_URL:
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL, conn_max_age=600, ssl_require=True)
+        'default': dj_database_url.parse(DATABASE_URL, conn_max_age=DB_CONN_MAX_AGE, ssl_require=True)
     }
 else:
     # Garante que 'default' seja sempre um dicionário, mesmo sem DATABASE_URL, para desenvolvimento local
@@ -113,6 +119,24 @@ else:
         }
     }
 
+# Cache
+# CACHE_BACKEND: locmem (padrão), file ou redis. Com REDIS_URL definido o
+# Redis passa a ser o padrão, compartilhado entre todos os processos
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis' if REDIS_URL else 'locmem')
+CACHES = configurar_caches(
+    CACHE_BACKEND,
+    redis_url=REDIS_URL,
+    diretorio=os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, '.cache')),
+)
+# Segundos durante os quais cada processo usa a cópia em cache da versão do
+# banco de perguntas antes de relê-la do banco de dados (core.banco_perguntas)
+BANCO_PERGUNTAS_VALIDADE_VERSAO = int(os.environ.get('BANCO_PERGUNTAS_VALIDADE_VERSAO', 5))
+
+# Sessões lidas do cache e gravadas também no banco (sobrevivem à limpeza do cache)
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'default'
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -152,7 +176,21 @@ MEDIA_URL = '/media/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # Nomes com hash de conteúdo + versões comprimidas, servidos pelo WhiteNoise
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Tabuleiro: True carrega o React de desenvolvimento e o bundle sem
+# minificação gerado por `npm run dev`; False usa os builds de produção
+# gerados por `npm run build`. Padrão: o valor de DEBUG. Se o build escolhido
+# não tiver sido gerado, o tabuleiro usa o outro (core.estaticos)
+TABULEIRO_JS_DEV = os.environ.get('TABULEIRO_JS_DEV', str(DEBUG)).lower() in ('1', 'true', 'yes')
 
 
 # Default primary key field type
@@ -167,3 +205,18 @@ LOGIN_REDIRECT_URL = 'index'
 LOGOUT_REDIRECT_URL = 'index'
 # Página onde se faz o login
 LOGIN_URL = 'account_login'
+
+# Ranking
+# Idade máxima (em segundos) das fotos materializadas do ranking antes de
+# serem reconstruídas a partir da tabela de jogadores
+RANKING_SNAPSHOT_MAX_IDADE = int(os.environ.get('RANKING_SNAPSHOT_MAX_IDADE', 60))
+# Topo do ranking atualizado ao vivo via server-sent events. O stream é
+# uma conexão longa servida por uma view assíncrona: requer o servidor ASGI
+RANKING_TEMPO_REAL = os.environ.get(
+    'RANKING_TEMPO_REAL', str(SERVIDOR == 'asgi')
+).lower() in ('1', 'true', 'yes')
+
+# Partidas abandonadas
+# Minutos sem atividade após os quais uma partida em andamento é cancelada
+# pelo comando cancelar_partidas_abandonadas
+PARTIDA_ABANDONADA_MINUTOS = int(os.environ.get('PARTIDA_ABANDONADA_MINUTOS', 30))
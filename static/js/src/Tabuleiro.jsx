@@ -14,6 +14,44 @@ function getCookie(name) {
     return cookieValue;
 }
 
+// Endpoint das ações do jogo (view assíncrona); a própria página do
+// tabuleiro também aceita as ações, como alternativa
+function urlAcoes() {
+    return window.acoesUrl || window.location.href;
+}
+
+// Envia várias ações do jogo em uma única requisição (action=batch); o
+// servidor executa todas em uma transação e devolve os resultados na
+// mesma ordem das ações
+function enviarLote(acoes) {
+    const jogoId = document.getElementById('jogo_id').value;
+    return fetch(urlAcoes(), {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCookie('csrftoken'),
+        },
+        body: JSON.stringify({ action: 'batch', jogo_id: jogoId, acoes: acoes })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.resultados) {
+            throw new Error(data.message || 'Erro ao processar ações');
+        }
+        return data.resultados.map(item => item.resultado);
+    });
+}
+
+// Baralho da partida entregue com a página: {casa: {pergunta, respostas}}
+let baralhoCache = null;
+function obterBaralho() {
+    if (baralhoCache === null) {
+        const elemento = document.getElementById('baralho-data');
+        baralhoCache = elemento ? JSON.parse(elemento.textContent) : {};
+    }
+    return baralhoCache;
+}
+
 function getColor(num) {
     switch (num) {
         case 1: return "#e74c3c";
@@ -182,7 +220,8 @@ function PerguntaModal({ isOpen, onClose, casaId, onPerguntaRespondida }) {
     const [respostaSelecionada, setRespostaSelecionada] = React.useState(null);
     const [resultadoResposta, setResultadoResposta] = React.useState(null);
     const [mostrarDica, setMostrarDica] = React.useState(false);
-    const [usouDica, setUsouDica] = React.useState(false);
+    const [textoDica, setTextoDica] = React.useState(null);
+    const [perguntaDoBaralho, setPerguntaDoBaralho] = React.useState(false);
 
     // Cores temáticas para as categorias
     const getCategoryColor = (category) => {
@@ -223,7 +262,17 @@ function PerguntaModal({ isOpen, onClose, casaId, onPerguntaRespondida }) {
         setRespostaSelecionada(null);
         setResultadoResposta(null);
         setMostrarDica(false);
-        setUsouDica(false);
+        setTextoDica(null);
+
+        // Modo baralho: a pergunta da casa já veio com a página
+        const doBaralho = obterBaralho()[casaId];
+        setPerguntaDoBaralho(Boolean(doBaralho));
+        if (doBaralho) {
+            setPergunta(doBaralho.pergunta);
+            setRespostas(doBaralho.respostas);
+            setCarregando(false);
+            return;
+        }
 
         // Criar FormData para envio
         const formData = new FormData();
@@ -232,7 +281,7 @@ function PerguntaModal({ isOpen, onClose, casaId, onPerguntaRespondida }) {
         formData.append('casa_id', casaId);
 
         // Enviar requisição para buscar a pergunta
-        fetch(window.location.href, {
+        fetch(urlAcoes(), {
             method: 'POST',
             headers: {
                 'X-CSRFToken': csrftoken,
@@ -258,44 +307,49 @@ function PerguntaModal({ isOpen, onClose, casaId, onPerguntaRespondida }) {
 
     // Função para mostrar a dica
     const exibirDica = () => {
-        setMostrarDica(true);
-        setUsouDica(true);
+        // O servidor registra o uso da dica (a penalidade é aplicada na resposta)
+        enviarLote([
+            { action: 'usar_dica', ...(perguntaDoBaralho ? { casa_id: casaId } : {}) }
+        ])
+        .then(([data]) => {
+            if (data.status === 'success') {
+                setTextoDica(data.dica);
+                setMostrarDica(true);
+            } else {
+                setErro(data.message || 'Erro ao buscar a dica');
+            }
+        })
+        .catch(error => {
+            setErro('Erro de comunicação com o servidor: ' + error.message);
+            console.error('Erro ao buscar dica:', error);
+        });
     };
 
     // Função para enviar a resposta selecionada
     const enviarResposta = () => {
         if (!respostaSelecionada) return;
 
-        const csrftoken = getCookie('csrftoken');
-        const jogoId = document.getElementById('jogo_id').value;
-
-        // Criar FormData para envio
-        const formData = new FormData();
-        formData.append('jogo_id', jogoId);
-        formData.append('action', 'responder_pergunta');
-        formData.append('resposta_id', respostaSelecionada);
-        formData.append('usou_dica', usouDica);
-
         // Bloquear novas respostas
         setCarregando(true);
 
-        // Enviar requisição para processar a resposta
-        fetch(window.location.href, {
-            method: 'POST',
-            headers: {
-                'X-CSRFToken': csrftoken,
+        // Resposta e verificação do status do jogo em uma única requisição
+        enviarLote([
+            {
+                action: 'responder_pergunta',
+                resposta_id: respostaSelecionada,
+                // No modo baralho o servidor identifica a pergunta pela casa
+                ...(perguntaDoBaralho ? { casa_id: casaId } : {})
             },
-            body: formData
-        })
-        .then(response => response.json())
-        .then(data => {
+            { action: 'check_status' }
+        ])
+        .then(([data, statusJogo]) => {
             setCarregando(false);
             if (data.status === 'success') {
                 setResultadoResposta(data);
 
                 // Após 5 segundos, fechar o modal e notificar o componente pai
                 setTimeout(() => {
-                    onPerguntaRespondida(data.pontuacao_atual);
+                    onPerguntaRespondida(data.pontuacao_atual, statusJogo && statusJogo.jogo_status);
                 }, 5000);
             } else {
                 setErro(data.message || 'Erro ao processar resposta');
@@ -430,7 +484,7 @@ function PerguntaModal({ isOpen, onClose, casaId, onPerguntaRespondida }) {
                             <p className="pergunta-texto">{pergunta.text}</p>
                         </div>
 
-                        {pergunta.dica && !mostrarDica && (
+                        {pergunta.tem_dica && !mostrarDica && (
                             <button
                                 className="btn-dica"
                                 onClick={exibirDica}
@@ -447,7 +501,7 @@ function PerguntaModal({ isOpen, onClose, casaId, onPerguntaRespondida }) {
                                     <span className="dica-icon">💡</span>
                                     <h4>Dica:</h4>
                                 </div>
-                                <p>{pergunta.dica}</p>
+                                <p>{textoDica}</p>
                             </div>
                         )}
 
@@ -519,32 +573,28 @@ function Tabuleiro() {
         { tipo: "vazia" }, { tipo: "vazia" }, { tipo: "vazia" }, { tipo: "chegada", label: "21", extra: <span className="extra-casa">Chegada</span> }
     ];
 
-    // Função para verificar eventos especiais nas casas
-    function verificarEventosCasa(casa) {
-        // Verificar se chegou ao final do tabuleiro (casa 21)
-        if (casa >= 21) {
+    // Função para exibir o evento da casa de destino (calculado pelo servidor)
+    function verificarEventosCasa(jogada) {
+        const casa = jogada.destino;
+
+        // Chegou ao final do tabuleiro: a partida já foi finalizada pelo servidor
+        if (jogada.evento === 'chegada') {
             // Mostrar o modal de chegada com um pequeno delay
             // para que o jogador veja seu personagem chegar na casa final
             setTimeout(() => {
                 setShowChegadaModal(true);
 
-                // Configurar redirecionamento após 5 segundos
-                // (sincronizado com o contador no modal)
+                // Redirecionar após 5 segundos (sincronizado com o contador no modal)
                 setTimeout(() => {
-                    // Finalizar o jogo enviando a pontuação final ao servidor
-                    atualizarPontuacao(0, true);
+                    window.location.href = jogada.redirect_url || '/';
                 }, 5000);
             }, 800);
 
             return true;
         }
 
-        // Verificar se é uma casa bônus (6 ou 13)
-        if (casa === 6 || casa === 13) {
-            // Adicionar 50 pontos ao jogador
-            atualizarPontuacao(50, false);
-
-            // Mostrar o modal de bônus
+        // Casa bônus: os pontos já foram somados pelo servidor
+        if (jogada.evento === 'bonus') {
             setShowBonusModal(true);
 
             // Esconder o modal após 3 segundos
@@ -555,12 +605,8 @@ function Tabuleiro() {
             return true;
         }
 
-        // Verificar se é uma casa de penalidade (9 ou 17)
-        if (casa === 9 || casa === 17) {
-            // Subtrair 30 pontos do jogador
-            atualizarPontuacao(-30, false);
-
-            // Mostrar o modal de penalidade
+        // Casa de penalidade: os pontos já foram descontados pelo servidor
+        if (jogada.evento === 'penalidade') {
             setShowPenalidadeModal(true);
 
             // Esconder o modal após 3 segundos
@@ -571,19 +617,13 @@ function Tabuleiro() {
             return true;
         }
 
-        // Verificar se é uma casa de zona (casas 3, 8, 12, 16, 20)
-        const casasZona = [3, 8, 12, 16, 20];
-        if (casasZona.includes(casa)) {
-                console.log("Caiu em casa de zona:", casa);
-                // Mostrar modal de pergunta com um pequeno delay
-                // para que o jogador veja onde seu personagem parou
-                setTimeout(() => {
-                    console.log("Preparando para exibir modal de pergunta para casa:", casa);
-                    // Definir a casa atual para o modal de pergunta
-                    setCasaPerguntaAtual(casa);
-                    // Mostrar o modal
-                    setShowPerguntaModal(true);
-                    console.log("Modal de pergunta definido como visível");
+        // Casa de zona: abrir a pergunta
+        if (jogada.evento === 'pergunta') {
+            // Mostrar modal de pergunta com um pequeno delay
+            // para que o jogador veja onde seu personagem parou
+            setTimeout(() => {
+                setCasaPerguntaAtual(casa);
+                setShowPerguntaModal(true);
             }, 500);
 
             return true;
@@ -594,7 +634,13 @@ function Tabuleiro() {
     }
 
     // Função para processar após responder uma pergunta
-    function handlePerguntaRespondida(novaPontuacao) {
+    function handlePerguntaRespondida(novaPontuacao, jogoStatus) {
+        // Se o jogo deixou de estar em andamento (ex.: cancelado em outra aba)
+        if (jogoStatus && jogoStatus !== 'IN_PROGRESS') {
+            alert('Este jogo não está mais em andamento. Redirecionando para a página inicial.');
+            window.location.href = '/';
+            return;
+        }
         // Atualizar a pontuação na interface
         setPontuacaoAtual(novaPontuacao);
         // Fechar o modal de pergunta
@@ -623,7 +669,7 @@ function Tabuleiro() {
         formData.append('action', 'check_status'); // Nova ação para apenas verificar o status
 
         // Enviar requisição para buscar status do jogo
-        fetch(window.location.href, {
+        fetch(urlAcoes(), {
             method: 'POST',
             headers: {
                 'X-CSRFToken': csrftoken,
@@ -633,8 +679,9 @@ function Tabuleiro() {
         .then(response => response.json())
         .then(data => {
             if (data.status === 'success') {
-                // Atualiza a pontuação
+                // Atualiza a pontuação e a posição (mantidas pelo servidor)
                 setPontuacaoAtual(data.pontuacao_atual);
+                setCasaAtual(data.casa_atual);
 
                 // Se o jogo não estiver mais em andamento, redireciona para a página inicial
                 if (data.jogo_status !== 'IN_PROGRESS') {
@@ -652,45 +699,6 @@ function Tabuleiro() {
         });
     }
 
-    // Função para atualizar a pontuação
-    function atualizarPontuacao(pontos, finalizar = false) {
-        const csrftoken = getCookie('csrftoken');
-
-        // Criar FormData para envio
-        const formData = new FormData();
-        formData.append('jogo_id', document.getElementById('jogo_id').value);
-        formData.append('pontos', pontos);
-        formData.append('casa_atual', casaAtual);
-        formData.append('finalizar', finalizar);
-
-        // Enviar requisição para atualizar pontuação
-        fetch(window.location.href, {
-            method: 'POST',
-            headers: {
-                'X-CSRFToken': csrftoken,
-            },
-            body: formData
-        })
-        .then(response => response.json())
-        .then(data => {
-            if (data.status === 'success') {
-                console.log('Pontuação atualizada:', data.pontuacao_atual);
-                setPontuacaoAtual(data.pontuacao_atual);
-
-                // Se o jogo foi finalizado e há uma URL de redirecionamento
-                if (data.redirect_url) {
-                    // Redirecionar para a URL de redirecionamento
-                    window.location.href = data.redirect_url;
-                }
-            } else {
-                console.error('Erro:', data.message);
-            }
-        })
-        .catch(error => {
-            console.error('Erro ao atualizar pontuação:', error);
-        });
-    }
-
     // Função para sair da partida sem confirmações
     function cancelarPartida() {
         const csrftoken = getCookie('csrftoken');
@@ -707,7 +715,7 @@ function Tabuleiro() {
             formData.append('action', 'cancel_game');
             formData.append('csrfmiddlewaretoken', csrftoken);
             
-            navigator.sendBeacon(window.location.href, formData);
+            navigator.sendBeacon(urlAcoes(), formData);
             
             // Redirecionar imediatamente sem esperar resposta
             window.location.href = homeUrl;
@@ -717,7 +725,7 @@ function Tabuleiro() {
             formData.append('jogo_id', jogoId);
             formData.append('action', 'cancel_game');
             
-            fetch(window.location.href, {
+            fetch(urlAcoes(), {
                 method: 'POST',
                 headers: {
                     'X-CSRFToken': csrftoken,
@@ -746,7 +754,7 @@ function Tabuleiro() {
                 formData.append('action', 'cancel_game');
                 formData.append('csrfmiddlewaretoken', csrftoken);
     
-                navigator.sendBeacon(window.location.href, formData);
+                navigator.sendBeacon(urlAcoes(), formData);
             }
             
             // Não fazer nada aqui (sem mensagem e sem preventDefault)
@@ -763,12 +771,32 @@ function Tabuleiro() {
         if (casaAtual >= 21 || animando) return;
         setAnimando(true);
         setStars([]);
-        const sorte = Math.floor(Math.random() * 6) + 1;
+
+        // O dado é lançado pelo servidor, que também move o jogador e
+        // aplica os pontos da casa; o cliente apenas anima o resultado
+        enviarLote([{ action: 'rolar_dado' }])
+        .then(([jogada]) => {
+            if (jogada.status !== 'success') {
+                console.error('Erro ao lançar o dado:', jogada.message);
+                setAnimando(false);
+                buscarPontuacaoAtual();
+                return;
+            }
+            animarMovimento(jogada);
+        })
+        .catch(error => {
+            console.error('Erro ao lançar o dado:', error);
+            setAnimando(false);
+        });
+    }
+
+    function animarMovimento(jogada) {
+        const sorte = jogada.dado;
         setDado(sorte);
         setCor(getColor(sorte));
         setBorderColor(getBorderColor(sorte));
-        let destino = Math.min(casaAtual + sorte, 21);
-        let passo = casaAtual;
+        const destino = jogada.destino;
+        let passo = jogada.origem;
         function mover() {
             if (passo < destino) {
                 passo++;
@@ -782,9 +810,15 @@ function Tabuleiro() {
                 setBorderColor(getBorderColor(sorte));
                 setStars(Array.from({ length: 6 }, (_, i) => <Star keyId={"final-" + i} />));
 
-                // Verificar eventos especiais na casa de destino
-                // Se não houver evento especial, não atribuímos pontos
-                verificarEventosCasa(destino);
+                // Pontuação calculada pelo servidor para esta jogada
+                if (jogada.pontuacao_atual !== undefined) {
+                    setPontuacaoAtual(jogada.pontuacao_atual);
+                } else if (jogada.pontuacao_final !== undefined) {
+                    setPontuacaoAtual(jogada.pontuacao_final);
+                }
+
+                // Exibir o evento da casa de destino
+                verificarEventosCasa(jogada);
 
                 setTimeout(() => {
                     setStars([]);
@@ -800,24 +834,6 @@ function Tabuleiro() {
         // Mostrar informações de debug se necessário
         console.log("Jogo ID:", document.getElementById('jogo_id').value);
 
-        // Verificar se há dados temporários salvos (retorno da página de bônus)
-        const casa_atual_salva = localStorage.getItem('casa_atual');
-        const pontuacao_salva = localStorage.getItem('pontuacao_atual');
-
-        if (casa_atual_salva) {
-            // Usar a casa salva temporariamente
-            setCasaAtual(parseInt(casa_atual_salva));
-
-            // Se tiver pontuação salva, usar temporariamente
-            if (pontuacao_salva) {
-                setPontuacaoAtual(parseInt(pontuacao_salva));
-            }
-
-            // Limpar localStorage
-            localStorage.removeItem('casa_atual');
-            localStorage.removeItem('pontuacao_atual');
-        }
-
         // Buscar dados atualizados do servidor
         buscarPontuacaoAtual();
         setJogoCarregado(true);
@@ -827,15 +843,6 @@ function Tabuleiro() {
 
     }, []); // Este useEffect é executado apenas uma vez na inicialização
 
-    // Este useEffect será acionado quando o jogo for carregado e quando a casa mudar
-    // É importante para garantir que a pontuação esteja sincronizada com o servidor
-    React.useEffect(() => {
-        if (jogoCarregado) {
-            // Buscar pontuação sempre que a casa mudar
-            buscarPontuacaoAtual();
-        }
-    }, [jogoCarregado, casaAtual]);
-
     return (
         <div className="tabuleiro-container">
             <div className="titulo-tabuleiro">Tabuleiro Caminho da Fama</div>